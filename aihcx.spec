@@ -2,11 +2,11 @@
 
 
 a = Analysis(
-    ['aihcx/cli.py'],
-    pathex=[],
+    ['aihcx/__main__.py'],  # 与 setup.py 的 console_scripts 相同，入口为 aihcx.daemon:main
+    pathex=['.'],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['aihcx.cli', 'aihcx.commands'],  # daemon.main 中延迟导入的 cli，以及 cli.py 中按需加载的子命令模块
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,5 @@
+"""python -m aihcx 及 PyInstaller 打包的入口，与 console_scripts 一样经过 daemon 转发"""
+from aihcx.daemon import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""基于 ASGI 的异步Web服务引擎（aihcx web --engine async）
+
+/api 代理、模板API和配置API在事件循环中处理，上游请求使用非阻塞的 httpx 客户端；
+页面、静态文件等其余路由交给原有的 Flask 应用，URL 和 JSON 格式与 Flask 引擎完全一致。
+"""
+import asyncio
+import json
+import re
+import time
+import urllib.parse
+
+try:
+    import httpx
+    import uvicorn
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+except ImportError:  # 可选依赖：pip install aihcx[async]
+    httpx = None
+    uvicorn = None
+    WSGIMiddleware = None
+
+from baidubce.http import http_methods
+
+from . import metrics
+from .cache import AsyncSingleFlight
+from .client import CONFIG_KEYS, client_registry
+from .weblog import export_env, log_access, logger, setup_logging
+from .proxy import (CACHE_TTLS, POOL_QUEUE_ACTIONS, UPSTREAM_TIMEOUT, RawResponse, build_action_request,
+                    build_path_request, cache_key, is_read_action, is_read_request, log_upstream,
+                    passthrough_upstream, proxy_action, register_metrics, response_cache, upstream_route)
+from .compression import json_body, negotiate
+from .template_store import handle_template_detail, handle_templates
+
+# 上游连接池大小
+MAX_CONNECTIONS = 512
+
+TEMPLATE_DETAIL_PATH = re.compile(r'^/api/templates/([^/]+)$')
+
+def is_available() -> bool:
+    """异步引擎所需的可选依赖是否已安装"""
+    return httpx is not None and uvicorn is not None
+
+class AsyncProxyApp:
+    """ASGI 应用：原生处理 /api 相关路由，其余请求回退到 Flask"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.http = None
+        self.single_flight = AsyncSingleFlight()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            await self.fallback(scope, receive, send)
+            return
+
+        path, method = scope['path'], scope['method']
+        if path == '/api/config-json' and method == 'GET':
+            response = await self.config_json()
+        elif path == '/api/proxy-stats' and method == 'GET':
+            response = await self.proxy_stats()
+        elif path == '/api/templates' and method in ('GET', 'POST'):
+            response = await self.templates(method, await _read_json(scope, receive, method == 'POST'),
+                                            _query_params(scope))
+        elif TEMPLATE_DETAIL_PATH.match(path) and method in ('GET', 'PUT', 'DELETE'):
+            # scope['path'] 已经由服务器解码过一次，不能再次 unquote（%252F 会变成 /）
+            template_id = TEMPLATE_DETAIL_PATH.match(path).group(1)
+            response = await self.template_detail(method, template_id,
+                                                  await _read_json(scope, receive, method == 'PUT'))
+        elif path == '/metrics' and method == 'GET':
+            await _send_body(send, 200, metrics.registry.render().encode('utf-8'),
+                             {'Content-Type': metrics.CONTENT_TYPE})
+            return
+        elif (path == '/api' or path.startswith('/api/')) and method in ('GET', 'POST'):
+            await self.proxy_and_send(scope, receive, send)
+            return
+        else:
+            await self.fallback(scope, receive, send)
+            return
+        await _send_response(send, scope, response)
+
+    async def proxy_and_send(self, scope, receive, send):
+        """处理 /api 代理请求并记录指标和访问日志"""
+        params = _query_params(scope)
+        action = proxy_action(scope['method'], scope['path'], params)
+        start = time.perf_counter()
+        with metrics.observe(metrics.PROXY_REQUESTS, metrics.PROXY_LATENCY, metrics.PROXY_IN_FLIGHT,
+                             action) as result:
+            response = await self.proxy(scope, receive, params, action)
+            result['status'] = await _send_response(send, scope, response)
+        cache_status = response[2].get('X-AIHCX-Cache') if len(response) > 2 else None
+        if cache_status:
+            metrics.PROXY_CACHE.inc(action=action, result=cache_status)
+        path = scope['path'] + ('?' + scope['query_string'].decode('latin-1') if scope['query_string'] else '')
+        log_access(scope['method'], path, action, result['status'], time.perf_counter() - start, cache_status)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.http = httpx.AsyncClient(
+                    timeout=UPSTREAM_TIMEOUT,
+                    limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                        max_keepalive_connections=MAX_CONNECTIONS))
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.http is not None:
+                    await self.http.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def config_json(self):
+        """为Vue应用提供JSON格式的配置API"""
+        cfg = await _run_sync(client_registry.config)
+        return {k: cfg.get(k) or '' for k in CONFIG_KEYS}, 200
+
+    async def proxy_stats(self):
+        """代理缓存等运行统计"""
+        transport = await _run_sync(client_registry.transport)
+        return {
+            'cache': response_cache.stats(),
+            'singleflight': self.single_flight.stats(),
+            'transport': transport.stats(),
+        }, 200
+
+    async def templates(self, method, template_data, params):
+        return await _run_sync(handle_templates, method, template_data, params)
+
+    async def template_detail(self, method, template_id, template_data):
+        return await _run_sync(handle_template_detail, method, template_id, template_data)
+
+    async def proxy(self, scope, receive, params, action):
+        """代理aihc api，透传请求（与 Flask 引擎的 proxy_aihc 行为一致）"""
+        try:
+            http_method = http_methods.GET if scope['method'] == 'GET' else http_methods.POST
+            body = json.dumps(await _read_json(scope, receive, True, default={}))
+            url_path = scope['path']
+            logger.debug('请求参数 %s %s', scope['method'], url_path,
+                         extra={'fields': {'action': action, 'params': params, 'body': body}})
+
+            if 'action' in params:
+                if not is_read_action(action):
+                    # 写操作（创建/停止/删除等）之后，已缓存的查询结果全部失效
+                    try:
+                        return await self.forward_action(http_method, params, body), 200
+                    finally:
+                        response_cache.invalidate()
+
+                key = await _run_sync(cache_key, action, params, body)
+
+                async def load():
+                    return (await self.single_flight.do(
+                        key, lambda: self.forward_action(http_method, params, body)))[0]
+
+                ttl = CACHE_TTLS.get(action)
+                if ttl is None:
+                    return await load(), 200
+                if 'no-cache' in _header(scope, b'cache-control'):
+                    # 客户端要求跳过缓存时强制回源，并用新结果刷新缓存
+                    response_cache.invalidate(lambda k: k == key)
+                result, cache_status = await response_cache.get_or_load_async(key, ttl, load)
+                return result, 200, {'X-AIHCX-Cache': cache_status}
+
+            elif '/v1/' in url_path or '/v2/' in url_path:
+                version = b'v1' if '/v1/' in url_path else b'v2'
+                if http_method == http_methods.GET:
+                    key = await _run_sync(cache_key, url_path, params, body)
+                    result, _ = await self.single_flight.do(
+                        key, lambda: self.forward_path(http_method, url_path, params, body, version))
+                    return result, 200
+                try:
+                    return await self.forward_path(http_method, url_path, params, body, version), 200
+                finally:
+                    response_cache.invalidate()
+            else:
+                return {'error': 'Not Found'}, 404
+        except Exception as e:
+            metrics.PROXY_ERRORS.inc(action=action, error=type(e).__name__)
+            logger.warning('代理请求失败: %s', e, extra={'fields': {'action': action, 'error': type(e).__name__}})
+            return {'error': str(e)}, 500
+
+    async def forward_action(self, http_method, params, body):
+        """按 action 参数透传请求"""
+        upstream = await _run_sync(build_action_request, http_method, params, body)
+        return await self._send(upstream, strip_metadata=params['action'] not in POOL_QUEUE_ACTIONS)
+
+    async def forward_path(self, http_method, url_path, params, body, version):
+        """按 /v1/、/v2/ 路径透传请求"""
+        upstream = await _run_sync(build_path_request, http_method, url_path, params, body, version)
+        return await self._send(upstream, strip_metadata=True)
+
+    async def _send(self, upstream, strip_metadata):
+        """经过限速、重试和熔断后发送请求，读取未解压的响应体，不做JSON解析"""
+        host, key, idempotent = upstream_route(upstream)
+        transport = await _run_sync(client_registry.transport)
+
+        async def send():
+            with metrics.observe(metrics.UPSTREAM_REQUESTS, metrics.UPSTREAM_LATENCY, metrics.UPSTREAM_IN_FLIGHT,
+                                 key) as result:
+                try:
+                    async with self.http.stream(upstream.method, upstream.url,
+                                                headers=upstream.headers, content=upstream.body) as response:
+                        content = b''.join([chunk async for chunk in response.aiter_raw()])
+                except httpx.TransportError as e:
+                    # 转换为 OSError，与同步引擎一样按连接失败重试
+                    raise ConnectionError(str(e) or type(e).__name__) from e
+                result['status'] = response.status_code
+            log_upstream(upstream, key, response.status_code, len(content))
+            return passthrough_upstream(response.status_code, response.headers, content, strip_metadata)
+
+        return await transport.call_async(host, key, send, idempotent=idempotent)
+
+def _query_params(scope) -> dict:
+    """解析 query 参数，同名参数取第一个值（与 Flask 的 request.args.to_dict() 一致）"""
+    params = {}
+    for k, v in urllib.parse.parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True):
+        params.setdefault(k, v)
+    return params
+
+def _header(scope, name: bytes) -> str:
+    for k, v in scope['headers']:
+        if k == name:
+            return v.decode('latin-1')
+    return ''
+
+async def _read_json(scope, receive, has_body, default=None):
+    """读取请求体并按JSON解析，内容类型不是JSON或解析失败时返回 default"""
+    if not has_body:
+        return default
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    content_type = _header(scope, b'content-type').split(';')[0].strip()
+    if not (content_type == 'application/json' or content_type.endswith('+json')):
+        return default
+    try:
+        return json.loads(b''.join(chunks))
+    except ValueError:
+        return default
+
+async def _send_response(send, scope, response) -> int:
+    """发送 (数据或 RawResponse, 状态码[, 响应头])，返回实际的状态码"""
+    if isinstance(response[0], RawResponse):
+        return await _send_raw(send, scope, *response)
+    return await _send_json(send, scope, *response)
+
+async def _send_json(send, scope, data, status, headers=None) -> int:
+    """本地生成的JSON响应：按 Accept-Encoding 压缩，GET 请求带 ETag 并支持 304"""
+    body, etag = json_body(data)
+    if scope['method'] != 'GET' or status != 200:
+        etag = None
+    not_modified, body, extra = negotiate(body, etag, _header(scope, b'accept-encoding'),
+                                          _header(scope, b'if-none-match'))
+    extra['Content-Type'] = 'application/json'
+    status = 304 if not_modified else status
+    await _send_body(send, status, body, dict(extra, **(headers or {})))
+    return status
+
+async def _send_raw(send, scope, raw, status, headers=None) -> int:
+    """把上游响应体原样（包括压缩格式）写回浏览器，只读请求支持 If-None-Match"""
+    if_none_match = None
+    if is_read_request(scope['method'], _query_params(scope)):
+        if_none_match = _header(scope, b'if-none-match')
+    status, body, raw_headers = raw.for_client(_header(scope, b'accept-encoding'), if_none_match)
+    await _send_body(send, status, body, dict(raw_headers, **(headers or {})))
+    return status
+
+async def _send_body(send, status, body, headers):
+    headers = dict(headers, **{'Content-Length': str(len(body)), 'Access-Control-Allow-Origin': '*'})
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _run_sync(fn, *args):
+    """在线程池中执行阻塞的文件读写和签名（读取配置会 stat 配置文件），避免阻塞事件循环"""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+def create_app():
+    """uvicorn 工厂函数：每个工作进程各自创建应用实例"""
+    from .webserver import app as flask_app
+    setup_logging()
+    app = AsyncProxyApp(WSGIMiddleware(flask_app))
+    register_metrics(app.single_flight)
+    return app
+
+def run_async_webserver(host='127.0.0.1', port=38765, workers=1, log_level=None, log_file=None, log_format=None):
+    # 工作进程由 uvicorn 启动，日志设置通过环境变量传递
+    export_env(log_level, log_file, log_format)
+    print(f"Web服务已启动（async 引擎，{workers} 个工作进程），请在浏览器中访问配置页面: http://{host}:{port}/config")
+    # 访问日志由 /api 代理自己输出（结构化、经队列异步写入），关闭 uvicorn 逐请求同步输出的访问日志
+    uvicorn.run('aihcx.asyncserver:create_app', factory=True, host=host, port=port,
+                workers=workers, log_level=(log_level or 'info').lower(), access_log=False)
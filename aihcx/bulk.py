@@ -0,0 +1,80 @@
+import re
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .client import client_registry, error_message, list_aijobs
+from .parallel import DEFAULT_WORKERS, imap_ordered
+from .transport import RateLimiter
+
+# 批量操作结果输出的列
+BULK_HEADERS = ['ID', 'NAME', 'RESULT', 'ATTEMPTS', 'SECONDS', 'ERROR']
+
+# 批量创建任务结果输出的列
+BATCH_CREATE_HEADERS = ['NAME', 'PARAMS', 'JOB_ID', 'RESULT', 'ATTEMPTS', 'SECONDS', 'ERROR']
+
+def call_with_retry(fn: Callable[[], object], limiter: RateLimiter, retries: Optional[int]):
+    """限速后调用 fn，返回 (结果, 尝试次数)；被限流时的退避重试由 transport 处理，这里只指定重试次数"""
+    limiter.acquire()
+    transport = client_registry.transport()
+    with transport.max_retries(retries):
+        try:
+            return fn(), transport.last_attempts
+        except Exception as e:
+            e.attempts = transport.last_attempts
+            raise
+
+def run_bulk(action: Callable[[Dict], object], rows: Iterable[Dict], workers: int = DEFAULT_WORKERS,
+             rate: Optional[float] = None, retries: Optional[int] = None) -> Iterable[Dict]:
+    """对每一行并发执行 action(行)，按输入顺序逐个产出结果行（BULK_HEADERS）
+
+    action 返回 dict 时合并到结果行中（如创建任务返回的任务ID），其他返回值忽略。
+    """
+    limiter = RateLimiter(rate, burst=max(1, workers))
+
+    def run_one(row):
+        start = time.monotonic()
+        extra = None
+        try:
+            extra, attempts = call_with_retry(lambda: action(row), limiter, retries)
+            result, error = 'OK', ''
+        except Exception as e:
+            attempts = getattr(e, 'attempts', 1)
+            result, error = 'FAILED', error_message(e)
+        return dict(row, **(extra if isinstance(extra, dict) else {}), RESULT=result, ATTEMPTS=attempts,
+                    SECONDS=f"{time.monotonic() - start:.2f}", ERROR=error)
+
+    return imap_ordered(run_one, rows, workers)
+
+def _parse_time(value) -> Optional[float]:
+    """解析接口返回的时间（如 2024-01-01T00:00:00Z），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def select_jobs(client, pool_id: str, statuses: Optional[List[str]] = None, name_pattern: Optional[str] = None,
+                created_before: Optional[float] = None, page_size: int = 100) -> List[Dict]:
+    """翻页查询资源池中的全部任务，按状态、名称正则和创建时间筛选"""
+    regex = re.compile(name_pattern) if name_pattern else None
+    rows, page = [], 1
+    while True:
+        jobs = list_aijobs(client, pool_id, page_no=page, page_size=page_size).result.jobs
+        for job in jobs:
+            if statuses and job.status not in statuses:
+                continue
+            if regex and not regex.search(job.name or ''):
+                continue
+            if created_before is not None:
+                created = _parse_time(getattr(job, 'createdAt', None))
+                if created is None or created >= created_before:
+                    continue
+            rows.append({'ID': job.jobId, 'NAME': job.name, 'STATUS': job.status})
+        if len(jobs) < page_size:
+            return rows
+        page += 1
@@ -0,0 +1,240 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# 缓存状态，用于响应头和统计
+HIT = 'HIT'
+STALE = 'STALE'
+MISS = 'MISS'
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'ttl')
+
+    def __init__(self, value, ttl: float, stale_ttl: float):
+        now = time.monotonic()
+        self.value = value
+        self.ttl = ttl
+        self.fresh_until = now + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+
+class ResponseCache:
+    """带TTL、LRU淘汰和 stale-while-revalidate 的进程内响应缓存
+
+    - 新鲜期内直接返回缓存
+    - 过期但仍在 stale 窗口内时返回旧值，并在后台线程中刷新
+    - 超出 stale 窗口视为未命中，同步加载
+    """
+
+    def __init__(self, maxsize: int = 512, stale_factor: float = 5.0):
+        self.maxsize = maxsize
+        self.stale_factor = stale_factor
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._refreshing = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def _lookup(self, key: Hashable):
+        """查找缓存条目，返回 (值, 缓存状态, 是否需要后台刷新, 当前代数)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.fresh_until:
+                    self._stats['hits'] += 1
+                    return entry.value, HIT, False, self._generation
+                self._stats['stale_hits'] += 1
+                refresh = key not in self._refreshing
+                if refresh:
+                    self._refreshing.add(key)
+                return entry.value, STALE, refresh, self._generation
+            self._stats['misses'] += 1
+            return None, MISS, False, self._generation
+
+    def get_or_load(self, key: Hashable, ttl: float, loader: Callable[[], Any]) -> Tuple[Any, str]:
+        """读取缓存，未命中时调用 loader 加载；返回 (值, 缓存状态)"""
+        value, status, refresh, generation = self._lookup(key)
+        if status == MISS:
+            value = loader()
+            self._store(key, value, ttl, generation)
+        elif refresh:
+            threading.Thread(target=self._refresh, args=(key, ttl, loader, generation), daemon=True).start()
+        return value, status
+
+    async def get_or_load_async(self, key: Hashable, ttl: float,
+                                loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """get_or_load 的协程版本，loader 为协程函数，后台刷新在事件循环中执行"""
+        value, status, refresh, generation = self._lookup(key)
+        if status == MISS:
+            value = await loader()
+            self._store(key, value, ttl, generation)
+        elif refresh:
+            asyncio.ensure_future(self._refresh_async(key, ttl, loader, generation))
+        return value, status
+
+    def _refresh(self, key: Hashable, ttl: float, loader: Callable[[], Any], generation: int):
+        """后台刷新过期条目"""
+        try:
+            self._store(key, loader(), ttl, generation)
+            self._refresh_done(key, True)
+        except Exception:
+            self._refresh_done(key, False)
+
+    async def _refresh_async(self, key: Hashable, ttl: float,
+                             loader: Callable[[], Awaitable[Any]], generation: int):
+        try:
+            self._store(key, await loader(), ttl, generation)
+            self._refresh_done(key, True)
+        except Exception:
+            self._refresh_done(key, False)
+
+    def _refresh_done(self, key: Hashable, ok: bool):
+        # 刷新失败时保留旧值，等 stale 窗口结束后自然失效
+        with self._lock:
+            self._stats['refreshes' if ok else 'refresh_errors'] += 1
+            self._refreshing.discard(key)
+
+    def _store(self, key: Hashable, value: Any, ttl: float, generation: int):
+        with self._lock:
+            # 加载期间发生过失效（如有写操作），丢弃这次结果避免写回旧数据
+            if generation != self._generation:
+                return
+            self._entries[key] = _Entry(value, ttl, ttl * self.stale_factor)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """使缓存失效；不传 predicate 时清空全部"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['maxsize'] = self.maxsize
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+class _Call:
+    __slots__ = ('done', 'value', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """请求合并：相同 key 的并发调用只执行一次，其余调用等待并共享结果"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'executions': 0,
+            'coalesced': 0,
+            'errors': 0,
+        }
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行 fn 或等待进行中的同 key 调用；返回 (结果, 是否为共享结果)"""
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    def stats(self) -> Dict[str, Any]:
+        """返回请求合并统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+class _AsyncCall:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: 'asyncio.Future'):
+        self.task = task
+        self.waiters = 0
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight 的协程版本，供异步服务引擎在单个事件循环内使用
+
+    fn 在独立的 task 中执行，发起调用的协程被取消（如客户端断开）不影响其余等待者；
+    所有等待者都取消后才取消该 task。
+    """
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        self._stats['calls'] += 1
+        call = self._calls.get(key)
+        shared = call is not None and not call.task.done()
+        if shared:
+            self._stats['coalesced'] += 1
+        else:
+            self._stats['executions'] += 1
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def _finish(self, key: Hashable, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 取出异常，没有等待者时避免 "exception was never retrieved" 警告
+        if not call.task.cancelled() and call.task.exception() is not None:
+            self._stats['errors'] += 1
@@ -0,0 +1,174 @@
+"""资源池容量汇总（aihcx pool capacity）
+
+并发拉取各资源池的节点和队列：每个列表先取第一页，得到总数后其余分页也并发拉取。
+响应体直接解析为 dict，每页只抽取需要的字段追加到按列存放的数组中，再按资源池、可用区、GPU型号分组求和，
+节点很多时不为每个节点构造 Expando 对象或中间 dict。
+"""
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from .client import get_result_json, get_total
+from .parallel import DEFAULT_WORKERS, imap_ordered
+
+# 分页大小
+PAGE_SIZE = 100
+
+# 节点的 GPU 型号字段，按顺序取第一个存在的
+GPU_MODEL_KEYS = ('gpuType', 'acceleratorType', 'gpuModel', 'gpuProduct')
+
+# 可调度的节点状态（小写），其余状态节点上的空闲GPU不计入 GPU_FREE
+READY_PHASES = ('ready', 'running')
+
+# 可选的分组维度及名称
+GROUP_BY = {'pool': '资源池', 'zone': '可用区', 'model': 'GPU型号', 'queue': '队列'}
+
+CAPACITY_HEADERS = ['GROUP_BY', 'KEY', 'NODES', 'NOT_READY', 'GPU_TOTAL', 'GPU_ALLOCATED', 'GPU_FREE', 'GPU_UTIL']
+
+# 列表接口的路径和响应中的列表字段
+LISTS = {
+    'nodes': ('/api/v1/resourcepools/{}/nodes', 'nodes'),
+    'queues': ('/api/v1/resourcepools/{}/queue', 'queues'),
+}
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def gpu_quantity(resources) -> float:
+    """队列资源（capability/allocated 等）中的GPU数：accelerators 下的全部数量，以及名称含 gpu 的资源"""
+    if not isinstance(resources, dict):
+        return 0.0
+    total = 0.0
+    for key, value in resources.items():
+        if key == 'accelerators' and isinstance(value, dict):
+            total += sum(_number(v) for v in value.values())
+        elif isinstance(value, dict):
+            total += gpu_quantity(value)
+        elif 'gpu' in key.lower():
+            total += _number(value)
+    return total
+
+class NodeColumns:
+    """节点的列式数据，每列一个数组，下标对应同一个节点"""
+
+    def __init__(self):
+        self.pool: List[str] = []
+        self.zone: List[str] = []
+        self.model: List[str] = []
+        self.ready = array('b')
+        self.gpu_total = array('l')
+        self.gpu_allocated = array('l')
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def extend(self, pool_id: str, nodes: List[Dict]):
+        """追加一页节点；字段名可能带空白，每页按第一个节点解析一次真实字段名"""
+        if not nodes:
+            return
+        keys = {k.strip(): k for k in nodes[0]}
+        zone, total, allocated, phase = (keys.get(k, k) for k in ('zone', 'gpuTotal', 'gpuAllocated', 'statusPhase'))
+        model = next((keys[k] for k in GPU_MODEL_KEYS if k in keys), None)
+        self.pool.extend([pool_id] * len(nodes))
+        self.zone.extend([n.get(zone) or '-' for n in nodes])
+        self.model.extend([(n.get(model) if model else None) or '-' for n in nodes])
+        self.ready.extend([str(n.get(phase, '')).lower() in READY_PHASES for n in nodes])
+        self.gpu_total.extend([int(_number(n.get(total))) for n in nodes])
+        self.gpu_allocated.extend([int(_number(n.get(allocated))) for n in nodes])
+
+    def group(self, column: str) -> List[Dict]:
+        """按某一列分组求和，最后一行为合计"""
+        sums: Dict[str, List[int]] = {}
+        for key, ready, total, allocated in zip(getattr(self, column), self.ready, self.gpu_total, self.gpu_allocated):
+            acc = sums.get(key)
+            if acc is None:
+                acc = sums[key] = [0, 0, 0, 0, 0]
+            acc[0] += 1
+            acc[2] += total
+            acc[3] += allocated
+            if ready:
+                acc[4] += max(0, total - allocated)
+            else:
+                acc[1] += 1
+        totals = [sum(col) for col in zip(*sums.values())] if sums else [0] * 5
+        return [capacity_row(column, key, *acc) for key, acc in sorted(sums.items())] + \
+            [capacity_row(column, 'TOTAL', *totals)]
+
+def capacity_row(group_by: str, key: str, nodes, not_ready, total, allocated, free) -> Dict:
+    return {
+        'GROUP_BY': group_by,
+        'KEY': key,
+        'NODES': nodes,
+        'NOT_READY': not_ready,
+        'GPU_TOTAL': total,
+        'GPU_ALLOCATED': allocated,
+        'GPU_FREE': free,
+        'GPU_UTIL': f"{allocated / total:.0%}" if total else '-',
+    }
+
+def queue_capacity_rows(pool_id: str, queues: List[Dict]) -> List[Dict]:
+    """队列的GPU配额（capability）和已分配量"""
+    rows = []
+    for queue in queues:
+        total = gpu_quantity(queue.get('capability'))
+        allocated = gpu_quantity(queue.get('allocated'))
+        row = capacity_row('queue', f"{pool_id}/{queue.get('name')}", '', '', _compact(total), _compact(allocated),
+                           _compact(max(0.0, total - allocated)))
+        rows.append(row)
+    return rows
+
+def _compact(value: float):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+def fetch_pages(client, tasks: Iterable[Tuple[str, str]], workers: int = DEFAULT_WORKERS):
+    """并发拉取 (列表类型, 资源池ID) 的全部分页，逐页产出 (列表类型, 资源池ID, 条目或异常)
+
+    第一页返回总数后其余分页一次性并发拉取；接口未返回总数时逐页向后拉取，直到某页不满。
+    """
+    def fetch(task):
+        kind, pool_id, page = task
+        path = LISTS[kind][0]
+        try:
+            result = get_result_json(client, path.format(pool_id), {
+                'orderBy': 'createdAt', 'order': 'desc', 'pageNo': page, 'pageSize': PAGE_SIZE})
+        except Exception as e:
+            return task, None, e
+        return task, result, None
+
+    pending = [(kind, pool_id, 1) for kind, pool_id in tasks]
+    while pending:
+        following = []
+        for (kind, pool_id, page), result, error in imap_ordered(fetch, pending, workers):
+            if error is not None:
+                yield kind, pool_id, error
+                continue
+            items = result.get(LISTS[kind][1]) or []
+            yield kind, pool_id, items
+            total = get_total(result)
+            if total is None:
+                if len(items) >= PAGE_SIZE:
+                    following.append((kind, pool_id, page + 1))
+            elif page == 1:
+                pages = -(-total // PAGE_SIZE)
+                following.extend((kind, pool_id, p) for p in range(2, pages + 1))
+        pending = following
+
+def collect_capacity(client, pool_ids: List[str], group_by: List[str], workers: int = DEFAULT_WORKERS):
+    """拉取并汇总容量，返回 (按 group_by 顺序的行, 失败的资源池及异常)"""
+    kinds = (['nodes'] if set(group_by) - {'queue'} else []) + (['queues'] if 'queue' in group_by else [])
+    nodes = NodeColumns()
+    queues: List[Dict] = []
+    errors: Dict[str, Exception] = {}
+    for kind, pool_id, items in fetch_pages(client, [(k, p) for p in pool_ids for k in kinds], workers):
+        if isinstance(items, Exception):
+            errors.setdefault(pool_id, items)
+        elif kind == 'nodes':
+            nodes.extend(pool_id, items)
+        else:
+            queues.extend(queue_capacity_rows(pool_id, items))
+    rows = []
+    for column in group_by:
+        rows.extend(sorted(queues, key=lambda r: r['KEY'].split('/', 1)) if column == 'queue' else nodes.group(column))
+    return rows, errors
@@ -1,12 +1,72 @@
+import importlib
+import time
 import click
-from . import commands
 import os
 from . import __version__  # 导入版本号
+from . import timing
 
-@click.group()
-def cli():
+# 实际执行的命令路径（如 ['job', 'get']）在 ctx.meta 中的键；每次调用一份，daemon 多线程并发执行命令时互不影响
+COMMAND_PATH = 'aihcx.command_path'
+
+class LazyGroup(click.Group):
+    """按需加载子命令的命令组
+
+    子命令以 "模块:属性" 的形式登记，只有执行、补全或查看帮助时才导入对应模块，
+    这样 `aihcx version`、shell补全等不会为用不到的依赖付出导入开销。
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module_name, attr = self.lazy_commands[cmd_name].split(':')
+            start = time.perf_counter()
+            command = getattr(importlib.import_module(module_name), attr)
+            timing.record_import(module_name, time.perf_counter() - start)
+            self.add_command(command, name=cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def resolve_command(self, ctx, args):
+        cmd_name, cmd, args = super().resolve_command(ctx, args)
+        # 记录实际执行的命令路径，用于耗时报告
+        ctx.meta.setdefault(COMMAND_PATH, []).append(cmd_name)
+        return cmd_name, cmd, args
+
+@click.group(cls=LazyGroup, lazy_commands={
+    # 配置命令放在顶层
+    'config': 'aihcx.commands:config',
+    'web': 'aihcx.commands:web',
+    'sync': 'aihcx.commands:sync',
+})
+@click.option('--timing', 'show_timing', is_flag=True, help='命令结束时在标准错误输出各阶段耗时')
+@click.option('--timing-format', type=click.Choice(['text', 'json']),
+              help='耗时报告格式（指定时即开启 --timing），json 为每个阶段一行JSON')
+@click.option('--profile-out', type=click.Path(dir_okay=False),
+              help='用 cProfile 剖析本次命令，结果写入该文件（与配置的 profile 无关）')
+@click.pass_context
+def cli(ctx, show_timing, timing_format, profile_out):
     """AI训练平台命令行工具"""
-    pass
+    if profile_out:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+        def dump_profile():
+            profiler.disable()
+            profiler.dump_stats(profile_out)
+            click.echo(f"性能剖析结果已写入 {profile_out}，可用 python -m pstats {profile_out} 查看", err=True)
+
+        ctx.call_on_close(dump_profile)
+        profiler.enable()
+    if show_timing or timing_format:
+        timing.enable()
+        ctx.call_on_close(lambda: timing.report(' '.join(['aihcx'] + ctx.meta.get(COMMAND_PATH, [])),
+                                                timing_format or 'text'))
 
 @cli.command()
 def version():
@@ -36,59 +96,80 @@ eval "$(_AIHCX_COMPLETE=zsh_source aihcx)"
 eval (env _AIHCX_COMPLETE=fish_source aihcx)
 """)
 
+@cli.command(name='completion-refresh', hidden=True)
+@click.argument('kind', type=click.Choice(['pool', 'queue', 'job', 'pod']))
+@click.argument('scope', required=False, default='')
+def completion_refresh(kind, scope):
+    """刷新本地补全索引（由补全和列表命令在后台调用）"""
+    from .completion import refresh
+    refresh(kind, scope)
+
 # 创建job子命令组
-@cli.group()
+@cli.group(cls=LazyGroup, lazy_commands={
+    'list': 'aihcx.commands:list_job',
+    'get': 'aihcx.commands:get_job',
+    'create': 'aihcx.commands:create_job',
+    'delete': 'aihcx.commands:delete_job',
+    'update': 'aihcx.commands:update_job',
+    'stop': 'aihcx.commands:stop_job',
+    'status': 'aihcx.commands:get_job_status',
+    'watch': 'aihcx.commands:job_watch',
+    'logs': 'aihcx.commands:job_logs',
+    'exec': 'aihcx.commands:job_exec',
+    'export': 'aihcx.commands:job_export',
+    'pods': 'aihcx.commands:list_pod',
+    'events': 'aihcx.commands:job_events',
+    'query': 'aihcx.commands:job_query',
+})
 def job():
     """训练任务管理"""
     pass
 
 # 创建pool子命令组
-@cli.group()
+@cli.group(cls=LazyGroup, lazy_commands={
+    'list': 'aihcx.commands:list_pool',
+    'get': 'aihcx.commands:get_pool',
+    'capacity': 'aihcx.commands:pool_capacity',
+    'set': 'aihcx.commands:set_pool',
+})
 def pool():
     """资源池管理"""
     pass
 
 # 创建queue子命令组
-@cli.group()
+@cli.group(cls=LazyGroup, lazy_commands={
+    'list': 'aihcx.commands:list_queue',
+    'get': 'aihcx.commands:get_queue',
+})
 def queue():
     """队列管理"""
     pass
 
 # 创建node子命令组
-@cli.group()
+@cli.group(cls=LazyGroup, lazy_commands={
+    'list': 'aihcx.commands:list_node',
+})
 def node():
     """节点管理"""
     pass
 
-# 将命令添加到job子命令组
-job.add_command(commands.list_job, name='list')
-job.add_command(commands.get_job, name='get')
-job.add_command(commands.create_job, name='create')
-job.add_command(commands.delete_job, name='delete')
-job.add_command(commands.update_job, name='update')
-job.add_command(commands.stop_job, name='stop')
-job.add_command(commands.get_job_status, name='status')
-job.add_command(commands.job_logs, name='logs')
-job.add_command(commands.job_exec, name='exec')
-job.add_command(commands.job_export, name='export')
-job.add_command(commands.list_pod, name='pods')
-job.add_command(commands.job_events, name='events')
-
-# 将命令添加到pool子命令组
-pool.add_command(commands.list_pool, name='list') 
-pool.add_command(commands.get_pool, name='get')
-pool.add_command(commands.set_pool, name='set')  # 添加set命令
-
-# 将命令添加到queue子命令组
-queue.add_command(commands.list_queue, name='list')
-queue.add_command(commands.get_queue, name='get')
-
-# 将命令添加到node子命令组
-node.add_command(commands.list_node, name='list')
-
-# 配置命令放在顶层
-cli.add_command(commands.config)
-cli.add_command(commands.web)
+# 创建daemon子命令组
+@cli.group(cls=LazyGroup, lazy_commands={
+    'start': 'aihcx.commands:daemon_start',
+    'stop': 'aihcx.commands:daemon_stop',
+    'status': 'aihcx.commands:daemon_status',
+})
+def daemon():
+    """常驻后台进程，加速重复执行的只读命令"""
+    pass
+
+# 创建template子命令组
+@cli.group(cls=LazyGroup, lazy_commands={
+    'consolidate': 'aihcx.commands:template_consolidate',
+})
+def template():
+    """任务模板管理"""
+    pass
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,24 +1,49 @@
+import contextlib
 import json
+import os
+import threading
+import urllib.parse
 from pathlib import Path
-from typing import Optional
-from baidubce.bce_client_configuration import BceClientConfiguration
-from baidubce.auth.bce_credentials import BceCredentials
-from baidubce.services.aihc.aihc_client import AIHCClient
-
-def expando_to_dict(obj):
-    if isinstance(obj, dict):
-        return {k: expando_to_dict(v) for k, v in obj.items()}
-    elif hasattr(obj, '__dict__'):
-        return {k: expando_to_dict(v) for k, v in obj.__dict__.items()}
-    elif isinstance(obj, list):
-        return [expando_to_dict(item) for item in obj]
-    else:
-        return obj
+from typing import TYPE_CHECKING, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只使用进程内的锁
+    fcntl = None
+
+from . import timing
+from .transport import Transport, endpoint_key, error_status, transport_settings
+
+# SDK 和 requests 导入较慢，只在真正发请求时才导入，读配置、补全等不受影响
+if TYPE_CHECKING:
+    import requests
+    from baidubce.services.aihc.aihc_client import AIHCClient
+
+# Web界面和 /api/config-json 暴露的配置项
+CONFIG_KEYS = ['host', 'access_key', 'secret_key', 'pool', 'queue', 'path']
+
+# 默认配置（配置文件顶层的配置项）对应的 profile 名称
+DEFAULT_PROFILE = 'default'
+
+# 临时切换 profile 的环境变量，优先于配置文件中的 current_profile
+PROFILE_ENV = 'AIHCX_PROFILE'
+
+# 配置文件顶层保存 profile 信息的键，不作为配置项
+_PROFILE_KEYS = ('profiles', 'current_profile')
 
 class AIJobConfig:
+    """~/.aijob/config.json 中的配置
+
+    顶层配置项为 default profile；profiles 中保存其它命名 profile（如不同地域、账号），
+    未设置的配置项沿用顶层的值。读取时按 AIHCX_PROFILE 或 current_profile 选择 profile，
+    切换不需要重新读文件。写入用 update() 一次完成：持有文件锁重新读取文件、合并修改，
+    再写临时文件并 fsync 后原子替换，CLI 和 Web 服务同时写入时不会丢失对方的修改。
+    """
+
     def __init__(self):
         self.config_dir = Path.home() / '.aijob'
         self.config_file = self.config_dir / 'config.json'
+        self._lock = threading.Lock()
         self._ensure_config_dir()
         self.config = self._load_config()
     
@@ -32,38 +57,468 @@ class AIJobConfig:
             with open(self.config_file) as f:
                 return json.load(f)
         return {}
-    
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """进程内的锁加上配置目录下 config.json.lock 的文件锁（不支持 fcntl 的系统上只有进程内的锁）"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.config_dir / 'config.json.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, data: dict):
+        """写临时文件并 fsync 后原子替换配置文件，保留原文件的权限（新建时仅当前用户可读写）"""
+        import tempfile
+
+        try:
+            mode = os.stat(self.config_file).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o600
+        fd, tmp_path = tempfile.mkstemp(dir=self.config_dir, prefix='.config.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(self.config_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _modify(self, fn):
+        """在文件锁内重新读取配置文件，调用 fn 修改后写回一次"""
+        with self._file_lock():
+            data = self._load_config()
+            fn(data)
+            self._write(data)
+            self.config = data
+
     def save(self):
-        """保存配置到文件"""
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        """把当前内存中的配置整体写入文件（会覆盖其它进程的修改，修改配置项请用 update）"""
+        with self._file_lock():
+            self._write(self.config)
+
+    @property
+    def profile_name(self) -> str:
+        """当前使用的 profile"""
+        return os.environ.get(PROFILE_ENV) or self.config.get('current_profile') or DEFAULT_PROFILE
+
+    def profiles(self) -> List[str]:
+        """全部 profile 名称，default 在最前"""
+        return [DEFAULT_PROFILE] + sorted(self.config.get('profiles') or {})
+
+    def has_profile(self, name: str) -> bool:
+        return name == DEFAULT_PROFILE or name in (self.config.get('profiles') or {})
+
+    def update(self, profile: Optional[str] = None, **values):
+        """一次写入多个配置项（值为 None 时删除该项），profile 默认为当前 profile，不存在时新建"""
+        if not values:
+            return
+        profile = profile or self.profile_name
+
+        def apply(data):
+            target = data if profile == DEFAULT_PROFILE else data.setdefault('profiles', {}).setdefault(profile, {})
+            for key, value in values.items():
+                if key in _PROFILE_KEYS:
+                    raise ValueError(f"{key} 不是配置项")
+                if value is None:
+                    target.pop(key, None)
+                else:
+                    target[key] = value
+        self._modify(apply)
+
+    def use(self, profile: str):
+        """切换配置文件中的当前 profile"""
+        if not self.has_profile(profile):
+            raise ValueError(f"profile 不存在: {profile}，可选: {', '.join(self.profiles())}")
+
+        def apply(data):
+            if profile == DEFAULT_PROFILE:
+                data.pop('current_profile', None)
+            else:
+                data['current_profile'] = profile
+        self._modify(apply)
     
     def set(self, key: str, value: str):
         """设置配置项"""
-        self.config[key] = value
-        self.save()
+        self.update(**{key: value})
     
-    def get(self, key: str) -> Optional[str]:
-        """获取配置项"""
+    def get(self, key: str, profile: Optional[str] = None) -> Optional[str]:
+        """获取配置项：先取 profile 中的值，未设置时取顶层的值"""
+        if key in _PROFILE_KEYS:
+            return None
+        profile = profile or self.profile_name
+        if profile != DEFAULT_PROFILE:
+            value = ((self.config.get('profiles') or {}).get(profile) or {}).get(key)
+            if value is not None:
+                return value
         return self.config.get(key)
-    
-def expando_to_dict(obj):
-    if isinstance(obj, dict):
-        return {k: expando_to_dict(v) for k, v in obj.items()}
-    elif hasattr(obj, '__dict__'):
-        return {k: expando_to_dict(v) for k, v in obj.__dict__.items()}
-    elif isinstance(obj, list):
-        return [expando_to_dict(item) for item in obj]
+
+# 每个 (协议, host, port, 代理) 最多保留的空闲连接数
+POOL_MAXSIZE = 32
+
+class _ConnectionPool:
+    """HTTP keep-alive 连接池，按 (协议, host, port, 代理) 分组复用空闲连接"""
+
+    def __init__(self, maxsize: int = POOL_MAXSIZE):
+        self.maxsize = maxsize
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, factory):
+        """取出一个空闲连接，没有则新建"""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn._pool_idle = False
+                return conn
+        conn = factory()
+        conn._pool = self
+        conn._pool_key = key
+        conn._pool_idle = False
+        return conn
+
+    def release(self, conn):
+        """归还连接，超过上限时直接关闭；已在连接池中的连接不重复归还"""
+        with self._lock:
+            if conn._pool_idle:
+                return
+            idle = self._idle.setdefault(conn._pool_key, [])
+            if len(idle) < self.maxsize:
+                conn._pool_idle = True
+                idle.append(conn)
+                return
+        conn.discard()
+
+    def clear(self):
+        """关闭并丢弃全部空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.discard()
+
+class _PooledConnectionMixin:
+    """成功（2xx）的响应读取完毕并关闭后，自动把连接归还连接池
+
+    错误响应不归还：SDK 在错误分支里还会调用 conn.close()，如果连接已经归还，可能关掉其它线程正在使用的连接。
+    已归还（空闲）的连接忽略 close()，只能由连接池关闭。
+    """
+
+    def close(self):
+        if getattr(self, '_pool_idle', False):
+            return
+        super().close()
+
+    def discard(self):
+        """连接池关闭空闲连接"""
+        super().close()
+
+    def getresponse(self):
+        response = super().getresponse()
+        close = response.close
+        if timing.enabled():
+            read = response.read
+
+            def counting_read(*args):
+                data = read(*args)
+                timing.add_bytes(len(data))
+                return data
+
+            response.read = counting_read
+
+        def close_and_release():
+            # 只有成功且响应体已完整读取时连接才是干净的（conn.close() 时 sock 已置空），否则丢弃该连接
+            clean = response.isclosed() and 200 <= response.status < 300 and self.sock is not None
+            close()
+            if clean:
+                self._pool.release(self)
+            else:
+                self.close()
+
+        response.close = close_and_release
+        return response
+
+_pooled_classes = {}
+
+def _pooled_connection_class(base):
+    """为 http.client 的连接类派生带连接池归还逻辑的子类（首次使用时才创建）"""
+    conn_class = _pooled_classes.get(base)
+    if conn_class is None:
+        conn_class = _pooled_classes[base] = type('Pooled' + base.__name__, (_PooledConnectionMixin, base), {})
+    return conn_class
+
+_connection_pool = _ConnectionPool()
+
+def _get_pooled_connection(protocol, host, port, connection_timeout_in_millis, proxy_host=None, proxy_port=None):
+    """替代 SDK 的 bce_http_client._get_connection，从连接池中获取连接"""
+    import http.client
+    from baidubce import compat
+    from baidubce import protocol as bce_protocol
+
+    host = compat.convert_to_string(host)
+    if protocol.name == bce_protocol.HTTP.name:
+        conn_class = _pooled_connection_class(http.client.HTTPConnection)
+    elif protocol.name == bce_protocol.HTTPS.name:
+        conn_class = _pooled_connection_class(http.client.HTTPSConnection)
     else:
-        return obj
-
-def get_client(host: Optional[str]=None, access_key: Optional[str]=None, secret_key: Optional[str]=None) -> AIHCClient:
-    """创建API客户端"""
-    config = AIJobConfig()
-    host = host or config.get('host')
-    access_key = access_key or config.get('access_key')
-    secret_key = secret_key or config.get('secret_key')
-    aihc_config = BceClientConfiguration(credentials=BceCredentials(access_key, secret_key), endpoint=host)
-    client: AIHCClient = AIHCClient(aihc_config)
-    return client
+        raise ValueError('Invalid protocol: %s, either HTTP or HTTPS is expected.' % protocol)
+
+    def factory():
+        timeout = connection_timeout_in_millis / 1000
+        if proxy_host and proxy_port:
+            conn = conn_class(host=proxy_host, port=proxy_port, timeout=timeout)
+            conn.set_tunnel(host, port)
+            return conn
+        return conn_class(host=host, port=port, timeout=timeout)
+
+    return _connection_pool.acquire((protocol.name, host, port, proxy_host, proxy_port), factory)
+
+def _new_http_session() -> 'requests.Session':
+    """创建带连接池的 requests 会话，供 V2 接口（AihcClient）复用"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+_sdk_send_request = None
+
+def _send_request_with_transport(config, sign_function, response_handler_functions, http_method, path, body,
+                                 headers, params, *args, **kwargs):
+    """替代 SDK 的 bce_http_client.send_request，每个请求经过限速、重试和熔断"""
+    host = config.endpoint.decode() if isinstance(config.endpoint, bytes) else str(config.endpoint)
+    # 与代理请求一样按 host:port 熔断
+    host = urllib.parse.urlsplit(host).netloc if '://' in host else host
+    # 带 clientToken 的创建请求是幂等的，可以放心重试
+    idempotent = http_method != b'POST' or 'clientToken' in (params or {})
+    key = endpoint_key(http_method, path, params)
+    if timing.enabled():
+        # 最后一个处理函数是 body_parser，单独计时响应解码
+        response_handler_functions = response_handler_functions[:-1] + [
+            timing.timed('decode')(response_handler_functions[-1])]
+    transport = client_registry.transport()
+    with timing.span('request', action=key) as fields:
+        try:
+            response = transport.call(
+                host, key,
+                lambda: _sdk_send_request(config, sign_function, response_handler_functions, http_method, path,
+                                          body, headers, params, *args, **kwargs),
+                idempotent=idempotent)
+            fields['status'] = 200
+            return response
+        except Exception as e:
+            fields['status'] = error_status(e)
+            raise
+        finally:
+            fields['attempts'] = transport.last_attempts
+            fields['bytes'] = timing.take_bytes()
+
+class _TransportSession:
+    """AihcClient 的 V2 请求通过模块级 requests.get/post 发送，替换为共享会话并经过限速、重试和熔断"""
+
+    def __init__(self, session: 'requests.Session'):
+        self.session = session
+
+    def __getattr__(self, method: str):
+        def request(url, **kwargs):
+            split = urllib.parse.urlsplit(url)
+            params = dict(urllib.parse.parse_qsl(split.query))
+            key = endpoint_key(method, split.path, params)
+            transport = client_registry.transport()
+            with timing.span('request', action=key) as fields:
+                response = transport.call(
+                    split.netloc, key, lambda: self.session.request(method, url, **kwargs),
+                    idempotent=method != 'post' or params.get('action', '').startswith(('Describe', 'Get')),
+                    status_of=lambda response: response.status_code)
+                fields.update(status=response.status_code, bytes=len(response.content),
+                              attempts=transport.last_attempts)
+            return response
+        return request
+
+_keepalive_installed = False
+
+def enable_keepalive():
+    """让 SDK 发出的请求复用 keep-alive 连接，并经过限速、重试和熔断（进程内只安装一次）"""
+    global _keepalive_installed, _sdk_send_request
+    if _keepalive_installed:
+        return
+    from baidubce.http import bce_http_client
+    from baidubce.services.aihc.base import aihc_request as _aihc_request_module
+
+    bce_http_client._get_connection = _get_pooled_connection
+    _sdk_send_request = bce_http_client.send_request
+    bce_http_client.send_request = _send_request_with_transport
+    _aihc_request_module.requests = _TransportSession(_new_http_session())
+    _keepalive_installed = True
+
+def _config_signature(config_file: Path):
+    """配置文件的 (mtime, size)，文件不存在时返回 None"""
+    try:
+        stat = os.stat(config_file)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class ClientRegistry:
+    """进程级API客户端注册表
+
+    按 (host, AK, SK, API版本) 缓存客户端实例并共享 keep-alive 连接池，
+    配置文件发生变化时自动重新加载配置并清空已缓存的客户端。
+    """
+
+    # API版本与客户端类型（baidubce.services.aihc.aihc_client 中的类名）的对应关系
+    CLIENT_CLASSES = {
+        'v1': 'AIHCClient',
+        'v2': 'AihcClient',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._config = None
+        self._config_signature = None
+        self._transport = None
+
+    def config(self) -> AIJobConfig:
+        """返回当前配置，仅在配置文件变化时重新读取"""
+        config_file = Path.home() / '.aijob' / 'config.json'
+        signature = _config_signature(config_file)
+        with self._lock:
+            if self._config is None or signature != self._config_signature:
+                with timing.span('config'):
+                    self._config = AIJobConfig()
+                self._config_signature = signature
+                self._clients.clear()
+                _connection_pool.clear()
+            return self._config
+
+    def transport(self) -> Transport:
+        """返回共享的限速/重试/熔断层，相关配置变化时按新参数重建"""
+        settings = transport_settings(self.config())
+        with self._lock:
+            if self._transport is None or self._transport.settings != settings:
+                self._transport = Transport(settings)
+            return self._transport
+
+    def get(self, version: str = 'v1', host: Optional[str] = None,
+            access_key: Optional[str] = None, secret_key: Optional[str] = None):
+        """获取（必要时创建）指定版本的客户端"""
+        if version not in self.CLIENT_CLASSES:
+            raise ValueError(f"不支持的API版本: {version}")
+        config = self.config()
+        host = host or config.get('host')
+        access_key = access_key or config.get('access_key')
+        secret_key = secret_key or config.get('secret_key')
+        key = (host, access_key, secret_key, version)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                with timing.span('client', version=version):
+                    client = self._create_client(version, host, access_key, secret_key)
+                self._clients[key] = client
+            return client
+
+    def _create_client(self, version: str, host, access_key, secret_key):
+        """创建客户端（首次创建时导入SDK）"""
+        from baidubce.auth.bce_credentials import BceCredentials
+        from baidubce.bce_client_configuration import BceClientConfiguration
+        from baidubce.retry.retry_policy import NoRetryPolicy
+        from baidubce.services.aihc import aihc_client
+
+        enable_keepalive()
+        # 重试统一由 transport 处理（SDK 自带的重试策略不处理限流）
+        aihc_config = BceClientConfiguration(credentials=BceCredentials(access_key, secret_key), endpoint=host,
+                                             retry_policy=NoRetryPolicy())
+        return getattr(aihc_client, self.CLIENT_CLASSES[version])(aihc_config)
+
+    def clear(self):
+        """清空缓存的客户端和空闲连接"""
+        with self._lock:
+            self._clients.clear()
+            self._config = None
+            self._config_signature = None
+            self._transport = None
+        _connection_pool.clear()
+
+client_registry = ClientRegistry()
+
+def get_config() -> AIJobConfig:
+    """获取配置（进程内复用，配置文件修改后自动重新读取）"""
+    return client_registry.config()
+
+def get_client(host: Optional[str]=None, access_key: Optional[str]=None, secret_key: Optional[str]=None) -> 'AIHCClient':
+    """获取API客户端（进程内复用）"""
+    return client_registry.get('v1', host, access_key, secret_key)
+
+def list_aijobs(client: 'AIHCClient', resource_pool_id: str, page_no: int = 1, page_size: int = 50, order: str = 'desc'):
+    """分页查询任务列表（SDK 的 get_all_aijobs 固定按创建时间降序，这里支持指定排序方向）"""
+    from baidubce.http import http_methods
+    from baidubce.services.aihc import aihc_handler
+
+    params = {
+        "resourcePoolId": resource_pool_id,
+        "orderBy": "createdAt",
+        "order": order,
+        "pageNo": page_no,
+        "pageSize": page_size,
+    }
+    return client._send_request(http_methods.GET, b'/api/v1/aijobs',
+                                params=params,
+                                body_parser=aihc_handler.parse_json)
+
+def parse_raw_json(http_response, response):
+    """SDK body_parser：响应体用 json.loads 解析为普通 dict/list 放在 response.payload，
+    不转换为 Expando 对象，适合日志等大响应"""
+    body = http_response.read()
+    response.__dict__['payload'] = json.loads(body) if body else {}
+    http_response.close()
+    return True
+
+def request_json(client: 'AIHCClient', method: str, path: str, params: Optional[dict] = None,
+                 payload=None) -> dict:
+    """发送请求，响应的 result 字段直接解析为 dict，不构造 Expando 对象；payload 为 JSON 请求体"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    resp = client._send_request(method.encode(), path.encode('utf-8'), body=body, params=params,
+                                body_parser=parse_raw_json)
+    return resp.payload.get('result') or {}
+
+def get_result_json(client: 'AIHCClient', path: str, params: Optional[dict] = None) -> dict:
+    """GET 请求的 result 字段直接解析为 dict，不构造 Expando 对象（节点等大列表使用）"""
+    return request_json(client, 'GET', path, params)
+
+def get_aijob_dict(client: 'AIHCClient', resource_pool_id: str, job_id: str) -> dict:
+    """查询任务详情，响应体直接解析为 dict，不构造 Expando 对象树（Pod 很多时快得多）"""
+    return get_result_json(client, f'/api/v1/aijobs/{job_id}', {'resourcePoolId': resource_pool_id})
+
+def get_total(result) -> Optional[int]:
+    """列表接口返回的总条数（result 为 Expando 对象或 dict），接口未返回时为 None"""
+    for key in ('totalCount', 'total'):
+        total = result.get(key) if isinstance(result, dict) else getattr(result, key, None)
+        if total is not None:
+            return int(total)
+    return None
 
+def error_message(e: Exception) -> str:
+    """简短的错误信息：SDK 重试后抛出的异常取最后一次的原始错误"""
+    last_error = getattr(e, 'last_error', None)
+    message = str(last_error if last_error is not None else e)
+    return message.splitlines()[0] if message else type(e).__name__
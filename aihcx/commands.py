@@ -1,21 +1,37 @@
 import json
+import os
+import re
+import sys
 import click
 from typing import Optional, List, Tuple, Dict
-from .client import expando_to_dict, get_client, AIJobConfig
-from tabulate import tabulate
-import yaml
+from .client import (get_client, get_config, get_total, error_message,
+                     request_json, get_result_json, get_aijob_dict)
+from .completion import complete, record as record_completion
+from .output import ROW_FORMATS, DOC_FORMATS, get_row_writer, format_table, dump_yaml, write_document, prepend_column
+from .parallel import DEFAULT_WORKERS, imap_ordered
+from .watch import UNTIL_CONDITIONS, EXIT_TIMEOUT, TERMINAL_STATUSES, AdaptiveInterval, JobWatcher, discover_jobs
+from .logs import PREFIX_COLORS, LogFollower, parse_since
+from .bulk import BULK_HEADERS, BATCH_CREATE_HEADERS, run_bulk, select_jobs
+from .manifest import load_manifest, load_results, default_results_path
+from .transport import TRANSPORT_DEFAULTS, transport_settings
+from .capacity import GROUP_BY as CAPACITY_GROUP_BY, CAPACITY_HEADERS, collect_capacity
+from .history import GROUP_COLUMNS, JOB_QUERY_HEADERS, SYNC_HEADERS, TIME_FIELDS, HistoryStore, sync_pools
+from . import daemon
+from .records import JobRecord, PodRecord, iter_job_record_pages, list_job_records, pod_records
 import time
-import questionary
+import uuid
 from click.shell_completion import CompletionItem
-from .webserver import run_webserver
+
+# 详情类命令的 -o 选项
+doc_output_option = click.option('-o', '--output', default='yaml', type=click.Choice(DOC_FORMATS),
+                                 help='输出格式: yaml/json/jsonl')
 
 def get_pool_id(pool: Optional[str] = None) -> str:
     """获取资源池ID，优先使用参数传入的值，否则使用配置文件中的值"""
     if pool:
         return pool
         
-    config = AIJobConfig()
-    pool_id = config.get('pool')
+    pool_id = get_config().get('pool')
     if not pool_id:
         raise click.UsageError("需要指定资源池ID。可以通过 --pool 参数指定，或使用 'aihcctl config --pool <pool-id>' 设置默认值")
     return pool_id
@@ -60,23 +76,15 @@ def get_queue_options(pool_id: str) -> List[Tuple[str, str]]:
         ))
     return queues
 
+def _completion_items(kind: str, scope: str, incomplete: str) -> List[CompletionItem]:
+    """从本地补全索引查询候选值，索引过期时后台刷新，不阻塞补全"""
+    return [CompletionItem(value=value, help=help) for value, help in complete(kind, scope, incomplete)]
+
 def get_job_id_options(ctx, args, incomplete):
     """获取任务ID列表，用于自动补全"""
     try:
-        client = get_client()
-        pool_id = get_pool_id()
-        resp = client.get_all_aijobs(pool_id)
-        jobs = resp.result.jobs
-        
-        # 返回所有匹配前缀的任务ID
-        return [
-            CompletionItem(
-                value=job.jobId,
-                help=f"{job.name} ({job.status})"
-            )
-            for job in jobs
-            if job.jobId.startswith(incomplete)  # 这里实现了前缀匹配
-        ]
+        pool_id = get_pool_id(ctx.params.get('pool'))
+        return _completion_items('job', pool_id, incomplete)
     except Exception as e:
         # 出错时返回空列表
         print(f"Error getting completions: {e}", file=sys.stderr)
@@ -85,19 +93,7 @@ def get_job_id_options(ctx, args, incomplete):
 def get_pool_id_options(ctx, args, incomplete):
     """获取资源池ID列表，用于自动补全"""
     try:
-        client = get_client()
-        res = client.get_all_pools()
-        pools = res.result.resourcePools
-        
-        # 返回 CompletionItem 对象列表
-        return [
-            CompletionItem(
-                value=pool.metadata.id,
-                help=f"{pool.metadata.name} ({pool.status.phase})"
-            )
-            for pool in pools
-            if pool.metadata.id.startswith(incomplete)
-        ]
+        return _completion_items('pool', '', incomplete)
     except Exception as e:
         print(f"Error getting pool completions: {e}", file=sys.stderr)
         return []
@@ -105,19 +101,8 @@ def get_pool_id_options(ctx, args, incomplete):
 def get_queue_name_options(ctx, args, incomplete):
     """获取队列名称列表，用于自动补全"""
     try:
-        client = get_client()
-        pool_id = get_pool_id()
-        res = client.get_all_queues(resourcePoolId=pool_id)
-        queues = res.result.queues
-        
-        return [
-            CompletionItem(
-                value=queue.name,
-                help=f"{queue.queueType} ({queue.state})"
-            )
-            for queue in queues
-            if queue.name.startswith(incomplete)
-        ]
+        pool_id = get_pool_id(ctx.params.get('pool'))
+        return _completion_items('queue', pool_id, incomplete)
     except Exception as e:
         print(f"Error getting queue completions: {e}", file=sys.stderr)
         return []
@@ -125,24 +110,12 @@ def get_queue_name_options(ctx, args, incomplete):
 def get_pod_name_options(ctx, args, incomplete):
     """获取Pod名称列表，用于自动补全"""
     try:
-        client = get_client()
-        pool_id = get_pool_id()
+        pool_id = get_pool_id(ctx.params.get('pool'))
         # 需要从上下文中获取job_id
         job_id = ctx.params.get('id')
         if not job_id:
             return []
-            
-        resp = client.get_aijob(pool_id, job_id)
-        pods = resp.result.podList.pods
-        
-        return [
-            CompletionItem(
-                value=pod.objectMeta.name,
-                help=f"{pod.podStatus.status}"
-            )
-            for pod in pods
-            if pod.objectMeta.name.startswith(incomplete)
-        ]
+        return _completion_items('pod', f"{pool_id}/{job_id}", incomplete)
     except Exception as e:
         print(f"Error getting pod completions: {e}", file=sys.stderr)
         return []
@@ -154,7 +127,7 @@ def set_pool(id):
     
     如果不指定资源池ID，进入交互式选择模式
     """
-    config = AIJobConfig()
+    import questionary
 
     if not id:
         # 获取资源池列表供选择
@@ -203,12 +176,21 @@ def set_pool(id):
         queue_name = 'default'
 
     # 保存配置
-    config.set('pool', pool_id)
-    config.set('queue', queue_name)
+    get_config().update(pool=pool_id, queue=queue_name)
     
     click.echo(f"已设置默认资源池: {pool_id}")
     click.echo(f"已设置默认队列: {queue_name}")
 
+# aihcx config 设置成功后提示的名称，以及是否回显设置的值
+CONFIG_LABELS = {
+    'host': ('Host', True),
+    'access_key': ('Access Key', True),
+    'secret_key': ('Secret Key', False),
+    'pool': ('Pool', False),
+    'path': ('Path', True),
+    'queue': ('Queue', False),
+}
+
 @click.command()
 @click.option('--host', help='设置API域名')
 @click.option('--access-key', help='设置AK')
@@ -216,44 +198,67 @@ def set_pool(id):
 @click.option('--pool', help='默认资源池')
 @click.option('--queue', help='默认队列')
 @click.option('--path', help='默认文件保存路径')
+@click.option('--rate-limit', type=click.FloatRange(min=0), help='每个接口每秒最多请求数（0 表示不限速）')
+@click.option('--rate-burst', type=click.IntRange(min=1), help='限速允许的突发请求数')
+@click.option('--max-retries', type=click.IntRange(min=0), help='被限流、服务端错误或连接失败时的最大重试次数')
+@click.option('--retry-backoff', type=click.FloatRange(min=0), help='首次重试前的等待秒数，之后每次翻倍')
+@click.option('--breaker-threshold', type=click.IntRange(min=0), help='连续失败多少次后熔断（0 表示不熔断）')
+@click.option('--breaker-cooldown', type=click.FloatRange(min=0), help='熔断持续秒数')
+@click.option('--profile-name', help='设置或显示指定 profile 的配置（不存在时新建），默认为当前 profile')
+@click.option('--use', 'use_profile', help='切换当前 profile（default 为顶层配置）')
+@click.option('--list-profiles', is_flag=True, help='列出全部 profile')
 @click.option('--show', is_flag=True, help='显示当前配置')
-def config(host, access_key, secret_key, pool, queue, show, path):
-    """配置CLI工具"""
-    config = AIJobConfig()
-    
-    if show:
-        click.echo("当前配置:")
-        click.echo(f"Host: {config.get('host')}")
-        click.echo(f"Access Key: {config.get('access_key')}")
-        click.echo(f"Secret Key: {'*' * 8 if config.get('secret_key') else 'Not Set'}")
-        click.echo(f"Pool: {config.get('pool')}")
-        click.echo(f"Queue: {config.get('queue')}")
-        click.echo(f"Path: {config.get('path')}")
+def config(host, access_key, secret_key, pool, queue, show, path, profile_name, use_profile, list_profiles, **transport):
+    """配置CLI工具
+
+    \b
+    多个地域或账号可以保存为不同的 profile，未设置的配置项沿用 default：
+      aihcx config --profile-name gz --host aihc.gz.baidubce.com --pool <pool-id>
+      aihcx config --use gz                # 切换当前 profile
+      AIHCX_PROFILE=gz aihcx job list      # 只对本条命令生效
+    """
+    config = get_config()
+
+    if use_profile:
+        try:
+            config.use(use_profile)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--use')
+        click.echo(f"已切换到 profile: {use_profile}")
+
+    if list_profiles:
+        current = config.profile_name
+        for name in config.profiles():
+            click.echo(f"{'*' if name == current else ' '} {name}")
         return
-        
-    if host:
-        config.set('host', host)
-        click.echo(f"已设置Host: {host}")
-        
-    if access_key:
-        config.set('access_key', access_key)
-        click.echo(f"已设置Access Key: {access_key}")
-        
-    if secret_key:
-        config.set('secret_key', secret_key)
-        click.echo("已设置Secret Key")
 
-    if pool:
-        config.set('pool', pool)
-        click.echo("已设置Pool")
-    
-    if path:
-        config.set('path', path)
-        click.echo(f"已设置Path: {path}")
+    profile = profile_name or config.profile_name
+    if show:
+        if not config.has_profile(profile):
+            raise click.BadParameter(f"profile 不存在: {profile}", param_hint='--profile-name')
+        click.echo(f"当前配置（profile: {profile}）:")
+        click.echo(f"Host: {config.get('host', profile)}")
+        click.echo(f"Access Key: {config.get('access_key', profile)}")
+        click.echo(f"Secret Key: {'*' * 8 if config.get('secret_key', profile) else 'Not Set'}")
+        click.echo(f"Pool: {config.get('pool', profile)}")
+        click.echo(f"Queue: {config.get('queue', profile)}")
+        click.echo(f"Path: {config.get('path', profile)}")
+        for key, value in transport_settings({k: config.get(k, profile) for k in TRANSPORT_DEFAULTS}).items():
+            click.echo(f"{key}: {value}")
+        return
 
-    if queue:
-        config.set('queue', queue)
-        click.echo("已设置Queue")
+    values = {key: value for key, value in transport.items() if value is not None}
+    values.update({key: value for key, value in (('host', host), ('access_key', access_key), ('secret_key', secret_key),
+                                                 ('pool', pool), ('path', path), ('queue', queue)) if value})
+    if not values:
+        return
+    # 全部配置项合并为一次原子写入
+    config.update(profile, **values)
+    for key, value in values.items():
+        label, show_value = CONFIG_LABELS.get(key, (key, True))
+        click.echo(f"已设置{label}: {value}" if show_value else f"已设置{label}")
+    if profile_name:
+        click.echo(f"（profile: {profile}）")
 
 # 列出资源池
 @click.command()
@@ -272,13 +277,16 @@ def list_pool():
             'CREATED_AT': pool.metadata.createdAt
         }
         pool_list.append(pool_dic)
-        
-    click.echo(tabulate(pool_list, headers="keys", tablefmt="plain"))
+
+    record_completion('pool', '', [(pool.metadata.id, f"{pool.metadata.name} ({pool.status.phase})")
+                                   for pool in res.result.resourcePools])
+    click.echo(format_table(pool_list))
 
 # 获取资源池详情
 @click.command()
 @click.argument('id', required=False, shell_complete=get_pool_id_options)
-def get_pool(id):
+@doc_output_option
+def get_pool(id, output):
     """获取资源池详情
     
     如果不指定资源池ID，则获取默认资源池信息
@@ -287,115 +295,231 @@ def get_pool(id):
     
     if not id:
         # 如果没有传入ID，使用配置中的默认资源池
-        config = AIJobConfig()
-        id = config.get('pool')
+        id = get_config().get('pool')
         if not id:
             raise click.UsageError("未指定资源池ID，且未配置默认资源池。请通过参数指定ID或使用 'aihcctl config --pool <pool-id>' 设置默认值")
     
-    res = client.get_pool(id)
-    resource_pool = expando_to_dict(res.result)
-    pool_info = yaml.dump(resource_pool, allow_unicode=True)
-    click.echo(pool_info)
+    write_document(get_result_json(client, f'/api/v1/resourcepools/{id}'), output)
 
-# 列出节点列表
+def get_all_pool_ids(client) -> List[str]:
+    """分页获取全部资源池ID"""
+    pool_ids, page, size = [], 1, 100
+    while True:
+        result = client.get_all_pools(pageNo=page, pageSize=size).result
+        pools = result.resourcePools
+        pool_ids.extend(pool.metadata.id for pool in pools)
+        total = get_total(result)
+        if len(pools) < size or (total is not None and len(pool_ids) >= total):
+            return pool_ids
+        page += 1
+
+def resolve_pool_ids(pool: Optional[str], pools: Optional[str], all_pools: bool) -> List[str]:
+    """解析要查询的资源池：--all-pools > --pools > --pool/默认资源池"""
+    if all_pools:
+        return get_all_pool_ids(get_client())
+    if pools:
+        return [p.strip() for p in pools.split(',') if p.strip()]
+    return [get_pool_id(pool)]
+
+def multi_pool_options(f):
+    """为列表类命令添加多资源池并发查询的参数"""
+    f = click.option('-o', '--output', default='table', type=click.Choice(ROW_FORMATS), help='输出格式')(f)
+    f = click.option('--workers', default=DEFAULT_WORKERS, type=click.IntRange(min=1), help='并发查询的资源池数')(f)
+    f = click.option('--all-pools', is_flag=True, help='查询全部资源池')(f)
+    f = click.option('--pools', help='逗号分隔的多个资源池ID')(f)
+    return f
+
+def fan_out_pools(pool_ids: List[str], fetch_rows, headers: List[str], output: str, workers: int):
+    """并发查询多个资源池并合并输出（增加 POOL 列）
+
+    单个资源池失败不会中断其它资源池，各资源池的耗时和错误汇总输出到标准错误，
+    有失败时命令以非零状态码退出。
+    """
+    def run(pool_id):
+        start = time.monotonic()
+        try:
+            return pool_id, fetch_rows(pool_id), None, time.monotonic() - start
+        except Exception as e:
+            return pool_id, [], e, time.monotonic() - start
+
+    writer = get_row_writer(output, ['POOL'] + headers)
+    report = []
+    for pool_id, rows, error, elapsed in imap_ordered(run, pool_ids, workers):
+        writer.write(prepend_column('POOL', pool_id, row) for row in rows)
+        report.append({
+            'POOL': pool_id,
+            'STATUS': 'FAILED' if error else 'OK',
+            'ROWS': len(rows),
+            'LATENCY': f"{elapsed * 1000:.0f}ms",
+            'ERROR': error_message(error) if error else '',
+        })
+
+    click.echo(format_table(report), err=True)
+    if any(item['STATUS'] == 'FAILED' for item in report):
+        click.get_current_context().exit(1)
+
+# 资源池容量汇总
 @click.command()
-@click.option('--pool', help='资源池ID(可选)', shell_complete=get_pool_id_options)
-def list_node(pool):
-    """列出资源池节点列表"""
+@click.option('--pool', help='只统计该资源池', shell_complete=get_pool_id_options)
+@click.option('--pools', help='逗号分隔的多个资源池ID，默认统计全部资源池')
+@click.option('--by', 'group_by', multiple=True, type=click.Choice(list(CAPACITY_GROUP_BY)),
+              help='分组维度，可重复指定，默认按资源池、可用区、GPU型号和队列各输出一组')
+@click.option('--workers', default=DEFAULT_WORKERS, type=click.IntRange(min=1), help='并发请求数')
+@click.option('-o', '--output', default='table', type=click.Choice(ROW_FORMATS), help='输出格式')
+def pool_capacity(pool, pools, group_by, workers, output):
+    """汇总各资源池的GPU容量：已分配、空闲和利用率
+
+    节点按资源池、可用区、GPU型号分组，队列按GPU配额和已分配量统计。
+    """
     client = get_client()
-    pool_id = get_pool_id(pool)
-    res = client.get_all_nodes(resourcePoolId=pool_id)
-    nodes = res.result.nodes
+    pool_ids = [pool] if pool else resolve_pool_ids(None, pools, not pools)
+    group_by = list(group_by or CAPACITY_GROUP_BY)
+    rows, errors = collect_capacity(client, pool_ids, group_by, workers)
+    if output == 'table':
+        for column in group_by:
+            group_rows = [{k: v for k, v in row.items() if k != 'GROUP_BY'} for row in rows if row['GROUP_BY'] == column]
+            click.echo(f"按{CAPACITY_GROUP_BY[column]}:")
+            click.echo(format_table(group_rows) if group_rows else '（无数据）')
+            click.echo()
+    else:
+        get_row_writer(output, CAPACITY_HEADERS).write(rows)
+    if errors:
+        click.echo(format_table([{'POOL': pool_id, 'ERROR': error_message(e)} for pool_id, e in errors.items()]),
+                   err=True)
+        click.get_current_context().exit(1)
+
+# 节点列表输出的列
+NODE_LIST_HEADERS = ['nodeName', 'statusPhase', 'instanceName', 'instanceId', 'gpuTotal', 'gpuAllocated', 'region', 'zone']
+
+def node_rows(nodes) -> List[Dict]:
+    """节点列表的行数据"""
     node_list = []
     for node in nodes:
-        # print(node.name, node.nodeId, node.status, node.createdAt)
-        # 格式化输出 node.name, node.nodeId, node.status, node.createdAt
-        # print(node)
-        node = expando_to_dict(node)
         node = {k.strip(): v for k, v in node.items()}
-        node_info = {
-            'nodeName': node['nodeName'],
-            'statusPhase': node['statusPhase'],
-            'instanceName': node['instanceName'],
-            'instanceId': node['instanceId'],
-            'gpuTotal': node['gpuTotal'],
-            'gpuAllocated': node['gpuAllocated'],
-            'region': node['region'],
-            'zone': node['zone'],
-        }
-        node_list.append(node_info)
-    
-    click.echo(tabulate(node_list, headers="keys", tablefmt="plain")) 
+        node_list.append({key: node[key] for key in NODE_LIST_HEADERS})
+    return node_list
+
+# 列出节点列表
+@click.command()
+@click.option('--pool', help='资源池ID(可选)', shell_complete=get_pool_id_options)
+@multi_pool_options
+def list_node(pool, pools, all_pools, workers, output):
+    """列出资源池节点列表"""
+    client = get_client()
+    pool_ids = resolve_pool_ids(pool, pools, all_pools)
+    fetch_rows = lambda pool_id: node_rows(get_result_json(client, f'/api/v1/resourcepools/{pool_id}/nodes', {
+        'orderBy': 'createdAt', 'order': 'desc', 'pageNo': 1, 'pageSize': 50}).get('nodes') or [])
+    if len(pool_ids) > 1:
+        fan_out_pools(pool_ids, fetch_rows, NODE_LIST_HEADERS, output, workers)
+        return
+
+    node_list = fetch_rows(pool_ids[0])
+    if output == 'table':
+        click.echo(format_table(node_list))
+    else:
+        get_row_writer(output, NODE_LIST_HEADERS).write(node_list)
+
+# 队列列表输出的列
+QUEUE_LIST_HEADERS = ['name', 'state', 'queueType', 'reclaimable', 'disableOversell', 'createdTime']
+
+def queue_rows(queues) -> List[Dict]:
+    """队列列表的行数据"""
+    return [{
+        'name': queue.name,
+        'state': queue.state,
+        'queueType': queue.queueType,
+        'reclaimable': queue.reclaimable,
+        'disableOversell': queue.disableOversell,
+        'createdTime': queue.createdTime
+    } for queue in queues]
 
 # 获取队列列表
 @click.command()
 @click.option('--pool', help='资源池ID(可选)', shell_complete=get_pool_id_options)
-def list_queue(pool):
+@multi_pool_options
+def list_queue(pool, pools, all_pools, workers, output):
     """列出队列列表"""
     client = get_client()
-    pool_id = get_pool_id(pool)
-    res = client.get_all_queues(resourcePoolId=pool_id)
-    queues = res.result.queues
-    queue_list = []
-    for queue in queues:
-        # print(queue.name, queue.queueId, queue.status, queue.createdAt)
-        # 格式化输出 queue.name, queue.queueId, queue.status, queue.createdAt
-        queue_info = {
-            'name': queue.name,
-            'state': queue.state,
-            'queueType': queue.queueType,
-            'reclaimable': queue.reclaimable,
-            'disableOversell': queue.disableOversell,
-            'createdTime': queue.createdTime
-        }
-        queue_list.append(queue_info)
-    
-    click.echo(tabulate(queue_list, headers="keys", tablefmt="plain"))
+    pool_ids = resolve_pool_ids(pool, pools, all_pools)
+    fetch_rows = lambda pool_id: queue_rows(client.get_all_queues(resourcePoolId=pool_id).result.queues)
+    if len(pool_ids) > 1:
+        fan_out_pools(pool_ids, fetch_rows, QUEUE_LIST_HEADERS, output, workers)
+        return
+
+    queue_list = fetch_rows(pool_ids[0])
+    record_completion('queue', pool_ids[0], [(q['name'], f"{q['queueType']} ({q['state']})") for q in queue_list],
+                      complete_list=True)
+    if output == 'table':
+        click.echo(format_table(queue_list))
+    else:
+        get_row_writer(output, QUEUE_LIST_HEADERS).write(queue_list)
 
 # 获取队列详情
 @click.command()
 @click.argument('name', required=False, shell_complete=get_queue_name_options)
 @click.option('--pool', help='资源池ID(可选)', shell_complete=get_pool_id_options)
-def get_queue(pool, name):
+@doc_output_option
+def get_queue(pool, name, output):
     """获取队列详情"""
     client = get_client()
     pool_id = get_pool_id(pool)
     name = get_queue_name(name)
-    res = client.get_queue(pool_id, queueName=name)
-    queue_info = expando_to_dict(res.result)
-    queue = yaml.dump(queue_info, allow_unicode=True)
-    click.echo(queue)
+    write_document(get_result_json(client, f'/api/v1/resourcepools/{pool_id}/queue/{name}'), output)
+
+# 任务列表输出的列
+JOB_LIST_HEADERS = list(JobRecord._fields)
+
+def job_completion_items(rows: List[JobRecord]) -> List[Tuple[str, str]]:
+    """任务行数据对应的补全候选值"""
+    return [(row.ID, f"{row.NAME} ({row.STATUS})") for row in rows]
 
 # 获取任务列表
 @click.command()
 @click.option('--pool', help='资源池ID(可选)')
-@click.option('--order', default='desc', help='排序方式')
+@click.option('--order', default='desc', type=click.Choice(['asc', 'desc']), help='排序方式')
 @click.option('--page', default=1, help='页码')
-@click.option('--size', default=10, help='每页大小')
-def list_job(pool, order, page, size):
+@click.option('--size', type=int, help='每页大小（默认10，--all 时默认100）')
+@click.option('--all', 'fetch_all', is_flag=True, help='拉取全部任务，边拉取边输出')
+@multi_pool_options
+def list_job(pool, order, page, size, fetch_all, pools, all_pools, workers, output):
     """列出训练任务"""
     client = get_client()
-    pool_id = get_pool_id(pool)
-    size = int(size) if size else 50
-    resp = client.get_all_aijobs(pool_id, pageSize=size)
-    jobs = resp.result.jobs
-    job_list = []
-    for job in jobs:
-        job_info = {
-            'NAME': job.name,
-            'ID': job.jobId,
-            'STATUS': job.status,
-            'CREATED_AT': job.createdAt
-        }
-        job_list.append(job_info)
-    
-    click.echo(tabulate(job_list, headers="keys", tablefmt="plain"))
+    pool_ids = resolve_pool_ids(pool, pools, all_pools)
+    size = size or (100 if fetch_all else 10)
+
+    if len(pool_ids) > 1:
+        # 资源池之间并发，单个资源池内的分页并发数按资源池数均分
+        page_workers = max(1, workers // min(workers, len(pool_ids)))
+
+        def fetch_rows(pool_id):
+            if fetch_all:
+                return [row for rows in iter_job_record_pages(client, pool_id, size, order, page_workers)
+                        for row in rows]
+            return list_job_records(client, pool_id, page, size, order)
+
+        fan_out_pools(pool_ids, fetch_rows, JOB_LIST_HEADERS, output, workers)
+        return
+
+    pool_id = pool_ids[0]
+    writer = get_row_writer(output, JOB_LIST_HEADERS)
+    if fetch_all:
+        items = []
+        for rows in iter_job_record_pages(client, pool_id, size, order, workers):
+            writer.write(rows)
+            items.extend(job_completion_items(rows))
+        record_completion('job', pool_id, items, complete_list=True)
+        return
+
+    job_list = list_job_records(client, pool_id, page, size, order)
+    record_completion('job', pool_id, job_completion_items(job_list))
+    writer.write(job_list)
 
 # 获取任务详情
 @click.command()
 @click.argument('id', required=False, shell_complete=get_job_id_options)
 @click.option('--pool', help='资源池ID(可选)')
-def get_job(id, pool):
+@doc_output_option
+def get_job(id, pool, output):
     """获取训练任务详情
     
     如果不指定任务ID，则显示任务列表供选择
@@ -405,28 +529,15 @@ def get_job(id, pool):
     
     if not id:
         # 如果未指定ID，则获取并显示任务列表
-        resp = client.get_all_aijobs(pool_id)
-        jobs = resp.result.jobs
-        job_list = []
-        for job in jobs:
-            job_info = {
-                'NAME': job.name,
-                'ID': job.jobId,
-                'STATUS': job.status,
-                'CREATED_AT': job.createdAt
-            }
-            job_list.append(job_info)
-        
+        job_list = list_job_records(client, pool_id, 1, 50)
+
         # 显示任务列表
         click.echo("可用的任务列表:")
-        click.echo(tabulate(job_list, headers="keys", tablefmt="plain"))
+        get_row_writer('table', JOB_LIST_HEADERS).write(job_list)
         return
     
     # 获取指定任务的详情
-    resp = client.get_aijob(pool_id, id)
-    job_info = expando_to_dict(resp.result)
-    job_info = yaml.dump(job_info, allow_unicode=True)
-    click.echo(job_info)
+    write_document(get_aijob_dict(client, pool_id, id), output)
 
 # 查询任务状态
 @click.command()
@@ -436,8 +547,7 @@ def get_job_status(id, pool):
     """获取训练任务状态"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    res = client.get_aijob(pool_id, id)
-    job_info = expando_to_dict(res.result)
+    job_info = get_aijob_dict(client, pool_id, id)
 
     job_status = [{
         'name': job_info['name'],
@@ -449,16 +559,100 @@ def get_job_status(id, pool):
         'scheduledAt': job_info['scheduledAt'] if 'scheduledAt' in job_info else '--',
         'createdAt': job_info['createdAt'],
     }]
-    click.echo(tabulate(job_status, headers="keys", tablefmt="plain"))
+    click.echo(format_table(job_status))
+
+# 任务状态监控输出的列
+JOB_WATCH_HEADERS = ['TIME', 'ID', 'NAME', 'STATUS']
+
+@click.command()
+@click.argument('ids', nargs=-1, shell_complete=get_job_id_options)
+@click.option('--pool', help='资源池ID(可选)')
+@click.option('--status', 'statuses', help='未指定任务ID时，跟踪最近创建的任务中处于这些状态的任务（逗号分隔）')
+@click.option('--name', help='未指定任务ID时，跟踪名称包含该字符串的任务')
+@click.option('--until', default='all-done', type=click.Choice(UNTIL_CONDITIONS),
+              help='退出条件：全部结束 / 全部成功（任一失败立即退出）/ 任一结束')
+@click.option('--interval', default=5.0, type=click.FloatRange(min=0.5), help='最小轮询间隔（秒）')
+@click.option('--max-interval', default=60.0, type=click.FloatRange(min=0.5), help='状态长时间不变时的最大轮询间隔（秒）')
+@click.option('--timeout', type=click.FloatRange(min=0), help='超时时间（秒），超时退出码为2')
+@click.option('--max-pages', default=5, type=click.IntRange(min=0), help='每轮通过列表接口批量查询时最多翻的页数')
+@click.option('-o', '--output', default='table', type=click.Choice(ROW_FORMATS), help='输出格式')
+@click.pass_context
+def job_watch(ctx, ids, pool, statuses, name, until, interval, max_interval, timeout, max_pages, output):
+    """持续跟踪任务状态，只输出状态发生变化的任务
+
+    退出码：0 条件满足且任务成功，1 有任务失败，2 超时
+    """
+    client = get_client()
+    pool_id = get_pool_id(pool)
+    if ids:
+        rows = [{'ID': job_id, 'NAME': '', 'STATUS': None} for job_id in dict.fromkeys(ids)]
+    else:
+        status_list = [s.strip() for s in statuses.split(',') if s.strip()] if statuses else None
+        rows = discover_jobs(client, pool_id, status_list, name, max_pages=max(1, max_pages))
+        if not rows:
+            raise click.UsageError("没有符合条件的任务，请指定任务ID或调整 --status/--name")
+
+    watcher = JobWatcher(client, pool_id, rows, max_pages=max_pages)
+    schedule = AdaptiveInterval(interval, max_interval)
+    writer = get_row_writer(output, JOB_WATCH_HEADERS)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    # 按ID指定的任务第一轮查询后输出全部，按条件筛选的任务先输出当前状态
+    if not ids:
+        writer.write([dict(row, TIME=time.strftime('%H:%M:%S')) for row in rows])
+
+    polls = 0
+    code = None if ids else watcher.exit_code(until)
+    while code is None:
+        error = False
+        try:
+            changed = watcher.poll()
+            polls += 1
+        except Exception as e:
+            changed, error = [], True
+            click.echo(f"查询任务状态失败: {error_message(e)}", err=True)
+        if changed:
+            now = time.strftime('%H:%M:%S')
+            writer.write([dict(row, TIME=now) for row in changed])
+        code = watcher.exit_code(until)
+        if code is not None:
+            break
+        delay = schedule.next(bool(changed), error)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                click.echo("等待超时", err=True)
+                code = EXIT_TIMEOUT
+                break
+            delay = min(delay, remaining)
+        time.sleep(delay)
+
+    click.echo(f"共跟踪 {len(watcher.jobs)} 个任务，轮询 {polls} 轮，上游请求 {watcher.requests} 次", err=True)
+    ctx.exit(code)
 
 # 创建任务
 @click.command()
 @click.argument('name', required=False)
 @click.option('--pool', help='资源池ID(可选)')
-@click.option('--file', '-f', required=True, type=click.Path(exists=True), help='配置文件路径')
-def create_job(name, pool, file):
-    """创建训练任务"""
+@click.option('--file', '-f', type=click.Path(exists=True), help='配置文件路径')
+@click.option('--batch', type=click.Path(exists=True), help='批量创建：清单文件（yaml/json/jsonl）或目录')
+@click.option('--results', type=click.Path(dir_okay=False),
+              help='批量创建的结果文件，默认为 <清单>.results.jsonl；重新运行时跳过其中已提交的任务')
+@click.option('--workers', default=DEFAULT_WORKERS, type=click.IntRange(min=1), help='批量创建的并发数')
+@click.option('--rate', type=click.FloatRange(min=0), help='每秒最多提交数（默认不限速）')
+@click.option('--retries', type=click.IntRange(min=0), help='被限流等失败时的最大重试次数（默认使用 config 中的 max_retries）')
+@click.option('--dry-run', is_flag=True, help='只展开清单并列出将要提交的任务，不实际提交')
+@click.option('-o', '--output', default='table', type=click.Choice(ROW_FORMATS), help='批量创建结果的输出格式')
+@click.pass_context
+def create_job(ctx, name, pool, file, batch, results, workers, rate, retries, dry_run, output):
+    """创建训练任务，或通过 --batch 从清单批量创建"""
+    if bool(file) == bool(batch):
+        raise click.UsageError("请指定 --file 或 --batch 其中之一")
     client = get_client()
+    if batch:
+        if name:
+            raise click.UsageError("--batch 时任务名称由清单指定")
+        create_jobs_from_manifest(ctx, client, batch, pool, results, workers, rate, retries, dry_run, output)
+        return
     pool_id = get_pool_id(pool)
     
     with open(file) as f:
@@ -467,40 +661,176 @@ def create_job(name, pool, file):
     
     if name:
         config['name'] = name
-    client_token = str(int(time.time()))
-    res = client.create_aijob(client_token, pool_id, config)
-    result = expando_to_dict(res.result)
+    # 单个创建每次都是新任务，用随机 token 避免同一秒内提交的任务互相冲突
+    client_token = uuid.uuid4().hex
+    result = request_json(client, 'POST', '/api/v1/aijobs',
+                          {'clientToken': client_token, 'resourcePoolId': pool_id}, config)
+
+    click.echo(dump_yaml(result))
+
+def create_jobs_from_manifest(ctx, client, path, pool, results, workers, rate, retries, dry_run, output):
+    """展开清单并发提交任务；clientToken 由任务内容决定，结果逐条追加到结果文件，重新运行时跳过已提交的"""
+    try:
+        jobs = load_manifest(path, pool or get_config().get('pool'))
+    except Exception as e:
+        raise click.BadParameter(f"无法解析清单: {e}", param_hint='--batch')
+    missing = [job.name for job in jobs if not job.pool]
+    if missing:
+        raise click.UsageError(f"以下任务没有资源池：{', '.join(missing)}。请在清单中指定 pool，或使用 --pool 参数")
+    if not jobs:
+        raise click.UsageError("清单中没有任务")
+
+    results_path = results or default_results_path(path)
+    submitted = load_results(results_path)
+    by_token = {job.token: job for job in jobs}
+    rows = [{'NAME': job.name, 'PARAMS': json.dumps(job.params, ensure_ascii=False) if job.params else '',
+             'POOL': job.pool, 'TOKEN': job.token, 'JOB_ID': submitted.get(job.token, {}).get('jobId', '')}
+            for job in jobs]
+    skipped = [dict(row, RESULT='SKIPPED') for row in rows if row['JOB_ID']]
+    pending = [row for row in rows if not row['JOB_ID']]
+
+    writer = get_row_writer(output, BATCH_CREATE_HEADERS)
+    if dry_run:
+        writer.write(skipped + [dict(row, RESULT='DRY-RUN') for row in pending])
+        click.echo(f"共 {len(rows)} 个任务，已提交 {len(skipped)}，待提交 {len(pending)}（dry-run，未执行）", err=True)
+        return
+
+    def submit(row):
+        result = request_json(client, 'POST', '/api/v1/aijobs',
+                              {'clientToken': row['TOKEN'], 'resourcePoolId': row['POOL']}, by_token[row['TOKEN']].config)
+        return {'JOB_ID': result.get('jobId', '')}
+
+    def record(rows):
+        # 每完成一个就追加并刷新，中断后重新运行也不会重复提交
+        with open(results_path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({'token': row['TOKEN'], 'name': row['NAME'], 'pool': row['POOL'],
+                                    'params': by_token[row['TOKEN']].params,
+                                    'jobId': row['JOB_ID'] or None, 'error': row['ERROR'] or None,
+                                    'submittedAt': time.strftime('%Y-%m-%dT%H:%M:%S%z')},
+                                   ensure_ascii=False) + '\n')
+                f.flush()
+                yield row
 
-    click.echo(yaml.dump(result, allow_unicode=True))
+    start = time.monotonic()
+    failed = write_bulk_results(writer, output, skipped, record(run_bulk(submit, pending, workers, rate, retries)))
+    click.echo(f"批量创建完成：提交 {len(pending) - failed}，跳过 {len(skipped)}，失败 {failed}，"
+               f"耗时 {time.monotonic() - start:.1f}s，结果已写入 {results_path}", err=True)
+    if failed:
+        ctx.exit(1)
+
+def write_bulk_results(writer, output, done, results) -> int:
+    """输出批量操作结果（done 为无需执行的行），返回失败数；表格需要全部结果才能确定列宽，其他格式逐行输出"""
+    rows, failed = list(done), 0
+    if output != 'table':
+        writer.write(rows)
+        rows = []
+    for row in results:
+        failed += row['RESULT'] == 'FAILED'
+        if output == 'table':
+            rows.append(row)
+        else:
+            writer.write([row])
+    writer.write(rows)
+    return failed
+
+def bulk_job_options(fn):
+    """stop/delete 共用的批量操作选项"""
+    options = [
+        click.option('--ids-from', type=click.File('r'), help='从文件读取任务ID，每行一个（"-" 表示标准输入）'),
+        click.option('--status', 'statuses', help='按状态筛选资源池中的任务（逗号分隔）'),
+        click.option('--name', 'name_pattern', help='按名称正则表达式筛选任务'),
+        click.option('--older-than', help='只选择创建时间早于该时长之前的任务，如 2h、7d'),
+        click.option('--workers', default=DEFAULT_WORKERS, type=click.IntRange(min=1), help='并发数'),
+        click.option('--rate', type=click.FloatRange(min=0), help='每秒最多请求数（默认不限速）'),
+        click.option('--retries', type=click.IntRange(min=0), help='被限流等失败时的最大重试次数（默认使用 config 中的 max_retries）'),
+        click.option('--dry-run', is_flag=True, help='只列出将要操作的任务，不实际执行'),
+        click.option('-y', '--yes', is_flag=True, help='按条件筛选任务时不再确认'),
+        click.option('-o', '--output', default='table', type=click.Choice(ROW_FORMATS), help='批量操作结果的输出格式'),
+    ]
+    for option in reversed(options):
+        fn = option(fn)
+    return fn
+
+def is_bulk_request(ids, ids_from, statuses, name_pattern, older_than, dry_run, **_) -> bool:
+    """只给了一个任务ID且没有批量选项时，保持单任务命令原来的输出"""
+    return len(ids) != 1 or any([ids_from, statuses, name_pattern, older_than, dry_run])
+
+def bulk_job_action(ctx, client, pool_id, ids, verb, action, ids_from, statuses, name_pattern, older_than,
+                    workers, rate, retries, dry_run, yes, output):
+    """解析要操作的任务（ID、ID文件、筛选条件），并发执行并输出每个任务的结果和汇总"""
+    rows = [{'ID': job_id, 'NAME': ''} for job_id in ids]
+    if ids_from:
+        rows.extend({'ID': line.strip(), 'NAME': ''} for line in ids_from
+                    if line.strip() and not line.startswith('#'))
+    selector = statuses or name_pattern or older_than
+    if selector:
+        try:
+            created_before = parse_since(older_than) if older_than else None
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--older-than')
+        status_list = [s.strip() for s in statuses.split(',') if s.strip()] if statuses else None
+        try:
+            rows.extend(select_jobs(client, pool_id, status_list, name_pattern, created_before))
+        except re.error as e:
+            raise click.BadParameter(f"无效的正则表达式: {e}", param_hint='--name')
+    unique = {}
+    for row in rows:
+        unique.setdefault(row['ID'], row)
+    rows = list(unique.values())
+    if not rows:
+        raise click.UsageError("没有要操作的任务：请指定任务ID、--ids-from 或筛选条件（--status/--name/--older-than）")
+
+    writer = get_row_writer(output, BULK_HEADERS)
+    if dry_run:
+        writer.write(dict(row, RESULT='DRY-RUN') for row in rows)
+        click.echo(f"共 {len(rows)} 个任务将被{verb}（dry-run，未执行）", err=True)
+        return
+    if selector and not yes:
+        click.confirm(f"将{verb} {len(rows)} 个任务，是否继续?", abort=True, err=True)
+
+    start = time.monotonic()
+    failed = write_bulk_results(writer, output, [], run_bulk(action, rows, workers, rate, retries))
+    click.echo(f"{verb}完成：成功 {len(rows) - failed}，失败 {failed}，耗时 {time.monotonic() - start:.1f}s", err=True)
+    if failed:
+        ctx.exit(1)
 
 # 删除任务
 @click.command()
-@click.argument('id', shell_complete=get_job_id_options)
+@click.argument('ids', nargs=-1, shell_complete=get_job_id_options)
 @click.option('--pool', help='资源池ID(可选)')
-def delete_job(id, pool):
-    """删除训练任务"""
+@bulk_job_options
+@click.pass_context
+def delete_job(ctx, ids, pool, **bulk):
+    """删除训练任务，支持多个ID、--ids-from 或按条件批量删除"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    res = client.delete_aijob(pool_id, id)
-    job_info = expando_to_dict(res.result)
-    job_info = yaml.dump(job_info, allow_unicode=True)
-    click.echo(job_info)
+    if not is_bulk_request(ids, **bulk):
+        job_info = request_json(client, 'DELETE', f'/api/v1/aijobs/{ids[0]}', {'resourcePoolId': pool_id})
+        job_info = dump_yaml(job_info)
+        click.echo(job_info)
+        return
+    bulk_job_action(ctx, client, pool_id, ids, '删除', lambda row: client.delete_aijob(pool_id, row['ID']), **bulk)
 
 # 停止任务
 @click.command()
-@click.argument('id', shell_complete=get_job_id_options)
+@click.argument('ids', nargs=-1, shell_complete=get_job_id_options)
 @click.option('--pool', help='资源池ID(可选)')
-def stop_job(id, pool):
-    """停止训练任务"""
+@bulk_job_options
+@click.pass_context
+def stop_job(ctx, ids, pool, **bulk):
+    """停止训练任务，支持多个ID、--ids-from 或按条件批量停止"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    try:
-        res = client.stop_aijob(pool_id, id)
-        job_info = expando_to_dict(res.result)
-        job_info = yaml.dump(job_info, allow_unicode=True)
-        click.echo(job_info)
-    except Exception as e:
-        click.echo(f"停止任务失败: {e}")
+    if not is_bulk_request(ids, **bulk):
+        try:
+            job_info = request_json(client, 'POST', f'/api/v1/aijobs/{ids[0]}/stop', {'resourcePoolId': pool_id})
+            job_info = dump_yaml(job_info)
+            click.echo(job_info)
+        except Exception as e:
+            click.echo(f"停止任务失败: {e}")
+        return
+    bulk_job_action(ctx, client, pool_id, ids, '停止', lambda row: client.stop_aijob(pool_id, row['ID']), **bulk)
 
 # 更新任务
 @click.command()
@@ -514,6 +844,90 @@ def update_job(id, pool, priority):
     result = client.update_job(pool_id, id, priority)
     click.echo(json.dumps(result, indent=2, ensure_ascii=False))
 
+# 本地历史库超过该时间（秒）未同步时，job query 提示先同步
+HISTORY_STALE_AFTER = 3600
+
+def run_sync(pool_ids: List[str], full: bool, workers: int, store: HistoryStore) -> List[Dict]:
+    """同步并在标准错误输出每个资源池的结果"""
+    rows = list(sync_pools(get_client(), pool_ids, full, workers, store))
+    click.echo(format_table([{k: row[k] for k in SYNC_HEADERS} for row in rows]), err=True)
+    return rows
+
+# 同步任务历史
+@click.command()
+@click.option('--pool', help='资源池ID(可选)', shell_complete=get_pool_id_options)
+@click.option('--pools', help='逗号分隔的多个资源池ID')
+@click.option('--all-pools', is_flag=True, help='同步全部资源池')
+@click.option('--full', is_flag=True, help='全量同步，并删除服务端已不存在的任务')
+@click.option('--workers', default=DEFAULT_WORKERS, type=click.IntRange(min=1), help='并发请求数')
+def sync(pool, pools, all_pools, full, workers):
+    """把任务元数据增量同步到本地历史库（~/.aijob/history.db），供 job query 离线查询
+
+    首次同步拉取全部任务，之后只拉取新建的任务和上次同步时尚未结束的任务。
+    """
+    pool_ids = resolve_pool_ids(pool, pools, all_pools)
+    store = HistoryStore()
+    try:
+        rows = run_sync(pool_ids, full, workers, store)
+    finally:
+        store.close()
+    if any(row['ERROR'] for row in rows):
+        click.get_current_context().exit(1)
+
+def parse_time_option(value: Optional[str], name: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parse_since(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint=name)
+
+# 离线查询任务历史
+@click.command()
+@click.option('--pool', 'pools', multiple=True, help='资源池ID，可重复指定，默认查询已同步的全部资源池')
+@click.option('--status', 'statuses', multiple=True, help='任务状态，可重复指定')
+@click.option('--queue', 'queues', multiple=True, help='队列名称，可重复指定')
+@click.option('--name', help='名称包含的字符串，含 * ? [ 时按通配符匹配')
+@click.option('--since', help='开始时间：相对时长（如 7d、24h）或 YYYY-MM-DD[ HH:MM:SS]')
+@click.option('--until', help='结束时间，格式同 --since')
+@click.option('--time-field', default='created', type=click.Choice(list(TIME_FIELDS)),
+              help='时间范围和按时间分组使用的字段', show_default=True)
+@click.option('--group-by', 'group_by', multiple=True, type=click.Choice(list(GROUP_COLUMNS)),
+              help='分组维度，可重复指定；分组时输出任务数、GPU数、GPU小时和平均运行时长')
+@click.option('--limit', type=click.IntRange(min=1), help='最多输出条数（不分组时默认 100）')
+@click.option('--sync', 'sync_first', is_flag=True, help='查询前先增量同步要查询的资源池')
+@click.option('-o', '--output', default='table', type=click.Choice(ROW_FORMATS), help='输出格式')
+def job_query(pools, statuses, queues, name, since, until, time_field, group_by, limit, sync_first, output):
+    """在本地历史库中查询任务（先用 aihcx sync 同步）
+
+    \b
+    示例：上周 pool-1 中失败的任务数，按队列统计
+      aihcx job query --pool pool-1 --status Failed --since 7d --group-by queue
+    """
+    since_ts = parse_time_option(since, '--since')
+    until_ts = parse_time_option(until, '--until')
+    store = HistoryStore()
+    try:
+        pool_ids = list(pools) or store.pools()
+        if sync_first:
+            run_sync(pool_ids or [get_pool_id(None)], False, DEFAULT_WORKERS, store)
+            pool_ids = pool_ids or store.pools()
+        synced_at = store.synced_at(pool_ids)
+        if synced_at is None:
+            click.echo("部分资源池尚未同步，请先运行 aihcx sync --pool <pool-id>", err=True)
+        elif time.time() - synced_at > HISTORY_STALE_AFTER:
+            click.echo(f"本地历史库已有 {(time.time() - synced_at) / 3600:.1f} 小时未同步，可运行 aihcx sync 更新", err=True)
+        rows = store.query(pool_ids, statuses, queues, name, since_ts, until_ts, time_field, group_by,
+                           limit or (None if group_by else 100))
+    finally:
+        store.close()
+
+    headers = list(rows[0]) if rows else ([g.upper() for g in group_by] if group_by else JOB_QUERY_HEADERS)
+    if output == 'table':
+        click.echo(format_table(rows) if rows else '没有匹配的任务')
+    else:
+        get_row_writer(output, headers).write(rows)
+
 # 导出任务配置
 @click.command()
 @click.argument('id', shell_complete=get_job_id_options)
@@ -523,8 +937,7 @@ def job_export(id, pool, path):
     """导出任务配置"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    resp = client.get_aijob(pool_id, id)
-    job_info = expando_to_dict(resp.result)
+    job_info = get_aijob_dict(client, pool_id, id)
 
     new_job_info = {
     "queue": "",
@@ -574,7 +987,7 @@ def job_export(id, pool, path):
 
     # 保存为JSON文件
     filename = f"{job_info['name']}-export.json"
-    path = AIJobConfig().get('path') if not path else path
+    path = get_config().get('path') if not path else path
     if path:
         filename = f"{path}/{filename}"
         with open(filename, 'w') as f:
@@ -588,35 +1001,78 @@ def job_export(id, pool, path):
     else:
         click.echo('未设置默认保存路径，请通过"--path"指定保存路径或"aihcctl config --path <path>" 设置默认路径')
 
+def job_finished(client, pool_id: str, job_id: str) -> bool:
+    """任务是否已进入终态"""
+    return get_aijob_dict(client, pool_id, job_id).get('status') in TERMINAL_STATUSES
+
 # 查看任务日志
 @click.command()
 @click.argument('id', shell_complete=get_job_id_options)
 @click.option('--pool', help='资源池ID(可选)')
-@click.option('--podname', required=True, help='Pod名称', shell_complete=get_pod_name_options)
-def job_logs(id, pool, podname):
-    """查看任务日志"""
+@click.option('--podname', help='Pod名称', shell_complete=get_pod_name_options)
+@click.option('--all-pods', is_flag=True, help='合并任务全部Pod的日志，每行加 [Pod名称] 前缀')
+@click.option('-f', '--follow', is_flag=True, help='持续输出新产生的日志，任务结束后退出')
+@click.option('--tail', type=click.IntRange(min=0), help='只输出最后N行')
+@click.option('--since', help="只输出该时间之后的日志，如 10m、2h、'2024-01-01 08:00:00'")
+@click.option('--interval', default=2.0, type=click.FloatRange(min=0.5), help='跟随模式的最小轮询间隔（秒）')
+@click.option('--workers', default=DEFAULT_WORKERS, type=click.IntRange(min=1), help='并发查询的Pod数')
+def job_logs(id, pool, podname, all_pods, follow, tail, since, interval, workers):
+    """查看任务日志，直接输出原始日志行"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    resp = client.get_aijob_logs(pool_id, id, podname)
-    logs = expando_to_dict(resp.result)
-    click.echo(yaml.dump(logs, allow_unicode=True))
+    try:
+        since_time = parse_since(since) if since else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--since')
 
-def get_job_events(id, pool, framework):
+    if all_pods:
+        pods = get_aijob_dict(client, pool_id, id)['podList']['pods']
+        pod_names = [pod['objectMeta']['name'] for pod in pods]
+    elif podname:
+        pod_names = [podname]
+    else:
+        raise click.UsageError("需要通过 --podname 指定Pod，或使用 --all-pods 查看全部Pod的日志")
+
+    followers = [LogFollower(client, pool_id, id, name, since=since_time, tail=tail) for name in pod_names]
+    prefixes = [click.style(f"[{name}] ", fg=PREFIX_COLORS[i % len(PREFIX_COLORS)]) if len(pod_names) > 1 else ''
+                for i, name in enumerate(pod_names)]
+    schedule = AdaptiveInterval(interval, interval * 8)
+    finishing = False
+    try:
+        while True:
+            received, error = False, False
+            try:
+                for prefix, lines in zip(prefixes, imap_ordered(LogFollower.fetch, followers, workers)):
+                    if lines:
+                        received = True
+                        click.echo('\n'.join(prefix + line for line in lines))
+                if not follow or (finishing and not received):
+                    return
+                # 没有新日志时检查任务是否已结束，结束后再拉取一次以免漏掉最后的日志
+                finishing = not received and job_finished(client, pool_id, id)
+            except Exception as e:
+                if not follow:
+                    raise
+                error, finishing = True, False
+                click.echo(f"查询日志失败: {error_message(e)}", err=True)
+            time.sleep(0 if finishing else schedule.next(received, error))
+    except KeyboardInterrupt:
+        pass
+
+def get_job_events(id, pool, framework, output='yaml'):
     """查询任务事件"""
     client = get_client()
     pool_id = get_pool_id(pool)
     framework = get_framework_type(framework)
-    resp = client.get_aijob_events(pool_id, id, framework)
-    events = expando_to_dict(resp.result)
-    click.echo(yaml.dump(events, allow_unicode=True))
+    write_document(get_result_json(client, f'/api/v1/aijobs/{id}/events',
+                                   {'resourcePoolId': pool_id, 'jobFramework': framework}), output)
 
-def get_aijob_pod_events(id, pool, podName, jobFramework):
+def get_aijob_pod_events(id, pool, podName, jobFramework, output='yaml'):
     """查询任务事件"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    res = client.get_aijob_pod_events(pool_id, id, podName, jobFramework)
-    pod_events = expando_to_dict(res.result)
-    click.echo(yaml.dump(pod_events, allow_unicode=True))
+    write_document(get_result_json(client, f'/api/v1/aijobs/{id}/pods/{podName}/events',
+                                   {'resourcePoolId': pool_id, 'jobFramework': jobFramework}), output)
 
 # 查询任务事件
 @click.command()
@@ -624,14 +1080,15 @@ def get_aijob_pod_events(id, pool, podName, jobFramework):
 @click.option('--pool', help='资源池ID(可选)', shell_complete=get_pool_id_options)
 @click.option('--framework', required=False, help='训练任务框架类型，当前支持 "PyTorchJob"')
 @click.option('--podname', required=False, help='Pod名称', shell_complete=get_pod_name_options)
-def job_events(id, pool, framework, podname):
+@doc_output_option
+def job_events(id, pool, framework, podname, output):
     """查询任务事件"""
     pool_id = get_pool_id(pool)
     framework = get_framework_type(framework)
     if podname is not None:
-        get_aijob_pod_events(id, pool_id, podname, framework)
+        get_aijob_pod_events(id, pool_id, podname, framework, output)
     else:
-        get_job_events(id, pool_id, framework)
+        get_job_events(id, pool_id, framework, output)
 
 # 列出任务的Pod列表
 @click.command()
@@ -641,20 +1098,16 @@ def list_pod(id, pool):
     """列出任务的Pod列表"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    resp = client.get_aijob(pool_id, id)
-    pods = resp.result.podList.pods
-    pod_list = []
-    for pod in pods:
-        pod_info = {
-            'replicaType': pod.replicaType,
-            'name': pod.objectMeta.name,
-            'namespace': pod.objectMeta.namespace,
-            'podPhase': pod.podStatus.podPhase,
-            'status': pod.podStatus.status,
-            'creationTimestamp': pod.objectMeta.creationTimestamp
-        }
-        pod_list.append(pod_info)
-    click.echo(tabulate(pod_list, headers="keys", tablefmt="plain"))
+    pods = (get_aijob_dict(client, pool_id, id).get('podList') or {}).get('pods')
+    items = []
+
+    def rows():
+        for pod in pod_records(pods):
+            items.append((pod.name, pod.status))
+            yield pod
+
+    get_row_writer('table', list(PodRecord._fields)).write(rows())
+    record_completion('pod', f"{pool_id}/{id}", items, complete_list=True)
 
 # 连接到任务实例
 @click.command()
@@ -668,14 +1121,98 @@ def job_exec(id, pool, interactive, podname, container, cmd):
     """连接到任务实例"""
     client = get_client()
     pool_id = get_pool_id(pool)
-    resp = client.get_webterminal(pool_id, id, podname)
-    terminal_info = expando_to_dict(resp.result)
+    terminal_info = get_result_json(client, f'/api/v1/aijobs/{id}/pods/{podname}/webterminal',
+                                    {'resourcePoolId': pool_id})
     click.echo('直接连接实例能力暂未实现，当前仅返回连接信息:')
-    click.echo(yaml.dump(terminal_info, allow_unicode=True))
+    click.echo(dump_yaml(terminal_info))
+
+# 启动常驻后台进程
+@click.command()
+@click.option('--foreground', is_flag=True, help='在当前进程运行，不转入后台')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Unix 域套接字路径，默认 ~/.aijob/daemon.sock')
+@click.option('--idle-timeout', default=daemon.IDLE_TIMEOUT, type=click.FloatRange(min=0), show_default=True,
+              help='空闲多少秒后自动退出，0 为不退出')
+def daemon_start(foreground, socket_path, idle_timeout):
+    """启动常驻后台进程，之后 job get/status、pool list 等只读命令由它执行，省去每次的启动和客户端初始化
+
+    设置环境变量 AIHCX_NO_DAEMON=1 可临时不使用 daemon。
+    """
+    if not hasattr(daemon.socket, 'AF_UNIX'):
+        raise click.UsageError("当前系统不支持 Unix 域套接字，无法使用 daemon")
+    path = socket_path or daemon.socket_path()
+    info = daemon.status(path)
+    if info:
+        click.echo(f"daemon 已在运行（pid {info['pid']}，{path}）")
+        return
+    if foreground:
+        click.echo(f"daemon 已启动（pid {os.getpid()}，{path}），按 Ctrl+C 退出", err=True)
+        try:
+            daemon.serve(path, idle_timeout)
+        except KeyboardInterrupt:
+            pass
+        return
+    info = daemon.spawn(path, idle_timeout)
+    if not info:
+        raise click.ClickException(f"daemon 启动失败，请查看日志 {os.path.join(os.path.dirname(path), 'daemon.log')}")
+    click.echo(f"daemon 已启动（pid {info['pid']}，{path}）")
+
+# 停止常驻后台进程
+@click.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Unix 域套接字路径')
+def daemon_stop(socket_path):
+    """停止常驻后台进程"""
+    if daemon.stop(socket_path):
+        click.echo("daemon 已停止")
+    else:
+        click.echo("daemon 未运行")
+
+# 查看常驻后台进程状态
+@click.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), help='Unix 域套接字路径')
+def daemon_status(socket_path):
+    """查看常驻后台进程状态"""
+    info = daemon.status(socket_path)
+    if not info:
+        click.echo("daemon 未运行")
+        click.get_current_context().exit(1)
+    info['started'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['started']))
+    click.echo(format_table([{k.upper(): v for k, v in info.items()}]))
 
 @click.command()
 @click.option('--host', default='127.0.0.1', help='监听地址')
 @click.option('--port', default=38765, help='监听端口')
-def web(host, port):
+@click.option('--engine', default='flask', type=click.Choice(['flask', 'async']), help='服务引擎，async 为基于 ASGI 的异步引擎')
+@click.option('--workers', default=1, type=click.IntRange(min=1), help='工作进程数（仅 async 引擎）')
+@click.option('--log-level', default='INFO', envvar='AIHCX_LOG_LEVEL', show_default=True,
+              type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR'], case_sensitive=False),
+              help='日志级别，INFO 时每个 /api 请求一条访问日志，DEBUG 时输出请求参数和上游请求')
+@click.option('--log-file', envvar='AIHCX_LOG_FILE', type=click.Path(dir_okay=False), help='日志文件，默认输出到标准错误')
+@click.option('--log-format', default='text', envvar='AIHCX_LOG_FORMAT', show_default=True,
+              type=click.Choice(['text', 'json']), help='日志格式，json 为每条日志一行JSON')
+@click.option('--debug', is_flag=True, help='Flask 调试模式（交互式调试器和自动重载），仅用于本机开发')
+def web(host, port, engine, workers, log_level, log_file, log_format, debug):
     """启动Web服务进行参数配置"""
-    run_webserver(host, port)
+    log = dict(log_level=log_level.upper(), log_file=log_file, log_format=log_format)
+    if engine == 'async':
+        if debug:
+            click.echo("async 引擎不支持 --debug，已忽略")
+        from . import asyncserver
+        if not asyncserver.is_available():
+            raise click.UsageError("async 引擎需要安装 uvicorn 和 httpx: pip install 'aihcx[async]'")
+        asyncserver.run_async_webserver(host, port, workers, **log)
+        return
+    if workers > 1:
+        click.echo("Flask 引擎不支持多进程，已忽略 --workers 参数")
+    from .webserver import run_webserver
+    run_webserver(host, port, debug=debug, **log)
+
+@click.command()
+def template_consolidate():
+    """把模板目录中的 JSON 文件合并到单个 SQLite 模板库（模板很多时使用）"""
+    from .template_store import consolidate_templates, get_templates_dir
+
+    templates_dir = get_templates_dir()
+    if not templates_dir:
+        raise click.UsageError("请先设置配置路径: aihcx config --path <目录>")
+    db_path, count = consolidate_templates(templates_dir)
+    click.echo(f"已导入 {count} 个模板到 {db_path}，之后 Web 服务的模板API将使用该数据库（原 JSON 文件保留未删除）")
@@ -0,0 +1,179 @@
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# 各类资源的补全索引有效期（秒），过期后仍先返回旧数据并在后台刷新
+TTLS = {
+    'pool': 3600,
+    'queue': 600,
+    'job': 60,
+    'pod': 30,
+}
+
+# 任务补全索引最多保留最近创建的任务数
+JOB_INDEX_LIMIT = 500
+
+# 后台刷新进行中的标记有效期（秒），期间不重复启动刷新进程
+REFRESH_GRACE = 30
+
+Item = Tuple[str, str]
+
+class CompletionIndex:
+    """本地补全索引（~/.aijob/completion.db）
+
+    按 (资源类型, 作用域) 保存补全候选值，作用域为资源池ID或 "资源池ID/任务ID"，
+    候选值有主键索引，前缀查询只需一次范围扫描。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or Path.home() / '.aijob' / 'completion.db'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=2)
+        self.conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                value TEXT NOT NULL,
+                help TEXT,
+                PRIMARY KEY (kind, scope, value)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS refreshes (
+                kind TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                refreshed_at REAL,
+                refreshing_at REAL,
+                PRIMARY KEY (kind, scope)
+            );
+        ''')
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, kind: str, scope: str, prefix: str) -> Tuple[List[Item], Optional[float]]:
+        """前缀查询，返回 (候选值列表, 索引年龄秒数)；从未刷新过时年龄为 None"""
+        row = self.conn.execute('SELECT refreshed_at FROM refreshes WHERE kind=? AND scope=?',
+                                (kind, scope)).fetchone()
+        age = time.time() - row[0] if row and row[0] is not None else None
+        items = self.conn.execute(
+            'SELECT value, help FROM entries WHERE kind=? AND scope=? AND value >= ? AND value < ? ORDER BY value',
+            (kind, scope, prefix, prefix + '\U0010ffff')).fetchall()
+        return items, age
+
+    def replace(self, kind: str, scope: str, items: Iterable[Item]):
+        """用完整的列表替换索引，并记录刷新时间"""
+        with self.conn:
+            self.conn.execute('DELETE FROM entries WHERE kind=? AND scope=?', (kind, scope))
+            self.conn.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                  ((kind, scope, value, help) for value, help in items))
+            self.conn.execute('INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?, NULL)',
+                              (kind, scope, time.time()))
+
+    def upsert(self, kind: str, scope: str, items: Iterable[Item]):
+        """合并部分数据（如单页列表），不改变刷新时间"""
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                  ((kind, scope, value, help) for value, help in items))
+
+    def is_stale(self, kind: str, scope: str) -> bool:
+        row = self.conn.execute('SELECT refreshed_at FROM refreshes WHERE kind=? AND scope=?',
+                                (kind, scope)).fetchone()
+        return not row or row[0] is None or time.time() - row[0] > TTLS[kind]
+
+    def claim_refresh(self, kind: str, scope: str) -> bool:
+        """标记刷新开始；已有刷新在进行中时返回 False"""
+        now = time.time()
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO refreshes VALUES (?, ?, NULL, NULL)', (kind, scope))
+            cursor = self.conn.execute(
+                'UPDATE refreshes SET refreshing_at=? WHERE kind=? AND scope=? '
+                'AND (refreshing_at IS NULL OR refreshing_at < ?)',
+                (now, kind, scope, now - REFRESH_GRACE))
+            return cursor.rowcount == 1
+
+def fetch_items(kind: str, scope: str) -> List[Item]:
+    """从API拉取某类资源的完整补全候选值"""
+    from .client import get_aijob_dict, get_client, list_aijobs
+
+    client = get_client()
+    if kind == 'pool':
+        items, page = [], 1
+        while True:
+            pools = client.get_all_pools(pageNo=page, pageSize=100).result.resourcePools
+            items.extend((pool.metadata.id, f"{pool.metadata.name} ({pool.status.phase})") for pool in pools)
+            if len(pools) < 100:
+                return items
+            page += 1
+    if kind == 'queue':
+        queues = client.get_all_queues(resourcePoolId=scope).result.queues
+        return [(queue.name, f"{queue.queueType} ({queue.state})") for queue in queues]
+    if kind == 'job':
+        items, page = [], 1
+        while len(items) < JOB_INDEX_LIMIT:
+            jobs = list_aijobs(client, scope, page_no=page, page_size=100).result.jobs
+            items.extend((job.jobId, f"{job.name} ({job.status})") for job in jobs)
+            if len(jobs) < 100:
+                break
+            page += 1
+        return items
+    if kind == 'pod':
+        pool_id, job_id = scope.split('/', 1)
+        pods = get_aijob_dict(client, pool_id, job_id)['podList']['pods']
+        return [(pod['objectMeta']['name'], f"{pod['podStatus']['status']}") for pod in pods]
+    raise ValueError(f"未知的补全类型: {kind}")
+
+def refresh(kind: str, scope: str):
+    """同步刷新索引"""
+    items = fetch_items(kind, scope)
+    index = CompletionIndex()
+    try:
+        index.replace(kind, scope, items)
+    finally:
+        index.close()
+
+def spawn_refresh(kind: str, scope: str):
+    """启动独立的后台进程刷新索引，不阻塞当前命令"""
+    import subprocess
+
+    if getattr(sys, 'frozen', False):
+        # PyInstaller 打包的可执行文件
+        cmd = [sys.executable]
+    else:
+        cmd = [sys.executable, '-m', 'aihcx.cli']
+    subprocess.Popen(cmd + ['completion-refresh', kind, scope],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+def complete(kind: str, scope: str, prefix: str) -> List[Item]:
+    """补全查询：索引存在时直接返回（过期则后台刷新），索引不存在时才同步拉取"""
+    index = CompletionIndex()
+    try:
+        items, age = index.lookup(kind, scope, prefix)
+        if age is None:
+            all_items = fetch_items(kind, scope)
+            index.replace(kind, scope, all_items)
+            return sorted(item for item in all_items if item[0].startswith(prefix))
+        if age > TTLS[kind] and index.claim_refresh(kind, scope):
+            spawn_refresh(kind, scope)
+        return items
+    finally:
+        index.close()
+
+def record(kind: str, scope: str, items: Iterable[Item], complete_list: bool = False):
+    """普通命令顺带更新索引；complete_list 表示 items 是完整列表。索引过期时触发后台刷新"""
+    try:
+        index = CompletionIndex()
+        try:
+            if complete_list:
+                index.replace(kind, scope, items)
+                return
+            index.upsert(kind, scope, items)
+            if index.is_stale(kind, scope) and index.claim_refresh(kind, scope):
+                spawn_refresh(kind, scope)
+        finally:
+            index.close()
+    except Exception:
+        # 索引只是加速补全，任何错误都不影响命令本身
+        pass
@@ -0,0 +1,114 @@
+"""响应压缩（gzip/brotli）与 ETag 条件请求，Flask 与 async 引擎共用"""
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional, Set, Tuple
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：pip install aihcx[brotli]
+    brotli = None
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _available() -> Tuple[str, ...]:
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def preferred_encoding() -> str:
+    """缓存中保存响应体时使用的压缩格式"""
+    return _available()[0]
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """解析 Accept-Encoding，忽略 q=0 的格式"""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    return accepted
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(body, GZIP_LEVEL)
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+def decompress(body: bytes, encoding: str) -> Optional[bytes]:
+    """解压响应体；不支持的压缩格式返回 None"""
+    if encoding == 'identity':
+        return body
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br' and brotli is not None:
+        return brotli.decompress(body)
+    return None
+
+def make_etag(body: bytes) -> str:
+    """由未压缩的响应体生成强 ETag"""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def json_body(data) -> Tuple[bytes, str]:
+    """把本地生成的数据规范化（键排序）序列化，返回 (响应体, ETag)，ETag 与字典键顺序无关"""
+    body = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return body, make_etag(body)
+
+def _etag_with_encoding(etag: str, encoding: str) -> str:
+    # 不同压缩格式是不同的表示，强 ETag 带上压缩格式后缀
+    return etag if encoding == 'identity' else f'{etag[:-1]}-{encoding}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，忽略压缩格式后缀）"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == base or candidate.split('-', 1)[0] == base:
+            return True
+    return False
+
+def negotiate(body: bytes, etag: Optional[str], accept_encoding: str, if_none_match: str,
+              encoding: str = 'identity') -> Tuple[bool, bytes, Dict[str, str]]:
+    """按请求头协商响应，返回 (是否返回 304, 响应体, 附加的响应头)
+
+    body 是以 encoding 压缩的响应体；浏览器接受该格式时原样返回，
+    否则解压后按浏览器支持的格式（br 优先，其次 gzip）重新压缩，过小的响应不压缩。
+    """
+    accepted = accepted_encodings(accept_encoding)
+    if encoding != 'identity' and (encoding in accepted or encoding not in ('gzip', 'br')):
+        # 浏览器支持该格式（或无法解压的未知格式）时原样返回
+        target = encoding
+    else:
+        usable = [e for e in _available() if e in accepted]
+        size = len(body) if encoding == 'identity' else MIN_COMPRESS_SIZE
+        target = usable[0] if usable and size >= MIN_COMPRESS_SIZE else 'identity'
+
+    headers = {'Vary': 'Accept-Encoding'}
+    if etag:
+        headers['ETag'] = _etag_with_encoding(etag, target)
+        if etag_matches(if_none_match, etag):
+            return True, b'', headers
+    if target != encoding:
+        body = compress(decompress(body, encoding), target)
+    if target != 'identity':
+        headers['Content-Encoding'] = target
+    return False, body, headers
@@ -0,0 +1,363 @@
+"""常驻后台进程（aihcx daemon）
+
+aihcx daemon start 启动一个常驻进程，预先导入命令模块、读取配置并创建客户端，连接池和缓存常驻内存，
+通过 Unix 域套接字（默认 ~/.aijob/daemon.sock）执行 CLI 命令。aihcx 入口（main）只导入标准库，
+daemon 在运行时把 FORWARD_COMMANDS 中的只读短命令（不带 LONG_RUNNING_OPTIONS）转发给它执行，
+未运行、版本或环境变量不一致、连接失败时在当前进程内执行，结果与不使用 daemon 时一致。
+
+协议：客户端发送一行 JSON 请求，daemon 逐帧返回：1 字节通道 + 4 字节长度 + 内容，
+通道 1/2 为标准输出/标准错误，x 为退出码，r 表示拒绝执行（客户端改为进程内执行）。
+"""
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from . import __version__
+
+# 转发给 daemon 执行的命令：只读、不需要终端交互、很快结束
+FORWARD_COMMANDS = {
+    ('version',),
+    ('job', 'list'), ('job', 'get'), ('job', 'status'), ('job', 'pods'), ('job', 'events'), ('job', 'query'),
+    ('pool', 'list'), ('pool', 'get'),
+    ('queue', 'list'), ('queue', 'get'),
+    ('node', 'list'),
+}
+
+# 带这些选项时要拉取多页或多个资源池（job list --all、--pools、job query --sync 等），耗时较长，不转发
+LONG_RUNNING_OPTIONS = ('--all', '--all-pools', '--pools', '--sync')
+
+# 设置后不转发，总是在当前进程内执行
+DISABLE_ENV = 'AIHCX_NO_DAEMON'
+SOCKET_ENV = 'AIHCX_DAEMON_SOCKET'
+
+# 默认空闲多久（秒）后退出
+IDLE_TIMEOUT = 1800
+
+_FRAME = struct.Struct('!cI')
+STDOUT, STDERR, EXIT, REFUSE = b'1', b'2', b'x', b'r'
+
+def socket_path() -> str:
+    return os.environ.get(SOCKET_ENV) or os.path.join(os.path.expanduser('~'), '.aijob', 'daemon.sock')
+
+def daemon_env() -> Dict[str, str]:
+    """影响命令结果的环境变量，客户端与 daemon 不一致时不转发"""
+    return {k: v for k, v in os.environ.items()
+            if (k == 'HOME' or k.startswith(('AIHC_', 'AIHCX_'))) and k not in (DISABLE_ENV, SOCKET_ENV)}
+
+def should_forward(argv: List[str]) -> bool:
+    if not hasattr(socket, 'AF_UNIX') or os.environ.get(DISABLE_ENV) or '_AIHCX_COMPLETE' in os.environ:
+        return False
+    # 顶层选项（--timing、--profile-out 等）要在当前进程内计时或剖析，不转发
+    words = []
+    for arg in argv[:2]:
+        if arg.startswith('-'):
+            break
+        words.append(arg)
+    if not words or not (tuple(words) in FORWARD_COMMANDS or tuple(words[:1]) in FORWARD_COMMANDS):
+        return False
+    return not any(arg.split('=', 1)[0] in LONG_RUNNING_OPTIONS for arg in argv[len(words):])
+
+def _connect(path: str, timeout: Optional[float] = None) -> Optional[socket.socket]:
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+def request(op: str, path: Optional[str] = None, timeout: Optional[float] = None, **fields):
+    """发送请求并逐帧产出 (通道, 内容)；daemon 未运行时返回 None"""
+    sock = _connect(path or socket_path(), timeout)
+    if sock is None:
+        return None
+
+    def frames():
+        with sock, sock.makefile('rb') as reader:
+            sock.sendall(json.dumps(dict(fields, op=op, version=__version__)).encode('utf-8') + b'\n')
+            while True:
+                header = reader.read(_FRAME.size)
+                if len(header) < _FRAME.size:
+                    return
+                channel, size = _FRAME.unpack(header)
+                yield channel, reader.read(size)
+    return frames()
+
+def forward(argv: List[str]) -> Optional[int]:
+    """把命令转发给 daemon 执行，返回退出码；需要在当前进程内执行时返回 None"""
+    frames = request('run', argv=argv, env=daemon_env(), tty=[sys.stdout.isatty(), sys.stderr.isatty()])
+    if frames is None:
+        return None
+    outputs = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+    started = False
+    try:
+        for channel, payload in frames:
+            if channel in outputs:
+                started = True
+                outputs[channel].write(payload)
+                outputs[channel].flush()
+            elif channel == EXIT:
+                return int(payload)
+            elif channel == REFUSE:
+                return None
+    except KeyboardInterrupt:
+        return 130
+    except OSError:
+        pass
+    if not started:
+        return None
+    # 已有部分输出时不再重新执行，避免输出重复
+    sys.stderr.write("aihcx daemon 连接中断，命令可能未执行完成\n")
+    return 1
+
+def main():
+    """aihcx 入口：daemon 运行时转发命令，否则在当前进程内执行"""
+    argv = sys.argv[1:]
+    if should_forward(argv):
+        code = forward(argv)
+        if code is not None:
+            sys.exit(code)
+    from .cli import cli
+    cli(prog_name='aihcx')
+
+# ---- daemon 端 ----
+
+_local = threading.local()
+
+class _ThreadStream:
+    """sys.stdin/stdout/stderr 的替身：执行命令的线程读写各自的连接，其它线程使用原来的流"""
+
+    def __init__(self, name: str, default):
+        self._name = name
+        self._default = default
+
+    def __getattr__(self, attr):
+        return getattr(getattr(_local, self._name, None) or self._default, attr)
+
+class _FrameWriter(io.RawIOBase):
+    """把写入的字节按帧发送到连接，同一连接的各个通道共用一把锁"""
+
+    def __init__(self, sock: socket.socket, channel: bytes, lock: threading.Lock, tty: bool = False):
+        super().__init__()
+        self.sock = sock
+        self.channel = channel
+        self.lock = lock
+        self.tty = tty
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def write(self, data) -> int:
+        self.send(bytes(data))
+        return len(data)
+
+    def send(self, data: bytes):
+        with self.lock:
+            self.sock.sendall(_FRAME.pack(self.channel, len(data)) + data)
+
+def _text_stream(writer: _FrameWriter):
+    return io.TextIOWrapper(io.BufferedWriter(writer, 65536), encoding='utf-8', line_buffering=True)
+
+def run_command(argv: List[str]) -> int:
+    """在当前线程内执行一条命令，输出写到 sys.stdout/sys.stderr，返回退出码"""
+    import traceback
+    from .cli import cli
+
+    try:
+        cli.main(args=argv, prog_name='aihcx')
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        sys.stderr.write(f"{e.code}\n")
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+class DaemonServer:
+    """Unix 域套接字服务，每个连接一个线程，空闲超过 idle_timeout 秒后退出"""
+
+    def __init__(self, path: str, idle_timeout: float = IDLE_TIMEOUT):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.last_active = time.monotonic()
+        self.active = 0
+        self.served = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def stats(self) -> Dict:
+        return {'pid': os.getpid(), 'version': __version__, 'socket': self.path, 'started': self.started,
+                'uptime': round(time.time() - self.started, 1), 'served': self.served, 'active': self.active,
+                'idle_timeout': self.idle_timeout}
+
+    def handle(self, sock: socket.socket):
+        with self._lock:
+            self.active += 1
+        lock = threading.Lock()
+        try:
+            line = sock.makefile('rb').readline()
+            req = json.loads(line) if line else {}
+            op = req.get('op')
+            if op == 'status':
+                _FrameWriter(sock, STDOUT, lock).send(json.dumps(self.stats()).encode('utf-8'))
+                _FrameWriter(sock, EXIT, lock).send(b'0')
+            elif op == 'stop':
+                _FrameWriter(sock, EXIT, lock).send(b'0')
+                threading.Thread(target=self._server.shutdown, daemon=True).start()
+            elif op == 'run':
+                self.run(sock, req, lock)
+        except OSError:
+            pass  # 客户端已断开
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.served += 1
+                self.last_active = time.monotonic()
+            sock.close()
+
+    def run(self, sock: socket.socket, req: Dict, lock: threading.Lock):
+        argv = req.get('argv') or []
+        reason = None
+        if req.get('version') != __version__:
+            reason = f"版本不一致（daemon {__version__}）"
+        elif req.get('env') != daemon_env():
+            reason = "环境变量不一致"
+        elif not should_forward(argv):
+            reason = "该命令不由 daemon 执行"
+        if reason:
+            _FrameWriter(sock, REFUSE, lock).send(reason.encode('utf-8'))
+            return
+
+        tty = req.get('tty') or [False, False]
+        _local.stdout = _text_stream(_FrameWriter(sock, STDOUT, lock, bool(tty[0])))
+        _local.stderr = _text_stream(_FrameWriter(sock, STDERR, lock, bool(tty[1])))
+        _local.stdin = io.StringIO()
+        try:
+            code = run_command(argv)
+            for stream in (_local.stdout, _local.stderr):
+                stream.flush()
+        finally:
+            _local.stdout = _local.stderr = _local.stdin = None
+        _FrameWriter(sock, EXIT, lock).send(str(code).encode('ascii'))
+
+    def watch_idle(self):
+        while True:
+            time.sleep(min(60.0, self.idle_timeout / 4))
+            with self._lock:
+                idle = self.active == 0 and time.monotonic() - self.last_active > self.idle_timeout
+            if idle:
+                self._server.shutdown()
+                return
+
+    def serve(self):
+        import socketserver
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon.handle(self.request)
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        # 套接字只允许当前用户连接
+        umask = os.umask(0o177)
+        try:
+            self._server = Server(self.path, Handler)
+        finally:
+            os.umask(umask)
+        sys.stdin = _ThreadStream('stdin', sys.stdin)
+        sys.stdout = _ThreadStream('stdout', sys.stdout)
+        sys.stderr = _ThreadStream('stderr', sys.stderr)
+        if self.idle_timeout:
+            threading.Thread(target=self.watch_idle, daemon=True).start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+def warm_up():
+    """预先导入命令模块和常用依赖，创建客户端"""
+    from . import commands
+    from .client import client_registry
+    # 只为提前导入，命令执行时不再付出导入开销
+    import tabulate  # noqa: F401
+    import yaml  # noqa: F401
+
+    try:
+        if client_registry.config().get('host'):
+            commands.get_client()
+    except Exception:
+        pass
+
+def status(path: Optional[str] = None) -> Optional[Dict]:
+    """daemon 运行时返回其状态，否则返回 None"""
+    frames = request('status', path, timeout=5)
+    if frames is None:
+        return None
+    try:
+        for channel, payload in frames:
+            if channel == STDOUT:
+                return json.loads(payload)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def stop(path: Optional[str] = None) -> bool:
+    frames = request('stop', path, timeout=5)
+    if frames is None:
+        return False
+    for _ in frames:
+        pass
+    return True
+
+def serve(path: Optional[str] = None, idle_timeout: float = IDLE_TIMEOUT):
+    """在当前进程运行 daemon，直到 stop 或空闲超时"""
+    warm_up()
+    DaemonServer(path or socket_path(), idle_timeout).serve()
+
+def spawn(path: Optional[str] = None, idle_timeout: float = IDLE_TIMEOUT, wait: float = 10.0) -> Optional[Dict]:
+    """启动独立的后台进程运行 daemon，等待可以连接后返回其状态"""
+    import subprocess
+
+    path = path or socket_path()
+    if getattr(sys, 'frozen', False):
+        cmd = [sys.executable]
+    else:
+        cmd = [sys.executable, '-m', 'aihcx.cli']
+    log_path = os.path.join(os.path.dirname(path), 'daemon.log')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(log_path, 'ab') as log:
+        proc = subprocess.Popen(cmd + ['daemon', 'start', '--foreground', '--socket', path,
+                                       '--idle-timeout', str(idle_timeout)],
+                                stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline and proc.poll() is None:
+        info = status(path)
+        if info:
+            return info
+        time.sleep(0.05)
+    return None
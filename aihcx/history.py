@@ -0,0 +1,280 @@
+"""本地任务历史库（~/.aijob/history.db），aihcx sync 增量同步，aihcx job query 离线查询
+
+每个资源池记录两个水位：已同步到的最新创建时间，以及本地仍未结束的任务中最早的创建时间。
+增量同步按创建时间倒序分页，拉到比两个水位都早的任务为止：更早的任务都已结束，不会再变化。
+首次同步（或 --full）拉取全部任务，--full 还会删除服务端已不存在的任务。
+本地未结束的任务都不早于水位，增量同步没有再拉到的说明已在服务端删除，同样删除，不会一直拉低水位。
+"""
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .client import error_message, get_result_json
+from .parallel import DEFAULT_WORKERS, imap_ordered
+from .watch import TERMINAL_STATUSES
+
+# 同步时每页的任务数
+PAGE_SIZE = 100
+
+# job query 可用的分组维度及对应的SQL表达式（时间按本地时区）
+GROUP_COLUMNS = {
+    'pool': 'pool',
+    'queue': 'queue',
+    'status': 'status',
+    'priority': 'priority',
+    'name': 'name',
+    'day': "strftime('%Y-%m-%d', {ts}, 'unixepoch', 'localtime')",
+    'week': "strftime('%Y-W%W', {ts}, 'unixepoch', 'localtime')",
+    'month': "strftime('%Y-%m', {ts}, 'unixepoch', 'localtime')",
+}
+
+# 时间范围和按时间分组使用的字段
+TIME_FIELDS = {'created': 'created_ts', 'running': 'running_ts', 'finished': 'finished_ts'}
+
+JOB_QUERY_HEADERS = ['POOL', 'ID', 'NAME', 'STATUS', 'QUEUE', 'PRIORITY', 'GPUS', 'CREATED_AT', 'RUNNING_AT', 'FINISHED_AT']
+
+# 分组查询的聚合列：任务数、GPU数合计、GPU小时（运行中的任务算到当前时间）、平均运行分钟数
+AGGREGATES = {
+    'COUNT': 'COUNT(*)',
+    'GPUS': 'TOTAL(gpus)',
+    'GPU_HOURS': 'ROUND(TOTAL(gpus * MAX(0, COALESCE(finished_ts, :now) - running_ts)) / 3600, 2)',
+    'AVG_RUN_MIN': 'ROUND(AVG(COALESCE(finished_ts, :now) - running_ts) / 60, 1)',
+}
+
+SYNC_HEADERS = ['POOL', 'MODE', 'PAGES', 'FETCHED', 'NEW', 'UPDATED', 'DELETED', 'SECONDS', 'ERROR']
+
+def parse_time(value) -> Optional[float]:
+    """接口返回的 ISO 8601 时间（如 2024-01-01T08:00:00Z）转为 Unix 时间戳，无时区时按 UTC"""
+    if not value:
+        return None
+    text = str(value).strip().replace('Z', '+00:00')
+    if '.' in text:
+        # fromisoformat 只支持最多6位小数
+        head, _, tail = text.partition('.')
+        digits = len(tail) - len(tail.lstrip('0123456789'))
+        text = head + '.' + tail[:min(digits, 6)].ljust(6, '0') + tail[digits:]
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def job_gpus(job: Dict) -> float:
+    """任务使用的GPU数：resources 中名称含 gpu 的数量之和乘以副本数"""
+    gpus = 0.0
+    for resource in job.get('resources') or []:
+        if isinstance(resource, dict) and 'gpu' in str(resource.get('name', '')).lower():
+            try:
+                gpus += float(resource.get('quantity') or 0)
+            except (TypeError, ValueError):
+                pass
+    try:
+        replicas = int(job.get('replicas') or 1)
+    except (TypeError, ValueError):
+        replicas = 1
+    return gpus * replicas
+
+def job_record(pool_id: str, job: Dict, synced_at: float) -> tuple:
+    return (
+        pool_id, job.get('jobId'), job.get('name'), job.get('status'), job.get('queue') or job.get('queueName'),
+        job.get('priority'), job.get('createdAt'), parse_time(job.get('createdAt')),
+        job.get('runningAt'), parse_time(job.get('runningAt')),
+        job.get('finishedAt'), parse_time(job.get('finishedAt')),
+        job_gpus(job), json.dumps(job.get('resources'), ensure_ascii=False) if job.get('resources') else None,
+        synced_at,
+    )
+
+class HistoryStore:
+    """任务元数据的本地 SQLite 库"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or Path.home() / '.aijob' / 'history.db'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=5)
+        self.conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                pool TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                name TEXT,
+                status TEXT,
+                queue TEXT,
+                priority TEXT,
+                created_at TEXT,
+                created_ts REAL,
+                running_at TEXT,
+                running_ts REAL,
+                finished_at TEXT,
+                finished_ts REAL,
+                gpus REAL,
+                resources TEXT,
+                synced_at REAL,
+                PRIMARY KEY (pool, job_id)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_created ON jobs (pool, created_ts);
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (pool, status);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                pool TEXT PRIMARY KEY,
+                newest_ts REAL,
+                synced_at REAL,
+                full_synced_at REAL
+            );
+        ''')
+
+    def close(self):
+        self.conn.close()
+
+    def sync_floor(self, pool_id: str) -> Optional[float]:
+        """增量同步需要拉取到的最早创建时间；从未同步过时为 None（需要全量同步）"""
+        row = self.conn.execute('SELECT newest_ts FROM watermarks WHERE pool=?', (pool_id,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        placeholders = ','.join('?' * len(TERMINAL_STATUSES))
+        active = self.conn.execute(
+            f'SELECT MIN(created_ts) FROM jobs WHERE pool=? AND status NOT IN ({placeholders})',
+            (pool_id, *sorted(TERMINAL_STATUSES))).fetchone()[0]
+        return row[0] if active is None else min(row[0], active)
+
+    def save(self, pool_id: str, jobs: List[Dict], full: bool) -> Tuple[int, int, int]:
+        """写入一个资源池的同步结果并更新水位，返回 (新增, 变化, 删除) 的任务数"""
+        now = time.time()
+        records = [job_record(pool_id, job, now) for job in jobs if job.get('jobId')]
+        existing = {job_id: (status, finished_at) for job_id, status, finished_at in self.conn.execute(
+            "SELECT job_id, status, COALESCE(finished_at, '') FROM jobs WHERE pool=?", (pool_id,))}
+        new = sum(1 for r in records if r[1] not in existing)
+        updated = sum(1 for r in records if r[1] in existing and existing[r[1]] != (r[3], r[10] or ''))
+        seen = {r[1] for r in records}
+        # 全量同步删除所有没有拉到的任务；增量同步只删除没有拉到的未结束任务（更早的已结束任务不在拉取范围内）
+        stale = [(pool_id, job_id) for job_id, (status, _) in existing.items()
+                 if job_id not in seen and (full or status not in TERMINAL_STATUSES)]
+        with self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO jobs VALUES ({','.join('?' * 15)})", records)
+            self.conn.executemany('DELETE FROM jobs WHERE pool=? AND job_id=?', stale)
+            newest = self.conn.execute('SELECT MAX(created_ts) FROM jobs WHERE pool=?', (pool_id,)).fetchone()[0]
+            self.conn.execute(
+                'INSERT INTO watermarks VALUES (?, ?, ?, ?) ON CONFLICT(pool) DO UPDATE SET '
+                'newest_ts=excluded.newest_ts, synced_at=excluded.synced_at, '
+                'full_synced_at=COALESCE(excluded.full_synced_at, full_synced_at)',
+                (pool_id, newest, now, now if full else None))
+        return new, updated, len(stale)
+
+    def pools(self) -> List[str]:
+        return [row[0] for row in self.conn.execute('SELECT pool FROM watermarks ORDER BY pool')]
+
+    def synced_at(self, pool_ids: Iterable[str]) -> Optional[float]:
+        """这些资源池中最早的同步时间，有未同步过的资源池时为 None"""
+        times = []
+        for pool_id in pool_ids:
+            row = self.conn.execute('SELECT synced_at FROM watermarks WHERE pool=?', (pool_id,)).fetchone()
+            if not row:
+                return None
+            times.append(row[0])
+        return min(times) if times else None
+
+    def query(self, pool_ids: List[str], statuses: Iterable[str] = (), queues: Iterable[str] = (),
+              name: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              time_field: str = 'created', group_by: Iterable[str] = (), limit: Optional[int] = None) -> List[Dict]:
+        """按条件查询任务列表，指定 group_by 时返回分组聚合结果"""
+        ts = TIME_FIELDS[time_field]
+        where, params = [], {'now': time.time()}
+
+        def condition(column, values, prefix):
+            names = []
+            for i, value in enumerate(values):
+                params[f'{prefix}{i}'] = value
+                names.append(f':{prefix}{i}')
+            if names:
+                where.append(f"{column} IN ({','.join(names)})")
+
+        condition('pool', pool_ids, 'pool')
+        condition('status', statuses, 'status')
+        condition('queue', queues, 'queue')
+        if name:
+            where.append("name GLOB :name" if any(c in name for c in '*?[') else "instr(name, :name) > 0")
+            params['name'] = name
+        if since is not None:
+            where.append(f'{ts} >= :since')
+            params['since'] = since
+        if until is not None:
+            where.append(f'{ts} < :until')
+            params['until'] = until
+        where_sql = ' WHERE ' + ' AND '.join(where) if where else ''
+
+        group_by = list(group_by)
+        if group_by:
+            keys = [f"{GROUP_COLUMNS[g].format(ts=ts)} AS {g.upper()}" for g in group_by]
+            aggregates = [f'{expr} AS {name}' for name, expr in AGGREGATES.items()]
+            sql = (f"SELECT {', '.join(keys + aggregates)} FROM jobs{where_sql} "
+                   f"GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))} "
+                   f"ORDER BY {', '.join(str(i + 1) for i in range(len(keys)))}")
+        else:
+            sql = (f"SELECT pool, job_id, name, status, queue, priority, gpus, created_at, running_at, finished_at "
+                   f"FROM jobs{where_sql} ORDER BY created_ts DESC")
+        if limit:
+            sql += ' LIMIT :limit'
+            params['limit'] = limit
+        cursor = self.conn.execute(sql, params)
+        headers = [d[0].upper() for d in cursor.description] if group_by else JOB_QUERY_HEADERS
+        return [dict(zip(headers, row)) for row in cursor]
+
+def fetch_pool_jobs(client, pool_id: str, floor: Optional[float], workers: int) -> Tuple[List[Dict], int]:
+    """拉取一个资源池需要同步的任务，返回 (任务列表, 请求页数)
+
+    floor 为 None 时全量拉取：按创建时间正序，第一页得到总数后其余页并发拉取（同步期间新建的任务排在末尾，
+    不会使已有任务错位；它们晚于本次的水位，下次增量同步时拉取）。
+    否则按创建时间倒序逐页拉取，直到某页出现早于 floor 的任务；倒序分页时有新任务创建只会导致重复，不会遗漏。
+    """
+    def fetch(page, order='desc'):
+        result = get_result_json(client, '/api/v1/aijobs', {
+            'resourcePoolId': pool_id, 'orderBy': 'createdAt', 'order': order,
+            'pageNo': page, 'pageSize': PAGE_SIZE})
+        return result.get('jobs') or [], result
+
+    order = 'asc' if floor is None else 'desc'
+    jobs, first = fetch(1, order)
+    pages = 1
+    total = first.get('totalCount', first.get('total'))
+    if floor is None and total is not None and len(jobs) >= PAGE_SIZE:
+        rest = range(2, -(-int(total) // PAGE_SIZE) + 1)
+        for page_jobs, _ in imap_ordered(lambda page: fetch(page, order), rest, workers):
+            jobs.extend(page_jobs)
+        return jobs, pages + len(rest)
+
+    page_jobs = jobs
+    while len(page_jobs) >= PAGE_SIZE:
+        if floor is not None and any((parse_time(j.get('createdAt')) or 0) < floor for j in page_jobs):
+            break
+        pages += 1
+        page_jobs, _ = fetch(pages, order)
+        jobs.extend(page_jobs)
+    return jobs, pages
+
+def sync_pools(client, pool_ids: List[str], full: bool = False, workers: int = DEFAULT_WORKERS,
+               store: Optional[HistoryStore] = None):
+    """同步多个资源池，资源池之间并发；逐个产出同步结果行"""
+    store = store or HistoryStore()
+    floors = {pool_id: None if full else store.sync_floor(pool_id) for pool_id in pool_ids}
+    page_workers = max(1, workers // min(workers, len(pool_ids) or 1))
+
+    def run(pool_id):
+        start = time.monotonic()
+        try:
+            jobs, pages = fetch_pool_jobs(client, pool_id, floors[pool_id], page_workers)
+            return pool_id, jobs, pages, None, start
+        except Exception as e:
+            return pool_id, [], 0, e, start
+
+    for pool_id, jobs, pages, error, start in imap_ordered(run, pool_ids, workers):
+        row = {'POOL': pool_id, 'MODE': 'full' if floors[pool_id] is None else 'incremental',
+               'PAGES': pages, 'FETCHED': len(jobs), 'NEW': 0, 'UPDATED': 0, 'DELETED': 0, 'ERROR': ''}
+        if error is None:
+            row['NEW'], row['UPDATED'], row['DELETED'] = store.save(pool_id, jobs, floors[pool_id] is None and full)
+        else:
+            row['ERROR'] = error_message(error)
+        row['SECONDS'] = round(time.monotonic() - start, 2)
+        yield row
@@ -0,0 +1,99 @@
+import re
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from .client import parse_raw_json
+
+# --since 支持的时长单位
+SINCE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# 跟随模式下，相邻两次查询的时间窗口重叠的秒数（重叠部分的重复行会被去掉）
+WINDOW_OVERLAP = 1
+
+# 用于去重的上一批日志末尾行数
+OVERLAP_LINES = 200
+
+# 多 Pod 合并输出时前缀的颜色
+PREFIX_COLORS = ['cyan', 'green', 'yellow', 'magenta', 'blue', 'red']
+
+def parse_since(value: str, now: Optional[float] = None) -> int:
+    """解析 --since：相对时长（如 30s、10m、2h、1d）或绝对时间（YYYY-MM-DD HH:MM:SS），返回 Unix 时间戳"""
+    now = time.time() if now is None else now
+    match = re.fullmatch(r'(\d+)([smhd])', value.strip())
+    if match:
+        return int(now - int(match.group(1)) * SINCE_UNITS[match.group(2)])
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return int(datetime.strptime(value.strip(), fmt).timestamp())
+        except ValueError:
+            pass
+    raise ValueError(f"无法解析时间: {value}，示例: 10m、2h、'2024-01-01 08:00:00'")
+
+def fetch_pod_logs(client, pool_id: str, job_id: str, pod_name: str, start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, max_lines: Optional[int] = None) -> List[str]:
+    """查询一个 Pod 在时间窗口内的日志，返回原始日志行（不做任何对象转换）"""
+    from baidubce.http import http_methods
+
+    params = {'resourcePoolId': pool_id}
+    if start_time is not None:
+        params['startTime'] = start_time
+    if end_time is not None:
+        params['endTime'] = end_time
+    if max_lines is not None:
+        params['maxLines'] = max_lines
+    path = f'/api/v1/aijobs/{job_id}/pods/{pod_name}/logs'.encode('utf-8')
+    resp = client._send_request(http_methods.GET, path, params=params, body_parser=parse_raw_json)
+    logs = (resp.payload.get('result') or {}).get('logs') or []
+    if isinstance(logs, str):
+        return logs.splitlines()
+    return [line.rstrip('\n') for line in logs]
+
+def strip_overlap(previous: List[str], lines: List[str]) -> List[str]:
+    """去掉 lines 中与上一批重叠的部分（相邻时间窗口有重叠）
+
+    在 lines 中找到上一批最后一行的位置，且它之前的行与上一批的末尾一致，只返回其后的行；
+    找不到时说明两批没有重叠，原样返回。
+    """
+    if not previous:
+        return lines
+    last = previous[-1]
+    for i, line in enumerate(lines):
+        if line == last:
+            m = min(len(previous), i + 1)
+            if lines[i - m + 1:i + 1] == previous[-m:]:
+                return lines[i + 1:]
+    return lines
+
+class LogFollower:
+    """按时间窗口增量拉取一个 Pod 的日志
+
+    每次查询 [上次结束时间 - WINDOW_OVERLAP, 当前时间]，用上一批的末尾行去掉重叠部分，
+    内存中只保留最近 OVERLAP_LINES 行。
+    """
+
+    def __init__(self, client, pool_id: str, job_id: str, pod_name: str,
+                 since: Optional[int] = None, tail: Optional[int] = None):
+        self.client = client
+        self.pool_id = pool_id
+        self.job_id = job_id
+        self.pod_name = pod_name
+        self.start_time = since
+        self.tail = tail
+        self.previous = []
+
+    def fetch(self) -> List[str]:
+        """拉取新产生的日志行"""
+        end_time = int(time.time())
+        first = not self.previous and self.tail is not None
+        lines = fetch_pod_logs(self.client, self.pool_id, self.job_id, self.pod_name,
+                               start_time=self.start_time, end_time=end_time,
+                               max_lines=self.tail if first else None)
+        if first:
+            lines = lines[-self.tail:] if self.tail else []
+            self.tail = None
+        new_lines = strip_overlap(self.previous, lines)
+        if lines:
+            self.previous = (self.previous + new_lines)[-OVERLAP_LINES:]
+        self.start_time = end_time - WINDOW_OVERLAP
+        return new_lines
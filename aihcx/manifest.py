@@ -0,0 +1,154 @@
+"""批量创建任务的清单（manifest）解析
+
+清单可以是 YAML/JSON 文件、JSONL 文件（每行一个条目）或目录（每个 .json/.yaml 文件是一个完整的任务配置）。
+YAML/JSON 文件的内容可以是单个条目、条目列表，或 {defaults: {...}, jobs: [...]}。每个条目支持：
+
+    base:   任务配置文件路径（相对清单所在目录）
+    config: 任务配置，深度合并到 base 之上
+    name:   任务名称，可使用 {{ 参数名 }} 占位符
+    pool:   资源池ID
+    grid:   参数网格 {参数名: [取值, ...]}，按笛卡尔积展开为多个任务
+
+配置中字符串里的 {{ 参数名 }} 会替换为参数值；整个字符串只有一个占位符时保留参数值的原始类型。
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+MANIFEST_SUFFIXES = ('.json', '.jsonl', '.yaml', '.yml')
+
+class ManifestJob(NamedTuple):
+    """展开后的单个待提交任务"""
+    token: str
+    name: str
+    pool: Optional[str]
+    params: Dict
+    config: Dict
+
+class ManifestError(ValueError):
+    """清单格式错误"""
+
+def _load_file(path: str):
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        if path.endswith('.json'):
+            return json.load(f)
+        import yaml
+        return yaml.safe_load(f)
+
+def _deep_merge(base, override):
+    if isinstance(base, dict) and isinstance(override, dict):
+        merged = dict(base)
+        for key, value in override.items():
+            merged[key] = _deep_merge(base.get(key), value)
+        return merged
+    return override
+
+def _render(value, params: Dict):
+    """替换配置中的 {{ 参数名 }} 占位符"""
+    if isinstance(value, dict):
+        return {k: _render(v, params) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, params) for v in value]
+    if not isinstance(value, str) or '{{' not in value:
+        return value
+    whole = PLACEHOLDER.fullmatch(value.strip())
+    if whole and whole.group(1) in params:
+        return params[whole.group(1)]
+
+    def replace(match):
+        if match.group(1) not in params:
+            raise ManifestError(f"未定义的参数: {match.group(1)}")
+        return str(params[match.group(1)])
+    return PLACEHOLDER.sub(replace, value)
+
+def client_token(pool: Optional[str], config: Dict) -> str:
+    """由资源池和最终任务配置的内容哈希得到的幂等 clientToken，相同内容重复提交得到相同的 token"""
+    canonical = json.dumps({'pool': pool, 'config': config}, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return 'aihcx-' + hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+def _expand_entry(entry: Dict, base_dir: str, default_pool: Optional[str]) -> Iterable[ManifestJob]:
+    if not isinstance(entry, dict):
+        raise ManifestError(f"清单条目必须是对象: {entry!r}")
+    config = {}
+    if entry.get('base'):
+        config = _load_file(os.path.join(base_dir, entry['base']))
+    if 'config' in entry:
+        config = _deep_merge(config, entry['config'])
+    elif not entry.get('base'):
+        # 没有 base/config 时整个条目就是任务配置
+        config = {k: v for k, v in entry.items() if k not in ('grid', 'pool')}
+    grid = entry.get('grid') or {}
+    if not isinstance(grid, dict) or not all(isinstance(v, list) and v for v in grid.values()):
+        raise ManifestError("grid 必须是 {参数名: [取值, ...]}，且取值列表不能为空")
+
+    names = list(grid)
+    for values in itertools.product(*(grid[n] for n in names)):
+        params = dict(zip(names, values))
+        job_config = _render(config, params)
+        # 按渲染前的名称判断是否有占位符，渲染后的配置中已经看不到 {{
+        name = str(entry.get('name') or config.get('name') or '')
+        if params and not PLACEHOLDER.search(name):
+            # 名称中没有占位符时追加参数值，避免同名
+            name = '-'.join([name] + [str(v) for v in values]) if name else '-'.join(str(v) for v in values)
+        name = str(_render(name, params))
+        job_config['name'] = name
+        pool = entry.get('pool') or default_pool
+        yield ManifestJob(client_token(pool, job_config), name, pool, params, job_config)
+
+def load_manifest(path: str, default_pool: Optional[str] = None) -> List[ManifestJob]:
+    """读取清单并展开参数网格，返回全部待提交的任务"""
+    if os.path.isdir(path):
+        entries = []
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith(MANIFEST_SUFFIXES) and not filename.endswith('.jsonl'):
+                entries.append({'base': filename})
+        base_dir = path
+    else:
+        document = _load_file(path)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        if isinstance(document, dict) and 'jobs' in document:
+            defaults = document.get('defaults') or {}
+            entries = [_deep_merge(defaults, entry) for entry in document['jobs'] or []]
+        elif isinstance(document, list):
+            entries = document
+        else:
+            entries = [document]
+
+    jobs, seen = [], set()
+    for index, entry in enumerate(entries, 1):
+        try:
+            expanded = list(_expand_entry(entry, base_dir, default_pool))
+        except ManifestError as e:
+            raise ManifestError(f"第 {index} 个条目: {e}") from None
+        for job in expanded:
+            # 内容完全相同的条目只提交一次
+            if job.token not in seen:
+                seen.add(job.token)
+                jobs.append(job)
+    return jobs
+
+def default_results_path(path: str) -> str:
+    return os.path.join(path, 'results.jsonl') if os.path.isdir(path) else path + '.results.jsonl'
+
+def load_results(path: str) -> Dict[str, Dict]:
+    """读取已提交记录：clientToken -> 记录，只保留提交成功（有 jobId）的"""
+    submitted = {}
+    if not os.path.exists(path):
+        return submitted
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 进程中断时最后一行可能不完整
+                continue
+            if record.get('jobId'):
+                submitted[record['token']] = record
+    return submitted
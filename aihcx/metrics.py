@@ -0,0 +1,194 @@
+"""Web服务的运行指标，GET /metrics 按 Prometheus 文本格式输出
+
+代理请求和上游请求按接口（action 或去掉ID的路径）统计请求数、状态码和耗时分布，另有进行中的请求数；
+缓存、请求合并和熔断器的状态在抓取时从各自的 stats() 读取。每个进程各自统计，
+async 引擎多进程运行时每次抓取只得到其中一个进程的数据。
+"""
+import bisect
+import contextlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# 耗时直方图的桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 采集函数返回的样本：(指标名, 类型, 说明, [(标签, 值), ...])
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> tuple:
+        return tuple(str(labels.get(k, '')) for k in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> List[str]:
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}']
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 每个桶只计落在其中的次数，输出时再累加
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _render_value(self, key, value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(round(total, 6))}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+class Registry:
+    """指标注册表：直接更新的指标加上抓取时调用的采集函数"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[Sample]]):
+        """注册采集函数，可用作装饰器"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(list(labels), list(labels.values()))} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+PROXY_REQUESTS = registry.counter('aihcx_proxy_requests_total', '/api 代理收到的请求数', ('action', 'status'))
+PROXY_LATENCY = registry.histogram('aihcx_proxy_request_duration_seconds', '/api 代理请求的处理耗时', ('action',))
+PROXY_IN_FLIGHT = registry.gauge('aihcx_proxy_in_flight_requests', '/api 代理正在处理的请求数')
+PROXY_CACHE = registry.counter('aihcx_proxy_cache_total', '可缓存接口的缓存查找结果（HIT/STALE/MISS）', ('action', 'result'))
+PROXY_ERRORS = registry.counter('aihcx_proxy_errors_total', '/api 代理处理失败的请求数，按异常类型', ('action', 'error'))
+UPSTREAM_REQUESTS = registry.counter('aihcx_upstream_requests_total',
+                                     '发往 AIHC OpenAPI 的请求数（含重试），status 为 0 表示连接失败', ('action', 'status'))
+UPSTREAM_LATENCY = registry.histogram('aihcx_upstream_request_duration_seconds', '单次上游请求的耗时', ('action',))
+UPSTREAM_IN_FLIGHT = registry.gauge('aihcx_upstream_in_flight_requests', '正在进行的上游请求数')
+
+@contextlib.contextmanager
+def observe(requests: Counter, latency: Histogram, in_flight: Gauge, action: str):
+    """统计一次请求的进行中数量、耗时和状态码；调用方把状态码写入 yield 的 dict，未写入视为连接失败"""
+    result = {'status': 0}
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        latency.observe(time.perf_counter() - start, action=action)
+        in_flight.dec()
+        requests.inc(action=action, status=result['status'])
+
+def stats_collector(prefix: str, help: str, stats: Callable[[], Dict],
+                    counters: Sequence[str] = (), gauges: Sequence[str] = ()) -> Callable[[], List[Sample]]:
+    """把 stats() 返回的字段输出为 {prefix}_{字段名} 指标，counters 中的字段加 _total 后缀"""
+    def collect():
+        values = stats()
+        samples = [(f'{prefix}_{key}_total', 'counter', f'{help}: {key}', [({}, values[key])])
+                   for key in counters if key in values]
+        samples += [(f'{prefix}_{key}', 'gauge', f'{help}: {key}', [({}, values[key])])
+                    for key in gauges if key in values]
+        return samples
+    return collect
+
+# 熔断器状态对应的数值
+BREAKER_STATES = {'closed': 0, 'half-open': 1, 'open': 2}
+
+def transport_collector(transport: Callable[[], Dict]) -> Callable[[], List[Sample]]:
+    """限速/重试/熔断的计数和每个 host 的熔断器状态（0 关闭、1 半开、2 打开）"""
+    def collect():
+        stats = transport()
+        breakers = stats.pop('breakers', {})
+        samples = stats_collector('aihcx_transport', '限速/重试/熔断', lambda: stats, counters=list(stats))()
+        samples.append(('aihcx_circuit_breaker_state', 'gauge', '熔断器状态：0 关闭、1 半开、2 打开',
+                        [({'host': host}, BREAKER_STATES.get(state, 0)) for host, state in sorted(breakers.items())]))
+        return samples
+    return collect
@@ -0,0 +1,154 @@
+import csv
+import io
+import itertools
+import json
+from typing import Dict, Iterable, List, Sequence, Union
+
+import click
+
+from . import timing
+
+# 列表类命令支持的流式输出格式
+ROW_FORMATS = ['table', 'jsonl', 'csv']
+
+# 详情类命令支持的输出格式
+DOC_FORMATS = ['yaml', 'json', 'jsonl']
+
+# 表格按该行数分块渲染输出，列宽由第一块中的前 TABLE_SAMPLE_ROWS 行确定
+CHUNK_ROWS = 1000
+TABLE_SAMPLE_ROWS = 200
+
+# 行数据为 dict（按列名取值），或与 headers 顺序一致的元组（如 records 中的 namedtuple）
+Row = Union[Dict, Sequence]
+
+def row_values(row: Row, headers: List[str]) -> Sequence:
+    """按 headers 顺序取出一行的各列"""
+    return [row.get(h) for h in headers] if isinstance(row, dict) else row
+
+def prepend_column(name: str, value, row: Row) -> Row:
+    """在行首增加一列（多资源池合并输出时的 POOL 列）"""
+    return {name: value, **row} if isinstance(row, dict) else (value, *row)
+
+class RowWriter:
+    """流式行输出：每批行数据到达后立即写到标准输出，不缓存全部结果
+
+    一批行数据较多（或是生成器）时按 CHUNK_ROWS 分块格式化输出，不拼接整批的输出文本。
+    """
+
+    def __init__(self, headers: List[str]):
+        self.headers = headers
+
+    @timing.timed('render')
+    def write(self, rows: Iterable[Row]):
+        rows = iter(rows)
+        chunk = list(itertools.islice(rows, CHUNK_ROWS))
+        while True:
+            text = self.format(chunk)
+            if text:
+                click.echo(text)
+            chunk = list(itertools.islice(rows, CHUNK_ROWS))
+            if not chunk:
+                return
+
+    def format(self, rows: List[Row]) -> str:
+        raise NotImplementedError
+
+class TableWriter(RowWriter):
+    """纯文本表格，列宽由第一批数据的前 TABLE_SAMPLE_ROWS 行确定，后续行沿用同样的列宽
+
+    超出列宽的单元格不截断，只有该行之后的列不对齐。
+    """
+
+    def __init__(self, headers: List[str]):
+        super().__init__(headers)
+        self.widths = None
+
+    def format(self, rows: List[Row]) -> str:
+        lines = []
+        if self.widths is None:
+            if not rows:
+                return ''
+            sample = [row_values(row, self.headers) for row in rows[:TABLE_SAMPLE_ROWS]]
+            self.widths = [max([len(h)] + [len(_cell(values[i])) for values in sample])
+                           for i, h in enumerate(self.headers)]
+            lines.append(self._line(self.headers))
+        lines.extend(self._line([_cell(v) for v in row_values(row, self.headers)]) for row in rows)
+        return '\n'.join(lines)
+
+    def _line(self, cells: List[str]) -> str:
+        return '  '.join(cell.ljust(width) for cell, width in zip(cells, self.widths)).rstrip()
+
+class JsonLinesWriter(RowWriter):
+    """每行一个JSON对象"""
+
+    def format(self, rows: List[Row]) -> str:
+        return '\n'.join(json.dumps(row if isinstance(row, dict) else dict(zip(self.headers, row)),
+                                    ensure_ascii=False) for row in rows)
+
+class CsvWriter(RowWriter):
+    """CSV，首批输出前写表头"""
+
+    def __init__(self, headers: List[str]):
+        super().__init__(headers)
+        self.header_written = False
+
+    def format(self, rows: List[Row]) -> str:
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        if not self.header_written:
+            writer.writerow(self.headers)
+            self.header_written = True
+        writer.writerows(row_values(row, self.headers) for row in rows)
+        return buf.getvalue().rstrip('\n')
+
+ROW_WRITERS = {
+    'table': TableWriter,
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+}
+
+def get_row_writer(fmt: str, headers: List[str]) -> RowWriter:
+    """按输出格式创建行输出器"""
+    return ROW_WRITERS[fmt](headers)
+
+@timing.timed('render')
+def format_table(rows: List[Dict]) -> str:
+    """纯文本表格（tabulate 的 plain 格式），列宽按全部行计算"""
+    from tabulate import tabulate
+    return tabulate(rows, headers="keys", tablefmt="plain")
+
+def yaml_dumper():
+    """优先使用 libyaml 的 C 实现（CSafeDumper），未编译 libyaml 时退回纯 Python 的 SafeDumper"""
+    import yaml
+    return getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+@timing.timed('render')
+def dump_yaml(data) -> str:
+    """YAML格式输出，保留中文"""
+    import yaml
+    return yaml.dump(data, Dumper=yaml_dumper(), allow_unicode=True)
+
+@timing.timed('render')
+def write_document(data, fmt: str = 'yaml'):
+    """把详情类命令的结果直接写到标准输出，不先拼成一个完整的大字符串
+
+    yaml 使用 C 实现的 emitter；json 边编码边写出；jsonl 每个元素一行（结果不是列表时输出一行）。
+    """
+    out = click.get_text_stream('stdout')
+    if fmt == 'yaml':
+        import yaml
+        yaml.dump(data, out, Dumper=yaml_dumper(), allow_unicode=True)
+    elif fmt == 'json':
+        for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(data):
+            out.write(chunk)
+        out.write('\n')
+    elif fmt == 'jsonl':
+        for item in (data if isinstance(data, list) else [data]):
+            out.write(json.dumps(item, ensure_ascii=False))
+            out.write('\n')
+    else:
+        raise ValueError(f"不支持的输出格式: {fmt}")
+    out.flush()
+
+def _cell(value) -> str:
+    return '' if value is None else str(value)
@@ -0,0 +1,30 @@
+from collections import deque
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# 默认并发数
+DEFAULT_WORKERS = 8
+
+def imap_ordered(fn: Callable[[T], R], items: Iterable[T], workers: int = DEFAULT_WORKERS) -> Iterator[R]:
+    """用有界线程池并发执行 fn，按输入顺序逐个产出结果
+
+    最多同时保留 workers * 2 个未消费的结果，前面的结果一就绪就立即产出，
+    适合边拉取边输出的场景；fn 抛出的异常会在对应位置重新抛出。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,265 @@
+import json
+import logging
+import threading
+import urllib.parse
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from baidubce import compat, utils
+from baidubce.auth import bce_v1_signer
+from baidubce.http import http_headers
+from baidubce.services.aihc.base.aihc_request import get_headers
+
+from .cache import ResponseCache, SingleFlight
+from .compression import MIN_COMPRESS_SIZE, compress, decompress, make_etag, negotiate, preferred_encoding
+from .client import _new_http_session, client_registry
+from .weblog import logger
+from .metrics import (UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, UPSTREAM_REQUESTS, observe, registry, stats_collector,
+                      transport_collector)
+from .transport import endpoint_key
+
+# 资源池/队列相关接口走 AihcClient（V2 OpenAPI）
+POOL_QUEUE_ACTIONS = ['DescribeResourcePools', 'DescribeResourcePool', 'DescribeQueues', 'DescribeQueue']
+
+# 只读接口的缓存时间（秒），未列出的接口不缓存
+CACHE_TTLS = {
+    'DescribeResourcePools': 30,
+    'DescribeResourcePool': 30,
+    'DescribeQueues': 15,
+    'DescribeQueue': 15,
+    'DescribeJobs': 5,
+    'DescribeJob': 5,
+    'DescribeDatasets': 30,
+    'DescribeDataset': 30,
+    'DescribeDatasetVersions': 30,
+    'DescribeDatasetImports': 10,
+    'DescribeModels': 30,
+    'DescribeModel': 30,
+    'DescribeServices': 10,
+    'DescribeService': 10,
+}
+
+# 上游请求超时时间（秒）
+UPSTREAM_TIMEOUT = 50.0
+
+# 原样转发给浏览器的上游响应头
+PASSTHROUGH_HEADERS = ('Content-Type', 'Content-Encoding')
+
+response_cache = ResponseCache()
+# 并发的相同只读请求合并为一次上游调用
+single_flight = SingleFlight()
+
+def is_read_action(action):
+    """只读接口（Describe*/Get*）不会修改服务端数据"""
+    return action.startswith('Describe') or action.startswith('Get')
+
+def is_read_request(method: str, params: dict) -> bool:
+    """按 action 透传时看接口名，按路径透传时只有 GET 是只读请求"""
+    if 'action' in params:
+        return is_read_action(params['action'])
+    return method == 'GET'
+
+def cache_key(action, params, body):
+    """由 action（或请求路径）、规范化的 query 参数和 body 生成缓存键"""
+    cfg = client_registry.config()
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True)
+    except (TypeError, ValueError):
+        pass
+    return (cfg.get('host'), cfg.get('access_key'), action, tuple(sorted(params.items())), body)
+
+class UpstreamError(Exception):
+    """上游接口返回非 2xx 状态码"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+class UpstreamRequest(NamedTuple):
+    """已签名、可直接由任意HTTP客户端发送的上游请求"""
+    method: str
+    url: str
+    headers: Dict[str, str]
+    body: bytes
+
+def build_action_request(http_method: bytes, params: dict, body: str) -> UpstreamRequest:
+    """构造按 action 参数透传的请求，签名方式与SDK保持一致"""
+    config = client_registry.get('v1').config
+    if params['action'] in POOL_QUEUE_ACTIONS:
+        # 与 AihcClient._aihc_request 相同的签名方式
+        endpoint = compat.convert_to_string(config.endpoint)
+        if not endpoint.startswith(('http://', 'https://')):
+            endpoint = f'{config.protocol.name}://{endpoint}'
+        url = endpoint + '/?' + urllib.parse.urlencode(params)
+        method = http_method.decode().lower()
+        headers = {'version': 'v2', 'Content-Type': 'application/json'}
+        headers.update(get_headers(url, method,
+                                   compat.convert_to_string(config.credentials.access_key_id),
+                                   compat.convert_to_string(config.credentials.secret_access_key)))
+        headers['Host'] = compat.convert_to_string(headers['Host'])
+        headers['Authorization'] = compat.convert_to_string(headers['Authorization'])
+        headers['Accept-Encoding'] = 'gzip'
+        return UpstreamRequest(method.upper(), url, headers, body.encode('utf-8'))
+    return _build_bce_request(config, http_method, b'/', params, body, b'v2')
+
+def build_path_request(http_method: bytes, url_path: str, params: dict, body: str, version: bytes) -> UpstreamRequest:
+    """构造按 /v1/、/v2/ 路径透传的请求"""
+    config = client_registry.get('v1').config
+    return _build_bce_request(config, http_method, url_path.encode('utf-8'), params, body, version)
+
+def _build_bce_request(config, http_method: bytes, path: bytes, params: dict, body: str, version: bytes) -> UpstreamRequest:
+    """与 AIHCClient._send_request 相同的 bce-auth-v1 签名方式"""
+    body = body.encode('utf-8')
+    protocol, host, port = utils.parse_host_port(config.endpoint, config.protocol)
+    host_header = host
+    if port != config.protocol.default_port:
+        host_header += b':' + str(port).encode()
+    headers = {
+        b'version': version,
+        b'X-API-Version': version,
+        http_headers.HOST: host_header,
+        http_headers.CONTENT_LENGTH: len(body),
+        http_headers.BCE_DATE: utils.get_canonical_time(),
+    }
+    headers[http_headers.AUTHORIZATION] = bce_v1_signer.sign(
+        config.credentials, http_method, path, headers, params)
+    query = utils.get_canonical_querystring(params, False)
+    url = f'{protocol.name}://{host.decode()}:{port}{path.decode()}'
+    if query:
+        url += '?' + query.decode()
+    headers = {compat.convert_to_string(k): compat.convert_to_string(v)
+               for k, v in headers.items()}
+    # 压缩后的响应体原样缓存和转发，不在代理中解压
+    headers['Accept-Encoding'] = 'gzip'
+    return UpstreamRequest(http_method.decode(), url, headers, body)
+
+def parse_upstream(status_code: int, content: bytes, strip_metadata: bool) -> dict:
+    """解析上游响应，非 2xx 时抛出 UpstreamError
+
+    与 SDK 解析结果一致：任务/数据集等接口去掉顶层的 metadata 字段，资源池/队列接口原样返回。
+    """
+    if status_code // 100 != 2:
+        message = content.decode('utf-8', 'replace')
+        try:
+            message = json.loads(message).get('message') or message
+        except (ValueError, AttributeError):
+            pass
+        raise UpstreamError(message, status_code)
+    if not content:
+        return {}
+    payload = json.loads(content)
+    if strip_metadata and isinstance(payload, dict):
+        payload.pop('metadata', None)
+    return payload
+
+class RawResponse(NamedTuple):
+    """上游响应体的字节（按 Content-Encoding 压缩），缓存和 single-flight 中共享同一份"""
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: Optional[str] = None
+
+    @property
+    def encoding(self) -> str:
+        return self.headers.get('Content-Encoding', 'identity')
+
+    def for_client(self, accept_encoding: str, if_none_match: Optional[str] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        """按请求头协商压缩格式，返回发给浏览器的 (状态码, 响应体, 响应头)
+
+        if_none_match 为 None 表示不是只读请求，不返回 ETag 也不做 304 判断。
+        """
+        etag = self.etag if if_none_match is not None else None
+        not_modified, body, extra = negotiate(self.body, etag, accept_encoding, if_none_match or '', self.encoding)
+        headers = {k: v for k, v in self.headers.items() if k != 'Content-Encoding'}
+        headers.update(extra)
+        return (304 if not_modified else self.status), body, headers
+
+def passthrough_upstream(status_code: int, headers, content: bytes, strip_metadata: bool) -> RawResponse:
+    """把上游响应包装成可直接转发的 RawResponse，非 2xx 时抛出 UpstreamError
+
+    正常情况下不做任何JSON解析；只有需要去掉 metadata 字段（与 SDK 解析结果一致）、
+    且响应体中确实出现了 "metadata" 时，才解析、删除后重新序列化。
+    上游未压缩的较大响应压缩一次后再缓存，ETag 由解压后的响应体计算。
+    """
+    headers = {k: headers[k] for k in PASSTHROUGH_HEADERS if k in headers}
+    encoding = headers.get('Content-Encoding', 'identity')
+    decoded = decompress(content, encoding)
+    if status_code // 100 != 2:
+        parse_upstream(status_code, decoded if decoded is not None else content, strip_metadata)
+    if not content:
+        return RawResponse(status_code, {'Content-Type': 'application/json'}, b'{}', make_etag(b'{}'))
+    if strip_metadata and decoded is not None and b'"metadata"' in decoded:
+        payload = json.loads(decoded)
+        if isinstance(payload, dict) and 'metadata' in payload:
+            del payload['metadata']
+            content = decoded = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            headers, encoding = {'Content-Type': 'application/json'}, 'identity'
+    headers.setdefault('Content-Type', 'application/json')
+    if encoding == 'identity' and len(content) >= MIN_COMPRESS_SIZE:
+        encoding = preferred_encoding()
+        content = compress(content, encoding)
+        headers['Content-Encoding'] = encoding
+    return RawResponse(status_code, headers, content, make_etag(decoded if decoded is not None else content))
+
+_metrics_registered = False
+
+def register_metrics(flight):
+    """注册缓存、请求合并和限速/重试/熔断的指标采集函数，flight 为所用引擎的请求合并实例"""
+    global _metrics_registered
+    if _metrics_registered:
+        return
+    _metrics_registered = True
+    registry.collector(stats_collector(
+        'aihcx_cache', '代理响应缓存', response_cache.stats,
+        counters=('hits', 'stale_hits', 'misses', 'refreshes', 'refresh_errors', 'evictions', 'invalidations'),
+        gauges=('size', 'maxsize', 'hit_ratio')))
+    registry.collector(stats_collector(
+        'aihcx_singleflight', '相同只读请求合并', flight.stats,
+        counters=('calls', 'coalesced', 'executions', 'errors'), gauges=('in_flight',)))
+    registry.collector(transport_collector(lambda: client_registry.transport().stats()))
+
+def proxy_action(method: str, path: str, params: dict) -> str:
+    """指标和日志中的接口名：action，或方法加去掉ID的 /v1/、/v2/ 路径，其余为 other"""
+    if 'action' in params:
+        return params['action']
+    if '/v1/' in path or '/v2/' in path:
+        return endpoint_key(method, path)
+    return 'other'
+
+def upstream_route(upstream: UpstreamRequest) -> Tuple[str, str, bool]:
+    """上游请求的 (host, 限速接口, 是否可重试)，供 transport 使用"""
+    split = urllib.parse.urlsplit(upstream.url)
+    params = dict(urllib.parse.parse_qsl(split.query))
+    idempotent = is_read_request(upstream.method, params) or 'clientToken' in params
+    return split.netloc, endpoint_key(upstream.method, split.path, params), idempotent
+
+_session = None
+_session_lock = threading.Lock()
+
+def send_upstream(upstream: UpstreamRequest, strip_metadata: bool) -> RawResponse:
+    """经过限速、重试和熔断后用共享的 keep-alive 会话发送请求，读取未解压的响应体（Flask 引擎使用）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _new_http_session()
+
+    host, key, idempotent = upstream_route(upstream)
+
+    def send():
+        with observe(UPSTREAM_REQUESTS, UPSTREAM_LATENCY, UPSTREAM_IN_FLIGHT, key) as result:
+            response = _session.request(upstream.method, upstream.url, headers=upstream.headers,
+                                        data=upstream.body, timeout=UPSTREAM_TIMEOUT, stream=True)
+            try:
+                content = response.raw.read(decode_content=False)
+            finally:
+                response.close()
+            result['status'] = response.status_code
+        log_upstream(upstream, key, response.status_code, len(content))
+        return passthrough_upstream(response.status_code, response.headers, content, strip_metadata)
+
+    return client_registry.transport().call(host, key, send, idempotent=idempotent)
+
+def log_upstream(upstream: UpstreamRequest, key: str, status: int, size: int):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('上游请求 %s %s', upstream.method, upstream.url,
+                     extra={'fields': {'action': key, 'status': status, 'bytes': size,
+                                       'body': upstream.body.decode('utf-8', 'replace')}})
@@ -0,0 +1,63 @@
+"""列表命令的紧凑行数据
+
+任务、Pod 列表直接从解析后的响应体（dict）中抽取当前视图需要的列，每行是一个 namedtuple，
+字段顺序与输出的列一致，不保留 SDK 的 Expando 对象树，也不为每行再复制一个 dict。
+每页解析出的原始 dict 在抽取后即可释放，几万个任务时常驻内存只有这些元组。
+状态等取值很少的字段用 sys.intern 去重。
+"""
+import sys
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .client import get_result_json, get_total
+from .parallel import imap_ordered
+
+# 任务列表的列
+JobRecord = namedtuple('JobRecord', ['NAME', 'ID', 'STATUS', 'CREATED_AT'])
+
+# Pod 列表的列
+PodRecord = namedtuple('PodRecord', ['replicaType', 'name', 'namespace', 'podPhase', 'status', 'creationTimestamp'])
+
+def _intern(value) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+def job_records(jobs: Optional[Iterable[Dict]]) -> List[JobRecord]:
+    """列表接口返回的任务（dict）转为 JobRecord"""
+    return [JobRecord(job.get('name'), job.get('jobId'), _intern(job.get('status')), job.get('createdAt'))
+            for job in jobs or []]
+
+def pod_records(pods: Optional[Iterable[Dict]]) -> Iterator[PodRecord]:
+    """任务详情中的 Pod（dict）逐个转为 PodRecord"""
+    for pod in pods or []:
+        meta = pod.get('objectMeta') or {}
+        status = pod.get('podStatus') or {}
+        yield PodRecord(_intern(pod.get('replicaType')), meta.get('name'), _intern(meta.get('namespace')),
+                        _intern(status.get('podPhase')), _intern(status.get('status')), meta.get('creationTimestamp'))
+
+def fetch_job_page(client, pool_id: str, page_no: int, page_size: int, order: str = 'desc') -> Dict:
+    """分页查询任务列表，result 直接解析为 dict"""
+    return get_result_json(client, '/api/v1/aijobs', {
+        'resourcePoolId': pool_id, 'orderBy': 'createdAt', 'order': order, 'pageNo': page_no, 'pageSize': page_size})
+
+def list_job_records(client, pool_id: str, page_no: int, page_size: int, order: str = 'desc') -> List[JobRecord]:
+    """查询一页任务，返回 JobRecord"""
+    return job_records(fetch_job_page(client, pool_id, page_no, page_size, order).get('jobs'))
+
+def iter_job_record_pages(client, pool_id: str, size: int, order: str, workers: int) -> Iterator[List[JobRecord]]:
+    """逐页产出全部任务：先取第一页获得总数，其余页并发拉取并按页码顺序产出"""
+    first = fetch_job_page(client, pool_id, 1, size, order)
+    records = job_records(first.get('jobs'))
+    total = get_total(first)
+    del first
+    yield records
+    if total is not None:
+        pages = range(2, (total + size - 1) // size + 1)
+        yield from imap_ordered(lambda page: list_job_records(client, pool_id, page, size, order), pages, workers)
+        return
+
+    # 接口未返回总数时逐页拉取，直到某一页不满
+    page = 1
+    while len(records) >= size:
+        page += 1
+        records = list_job_records(client, pool_id, page, size, order)
+        yield records
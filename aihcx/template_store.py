@@ -0,0 +1,377 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .client import client_registry
+from .weblog import logger
+
+# 目录存储在目录本身没有变化时，最多间隔多少秒做一次完整的 stat 扫描（发现被原地修改的文件）
+RESCAN_INTERVAL = 5.0
+
+# 合并后的 SQLite 模板库文件名（位于配置路径下），存在时优先使用
+TEMPLATE_DB_NAME = 'templates.db'
+
+# 可排序的字段
+SORT_FIELDS = ['createdAt', 'updatedAt', 'name']
+
+MAX_PAGE_SIZE = 500
+
+def get_templates_dir() -> Optional[str]:
+    """模板目录为配置路径下的 templates 子目录，未设置配置路径时返回 None"""
+    config_path = client_registry.config().get('path') or ''
+    if not config_path:
+        return None
+    return os.path.join(config_path, 'templates')
+
+class TemplateQuery(NamedTuple):
+    """模板列表查询条件；page_size 为 None 时返回全部"""
+    keyword: str = ''
+    tag: str = ''
+    sort: str = 'createdAt'
+    desc: bool = True
+    page: int = 1
+    page_size: Optional[int] = None
+
+def parse_query(params: Optional[dict]) -> TemplateQuery:
+    """解析 /api/templates 的 query 参数，参数无效时抛出 ValueError"""
+    params = params or {}
+    sort = params.get('orderBy') or 'createdAt'
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"不支持的排序字段: {sort}")
+    order = params.get('order') or 'desc'
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"不支持的排序方式: {order}")
+    page_size = _int_param(params, 'pageSize')
+    if page_size is not None and not 0 < page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"pageSize 需在 1~{MAX_PAGE_SIZE} 之间")
+    page = _int_param(params, 'pageNumber') or 1
+    if page < 1:
+        raise ValueError("pageNumber 需大于0")
+    return TemplateQuery((params.get('keyword') or '').strip(), (params.get('tag') or '').strip(),
+                         sort, order == 'desc', page, page_size)
+
+def check_template_id(template_id: str):
+    """模板ID会用作文件名，不允许为空或包含路径分隔符、..，无效时抛出 ValueError"""
+    if not template_id or '..' in template_id or any(sep in template_id for sep in ('/', '\\', os.sep)):
+        raise ValueError(f"无效的模板ID: {template_id}")
+
+def _int_param(params: dict, name: str) -> Optional[int]:
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} 需为整数") from None
+
+def _tags(template: dict) -> List[str]:
+    tags = template.get('tags') or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(',')]
+    return [str(t) for t in tags if t]
+
+def _summary(template: dict) -> dict:
+    """索引中保存的字段"""
+    return {
+        'id': str(template.get('id', '')),
+        'name': str(template.get('name', '')),
+        'createdAt': str(template.get('createdAt', '')),
+        'updatedAt': str(template.get('updatedAt') or template.get('createdAt', '')),
+        'description': str(template.get('description', '')),
+        'tags': _tags(template),
+    }
+
+def _matches(summary: dict, query: TemplateQuery) -> bool:
+    if query.tag and query.tag not in summary['tags']:
+        return False
+    if query.keyword:
+        keyword = query.keyword.lower()
+        return any(keyword in text.lower() for text in
+                   [summary['id'], summary['name'], summary['description']] + summary['tags'])
+    return True
+
+def _atomic_write_json(filepath: str, data: dict):
+    """先写临时文件再 rename，读者不会看到写了一半的文件"""
+    directory = os.path.dirname(filepath)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(filepath) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class DirectoryTemplateStore:
+    """每个模板一个 JSON 文件的目录存储，带内存索引
+
+    索引按文件的 (mtime, size) 缓存模板内容：目录的 mtime 变化（新增/删除/重命名文件）时立即重新扫描，
+    否则最多每 RESCAN_INTERVAL 秒做一次只 stat 不读取的扫描，只重新读取发生变化的文件。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.RLock()
+        # 模板ID -> (文件签名, 索引字段, 模板内容)；无法解析的文件索引字段为 None，文件变化前不再重复读取
+        self._entries: Dict[str, Tuple[tuple, dict, dict]] = {}
+        self._dir_mtime = None
+        self._scanned_at = 0.0
+
+    def _refresh(self):
+        os.makedirs(self.directory, exist_ok=True)
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        if dir_mtime == self._dir_mtime and time.monotonic() - self._scanned_at < RESCAN_INTERVAL:
+            return
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.json') or entry.name.startswith('.'):
+                    continue
+                template_id = entry.name[:-len('.json')]
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                cached = self._entries.get(template_id)
+                if cached and cached[0] == signature:
+                    entries[template_id] = cached
+                    continue
+                try:
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        template = json.load(f)
+                except Exception as e:
+                    logger.warning('读取模板文件失败 %s: %s', entry.name, e,
+                                   extra={'fields': {'file': entry.path, 'error': type(e).__name__}})
+                    entries[template_id] = (signature, None, None)
+                    continue
+                entries[template_id] = (signature, _summary(dict(template, id=template.get('id', template_id))), template)
+        self._entries = entries
+        self._dir_mtime = dir_mtime
+        self._scanned_at = time.monotonic()
+
+    def query(self, query: TemplateQuery) -> Tuple[List[dict], int]:
+        """返回 (当前页的模板, 符合条件的总数)"""
+        with self._lock:
+            self._refresh()
+            matched = [(summary, template) for _, summary, template in self._entries.values()
+                       if summary is not None and _matches(summary, query)]
+        matched.sort(key=lambda item: (item[0][query.sort], item[0]['id']), reverse=query.desc)
+        total = len(matched)
+        if query.page_size is not None:
+            start = (query.page - 1) * query.page_size
+            matched = matched[start:start + query.page_size]
+        return [template for _, template in matched], total
+
+    def get(self, template_id: str) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(template_id)
+            return entry[2] if entry else None
+
+    def _path(self, template_id: str) -> str:
+        check_template_id(template_id)
+        return os.path.join(self.directory, f"{template_id}.json")
+
+    def save(self, template_id: str, template: dict):
+        filepath = self._path(template_id)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            _atomic_write_json(filepath, template)
+            stat = os.stat(filepath)
+            self._entries[template_id] = ((stat.st_mtime_ns, stat.st_size),
+                                          _summary(dict(template, id=template.get('id', template_id))), template)
+
+    def delete(self, template_id: str) -> bool:
+        filepath = self._path(template_id)
+        with self._lock:
+            self._entries.pop(template_id, None)
+            try:
+                os.remove(filepath)
+                return True
+            except FileNotFoundError:
+                return False
+
+class SqliteTemplateStore:
+    """合并到单个 SQLite 文件的模板库，适合模板很多的团队；查询、排序、分页都在 SQL 中完成"""
+
+    COLUMNS = {'createdAt': 'created_at', 'updatedAt': 'updated_at', 'name': 'name'}
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS templates (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                search TEXT NOT NULL,
+                tags TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS templates_created_at ON templates (created_at);
+            CREATE INDEX IF NOT EXISTS templates_updated_at ON templates (updated_at);
+            CREATE INDEX IF NOT EXISTS templates_name ON templates (name);
+        ''')
+
+    def query(self, query: TemplateQuery) -> Tuple[List[dict], int]:
+        where, args = [], []
+        if query.keyword:
+            where.append("instr(search, ?) > 0")
+            args.append(query.keyword.lower())
+        if query.tag:
+            # tags 列保存为 ",tag1,tag2," 形式，便于精确匹配单个标签
+            where.append("instr(tags, ?) > 0")
+            args.append(f",{query.tag},")
+        clause = ' WHERE ' + ' AND '.join(where) if where else ''
+        direction = 'DESC' if query.desc else 'ASC'
+        order = f" ORDER BY {self.COLUMNS[query.sort]} {direction}, id {direction}"
+        limit = ''
+        if query.page_size is not None:
+            limit = f" LIMIT {query.page_size} OFFSET {(query.page - 1) * query.page_size}"
+        with self._lock:
+            rows = self.conn.execute('SELECT data FROM templates' + clause + order + limit, args).fetchall()
+            total = self.conn.execute('SELECT COUNT(*) FROM templates' + clause, args).fetchone()[0]
+        return [json.loads(row[0]) for row in rows], total
+
+    def get(self, template_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self.conn.execute('SELECT data FROM templates WHERE id=?', (template_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, template_id: str, template: dict):
+        self.save_many([(template_id, template)])
+
+    def save_many(self, templates):
+        rows = []
+        for template_id, template in templates:
+            summary = _summary(dict(template, id=template.get('id', template_id)))
+            search = '\n'.join([summary['id'], summary['name'], summary['description']] + summary['tags']).lower()
+            rows.append((template_id, summary['name'], summary['createdAt'], summary['updatedAt'], search,
+                         ',' + ','.join(summary['tags']) + ',', json.dumps(template, ensure_ascii=False)))
+        with self._lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO templates VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def delete(self, template_id: str) -> bool:
+        with self._lock, self.conn:
+            return self.conn.execute('DELETE FROM templates WHERE id=?', (template_id,)).rowcount == 1
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_template_store():
+    """当前配置路径对应的模板存储（进程内复用，索引常驻内存），未设置配置路径时返回 None"""
+    templates_dir = get_templates_dir()
+    if not templates_dir:
+        return None
+    db_path = os.path.join(os.path.dirname(templates_dir), TEMPLATE_DB_NAME)
+    key = db_path if os.path.exists(db_path) else templates_dir
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = (SqliteTemplateStore(db_path) if key == db_path
+                                    else DirectoryTemplateStore(templates_dir))
+        return store
+
+def consolidate_templates(templates_dir: str) -> Tuple[str, int]:
+    """把目录中的模板文件合并到 SQLite 模板库，返回 (数据库路径, 导入的模板数)；原文件保留不动"""
+    db_path = os.path.join(os.path.dirname(templates_dir), TEMPLATE_DB_NAME)
+    source = DirectoryTemplateStore(templates_dir)
+    templates, _ = source.query(TemplateQuery())
+    target = SqliteTemplateStore(db_path)
+    try:
+        target.save_many((str(t.get('id') or ''), t) for t in templates if t.get('id'))
+    finally:
+        target.conn.close()
+    with _stores_lock:
+        _stores.clear()
+    return db_path, len(templates)
+
+def handle_templates(method: str, template_data: Optional[dict] = None,
+                     params: Optional[dict] = None) -> Tuple[dict, int]:
+    """模板列表/创建，返回 (响应数据, 状态码)
+
+    列表支持 keyword（搜索ID/名称/描述/标签）、tag、orderBy、order、pageNumber、pageSize 参数，
+    不指定 pageSize 时返回全部模板。
+    """
+    try:
+        store = get_template_store()
+        if store is None:
+            return {'error': '配置路径未设置'}, 400
+
+        if method == 'GET':
+            try:
+                query = parse_query(params)
+            except ValueError as e:
+                return {'error': str(e)}, 400
+            templates, total = store.query(query)
+            result = {'templates': templates, 'total': total}
+            if query.page_size is not None:
+                result.update(pageNumber=query.page, pageSize=query.page_size)
+            return result, 200
+
+        # 创建新模板
+        if not template_data or 'name' not in template_data:
+            return {'error': '模板数据无效'}, 400
+
+        # 生成文件名
+        template_id = str(template_data.get('id', str(int(time.time() * 1000))))
+        try:
+            check_template_id(template_id)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        store.save(template_id, template_data)
+        return {'template': template_data}, 200
+
+    except Exception as e:
+        logger.warning('模板API错误: %s', e, extra={'fields': {'method': method, 'error': type(e).__name__}})
+        return {'error': str(e)}, 500
+
+def handle_template_detail(method: str, template_id: str, template_data: Optional[dict] = None) -> Tuple[dict, int]:
+    """单个模板的获取、更新和删除，返回 (响应数据, 状态码)"""
+    try:
+        store = get_template_store()
+        if store is None:
+            return {'error': '配置路径未设置'}, 400
+        try:
+            check_template_id(template_id)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        if method == 'GET':
+            # 获取模板详情
+            template = store.get(template_id)
+            if template is None:
+                return {'error': '模板不存在'}, 404
+            return {'template': template}, 200
+
+        elif method == 'PUT':
+            # 更新模板
+            if not template_data:
+                return {'error': '模板数据无效'}, 400
+
+            template_data['id'] = template_id
+            store.save(template_id, template_data)
+            return {'template': template_data}, 200
+
+        # 删除模板
+        if store.delete(template_id):
+            return {'success': True}, 200
+        return {'error': '模板不存在'}, 404
+
+    except Exception as e:
+        logger.warning('模板详情API错误: %s', e,
+                       extra={'fields': {'method': method, 'template_id': template_id, 'error': type(e).__name__}})
+        return {'error': str(e)}, 500
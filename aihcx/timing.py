@@ -0,0 +1,120 @@
+"""命令耗时分解（aihcx --timing）
+
+各阶段（导入命令模块、读取配置、创建客户端、每个SDK请求、响应解码、输出渲染）用 span 计时，
+未开启 --timing 时 span 只做一次判断，不记录任何数据。命令结束时按阶段汇总输出到标准错误，
+--timing-format json 时每个 span 输出一行JSON，便于在自动化脚本中收集和聚合。
+"""
+import contextlib
+import functools
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 进程内开始计时的时间（导入 aihcx.cli 时）
+STARTED = time.perf_counter()
+
+# 文本报告中逐条列出的最慢请求数
+SLOWEST_REQUESTS = 10
+
+_spans: Optional[List[Dict]] = None
+_imports: List[Dict] = []
+_lock = threading.Lock()
+_local = threading.local()
+
+def enable():
+    """开启计时；开启前已发生的命令模块导入也计入报告"""
+    global _spans
+    _spans = list(_imports)
+
+def enabled() -> bool:
+    return _spans is not None
+
+def record(phase: str, seconds: float, **fields):
+    if _spans is None:
+        return
+    entry = dict(phase=phase, ms=round(seconds * 1000, 3), depth=getattr(_local, 'depth', 0),
+                 thread=threading.current_thread().name, **fields)
+    with _lock:
+        _spans.append(entry)
+
+def record_import(module: str, seconds: float):
+    """LazyGroup 导入命令模块的耗时；--timing 在命令组回调中才开启，导入可能发生在那之前"""
+    entry = dict(phase='import', ms=round(seconds * 1000, 3), depth=0,
+                 thread=threading.current_thread().name, module=module)
+    _imports.append(entry)
+    if _spans is not None:
+        with _lock:
+            _spans.append(entry)
+
+@contextlib.contextmanager
+def span(phase: str, **fields):
+    """计时一个阶段，yield 的 dict 可以补充字段（如响应字节数、状态码）"""
+    if _spans is None:
+        yield fields
+        return
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        _local.depth = depth
+        record(phase, time.perf_counter() - start, **fields)
+
+def timed(phase: str):
+    """函数级 span 装饰器"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _spans is None:
+                return fn(*args, **kwargs)
+            with span(phase, name=fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def add_bytes(count: int):
+    """记录当前线程收到的响应字节数，由请求 span 取走"""
+    _local.bytes = getattr(_local, 'bytes', 0) + count
+
+def take_bytes() -> int:
+    count = getattr(_local, 'bytes', 0)
+    _local.bytes = 0
+    return count
+
+def report(command: str, fmt: str = 'text', stream=None):
+    """输出耗时报告：text 为按阶段汇总的表格，json 为每个 span 一行"""
+    import json
+
+    stream = stream or sys.stderr
+    total_ms = round((time.perf_counter() - STARTED) * 1000, 3)
+    spans = list(_spans or [])
+    if fmt == 'json':
+        for entry in spans:
+            stream.write(json.dumps(dict(entry, event='span', command=command), ensure_ascii=False) + '\n')
+        stream.write(json.dumps({'event': 'total', 'command': command, 'ms': total_ms}) + '\n')
+        return
+
+    phases = {}
+    for entry in spans:
+        stats = phases.setdefault(entry['phase'], {'count': 0, 'ms': 0.0, 'max': 0.0, 'top_ms': 0.0})
+        stats['count'] += 1
+        stats['ms'] += entry['ms']
+        stats['max'] = max(stats['max'], entry['ms'])
+        if entry['depth'] == 0:
+            stats['top_ms'] += entry['ms']
+    lines = [f"耗时分解: {command}  总计 {total_ms:.1f}ms（从导入 aihcx.cli 开始）",
+             f"  {'PHASE':10} {'COUNT':>5} {'TOTAL_MS':>10} {'MAX_MS':>9}"]
+    for phase, stats in phases.items():
+        lines.append(f"  {phase:10} {stats['count']:5d} {stats['ms']:10.1f} {stats['max']:9.1f}")
+    # 多线程并发请求时各阶段耗时会重叠，其余时间只按单线程估算
+    accounted = sum(s['top_ms'] for s in phases.values())
+    lines.append(f"  {'other':10} {'':5} {max(0.0, total_ms - accounted):10.1f}")
+    requests = sorted((e for e in spans if e['phase'] == 'request'), key=lambda e: -e['ms'])
+    if requests:
+        lines.append(f"  最慢的请求（共 {len(requests)} 个）:")
+        for entry in requests[:SLOWEST_REQUESTS]:
+            lines.append(f"    {entry['ms']:9.1f}ms  {entry.get('status', '')!s:>3}  "
+                         f"{entry.get('bytes', 0) / 1024:8.1f}KiB  x{entry.get('attempts', 1)}  {entry.get('action', '')}")
+    stream.write('\n'.join(lines) + '\n')
@@ -0,0 +1,264 @@
+"""请求限速、重试和熔断，CLI 的 SDK 调用和 Web 代理共用
+
+每个接口（action 或去掉ID的路径）一个令牌桶；被限流（429）、服务端错误（5xx）或连接失败时
+按指数退避加随机抖动重试；同一个 host 连续失败达到阈值后熔断一段时间，期间直接报错，不再请求服务端。
+参数通过 aihcx config 设置（见 TRANSPORT_DEFAULTS）。
+"""
+import contextlib
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# aihcx config 可设置的参数及默认值
+TRANSPORT_DEFAULTS = {
+    'rate_limit': 0.0,         # 每个接口每秒最多请求数，0 表示不限速
+    'rate_burst': 5,           # 令牌桶容量（允许的突发请求数）
+    'max_retries': 3,          # 最大重试次数
+    'retry_backoff': 0.5,      # 首次重试前的等待时间（秒），之后每次翻倍
+    'breaker_threshold': 10,   # 连续失败多少次后熔断，0 表示不熔断
+    'breaker_cooldown': 30.0,  # 熔断持续时间（秒）
+}
+
+# 重试等待时间上限（秒）
+RETRY_BACKOFF_MAX = 30.0
+
+# 需要重试的状态码；连接失败也会重试
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 表示限流的错误码片段
+THROTTLE_CODES = ('Throttl', 'TooManyRequests', 'RequestLimitExceeded', 'RateLimit')
+
+# 连接失败（没有状态码）时使用的状态码
+CONNECTION_FAILED = 0
+
+class CircuitOpenError(Exception):
+    """熔断期间直接拒绝请求"""
+
+class RateLimiter:
+    """令牌桶限速器，多个线程共享；rate 为每秒请求数，None 或 0 表示不限速"""
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate or None
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数；令牌可以预支，等待的请求按预约顺序放行"""
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """连续失败 threshold 次后熔断 cooldown 秒；之后放行一个探测请求，成功则恢复"""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def check(self, host: str):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self.probing:
+                raise CircuitOpenError(f"{host} 连续请求失败，已暂停请求（熔断中，{max(0, remaining):.0f}s 后重试）")
+            self.probing = True
+
+    def record(self, failed: bool):
+        with self._lock:
+            self.probing = False
+            if not failed:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.threshold and self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+def is_throttled(e: Exception) -> bool:
+    """SDK 异常是否为限流（429 或限流类错误码）"""
+    error = getattr(e, 'last_error', None) or e
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    code = getattr(error, 'code', None) or ''
+    if isinstance(code, bytes):
+        code = code.decode('utf-8', 'replace')
+    return any(c in code for c in THROTTLE_CODES)
+
+def error_status(e: Exception) -> Optional[int]:
+    """异常对应的状态码：限流为 429，连接失败为 CONNECTION_FAILED，与请求无关的异常为 None"""
+    if is_throttled(e):
+        return 429
+    error = getattr(e, 'last_error', None) or e
+    status = getattr(error, 'status_code', None)
+    if status:
+        return int(status)
+    return CONNECTION_FAILED if isinstance(error, OSError) else None
+
+def endpoint_key(method, path: str, params: Optional[Dict] = None) -> str:
+    """限速的粒度：按 action 透传的接口取 action，否则取方法和去掉ID的路径"""
+    if params and params.get('action'):
+        return params['action']
+    if isinstance(method, bytes):
+        method = method.decode()
+    if isinstance(path, bytes):
+        path = path.decode()
+    segments = ['*' if re.search(r'\d', s) and not re.fullmatch(r'v\d+', s) else s for s in path.split('/')]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+def transport_settings(config) -> Dict:
+    """从配置中读取限速/重试/熔断参数，未设置的使用默认值"""
+    settings = {}
+    for key, default in TRANSPORT_DEFAULTS.items():
+        value = config.get(key)
+        settings[key] = default if value is None else type(default)(value)
+    return settings
+
+class Transport:
+    """按接口限速、失败重试和按 host 熔断；同步和异步调用共享同一组令牌桶和熔断器"""
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = dict(TRANSPORT_DEFAULTS, **(settings or {}))
+        self._limiters = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {'requests': 0, 'retries': 0, 'throttled': 0, 'rejected': 0}
+
+    def limiter(self, key: str) -> RateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = RateLimiter(self.settings['rate_limit'], self.settings['rate_burst'])
+            return limiter
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.settings['breaker_threshold'],
+                                                                self.settings['breaker_cooldown'])
+            return breaker
+
+    @contextlib.contextmanager
+    def max_retries(self, retries: Optional[int]):
+        """在当前线程内临时修改最大重试次数（如批量命令的 --retries），None 表示使用配置"""
+        previous = getattr(self._local, 'retries', None)
+        self._local.retries = retries
+        self._local.attempts = 1
+        try:
+            yield
+        finally:
+            self._local.retries = previous
+
+    @property
+    def last_attempts(self) -> int:
+        """当前线程最近一次调用的尝试次数"""
+        return getattr(self._local, 'attempts', 1)
+
+    def _before(self, host: str, key: str, attempt: int) -> float:
+        """熔断检查并预约令牌，返回需要等待的秒数；熔断只拦截新的调用，已开始的调用用完自己的重试次数"""
+        try:
+            if attempt == 1:
+                self.breaker(host).check(host)
+        except CircuitOpenError:
+            self._count('rejected')
+            raise
+        self._count('requests')
+        return self.limiter(key).reserve()
+
+    def _after(self, host: str, status: Optional[int], attempt: int, idempotent: bool) -> Optional[float]:
+        """记录结果，需要重试时返回等待的秒数，否则返回 None"""
+        self._local.attempts = attempt
+        # 与请求无关的异常（如响应解析失败）说明服务端是可达的
+        self.breaker(host).record(status is not None and (status == CONNECTION_FAILED or status >= 500))
+        if status is None:
+            return None
+        if status == 429:
+            self._count('throttled')
+        elif status not in RETRY_STATUSES and status != CONNECTION_FAILED:
+            return None
+        elif not idempotent:
+            # 写请求失败时服务端可能已经处理，只有明确被限流（未处理）时才重试
+            return None
+        retries = getattr(self._local, 'retries', None)
+        if attempt > (self.settings['max_retries'] if retries is None else retries):
+            return None
+        self._count('retries')
+        delay = min(RETRY_BACKOFF_MAX, self.settings['retry_backoff'] * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def call(self, host: str, key: str, fn: Callable[[], object], idempotent: bool = True,
+             status_of: Optional[Callable[[object], int]] = None):
+        """限速后调用 fn；fn 抛出异常或 status_of(结果) 为可重试的状态码时按退避策略重试"""
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._before(host, key, attempt)
+            if wait:
+                time.sleep(wait)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._after(host, error_status(e), attempt, idempotent)
+                if delay is None:
+                    raise
+            else:
+                delay = self._after(host, status_of(result) if status_of else 200, attempt, idempotent)
+                if delay is None:
+                    return result
+            time.sleep(delay)
+
+    async def call_async(self, host: str, key: str, fn, idempotent: bool = True):
+        """call 的异步版本，fn 返回协程；等待时不阻塞事件循环"""
+        import asyncio
+
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._before(host, key, attempt)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._after(host, error_status(e), attempt, idempotent)
+                if delay is None:
+                    raise
+            else:
+                self._after(host, 200, attempt, idempotent)
+                return result
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            breakers = {host: b.state for host, b in self._breakers.items()}
+            return dict(self.counters, breakers=breakers)
@@ -0,0 +1,137 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+from .client import list_aijobs
+from .parallel import DEFAULT_WORKERS, imap_ordered
+
+# 任务的终态，进入终态后不再轮询
+TERMINAL_STATUSES = {'Succeeded', 'Failed', 'Stopped', 'Terminated', 'Deleted', 'NotFound'}
+SUCCESS_STATUSES = {'Succeeded'}
+
+# job watch 的退出条件
+UNTIL_CONDITIONS = ['all-done', 'all-succeeded', 'any-done']
+
+# 超时退出码（条件不满足为 1）
+EXIT_TIMEOUT = 2
+
+class AdaptiveInterval:
+    """自适应轮询间隔
+
+    状态有变化时回到最小间隔，连续无变化时按 factor 逐步放大，请求出错时加倍退避，
+    均不超过最大间隔；每次返回的间隔带 ±jitter 的随机抖动，避免多个进程同步请求。
+    """
+
+    def __init__(self, minimum: float, maximum: float, factor: float = 1.5, jitter: float = 0.2):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.factor = factor
+        self.jitter = jitter
+        self.current = minimum
+
+    def next(self, changed: bool, error: bool = False) -> float:
+        if error:
+            self.current = min(self.maximum, self.current * 2)
+        elif changed:
+            self.current = self.minimum
+        else:
+            self.current = min(self.maximum, self.current * self.factor)
+        return self.current * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+def job_row(job_id: str, job) -> Dict:
+    return {'ID': job_id, 'NAME': job.name, 'STATUS': job.status}
+
+def is_not_found(e: Exception) -> bool:
+    """SDK 异常是否为 404（任务已被删除）"""
+    error = getattr(e, 'last_error', None) or e
+    return getattr(error, 'status_code', None) == 404
+
+class JobWatcher:
+    """在一个进程内跟踪多个任务的状态
+
+    每轮只查询未进入终态的任务：跟踪多个任务时先按创建时间倒序翻列表页批量匹配
+    （最多 max_pages 页），列表中没找到的任务再逐个并发查询详情，之后也不再到列表中查找。
+    """
+
+    def __init__(self, client, pool_id: str, rows: Iterable[Dict], max_pages: int = 5,
+                 page_size: int = 100, workers: int = DEFAULT_WORKERS):
+        self.client = client
+        self.pool_id = pool_id
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.workers = workers
+        self.jobs = {row['ID']: row for row in rows}
+        # 不在最近 max_pages 页列表中的任务，直接查询详情
+        self.direct = set()
+        self.requests = 0
+
+    def pending(self) -> List[str]:
+        return [job_id for job_id, row in self.jobs.items() if row['STATUS'] not in TERMINAL_STATUSES]
+
+    def poll(self) -> List[Dict]:
+        """查询一轮，返回状态发生变化的任务"""
+        pending = self.pending()
+        listed = set(pending) - self.direct
+        found = self._scan_list(listed) if len(listed) > 1 else {}
+        missing = [job_id for job_id in pending if job_id not in found]
+        if len(listed) > 1:
+            self.direct.update(job_id for job_id in missing if job_id in listed)
+        self.requests += len(missing)
+        for job_id, row in zip(missing, imap_ordered(self._get_one, missing, self.workers)):
+            found[job_id] = row
+
+        changed = []
+        for job_id, row in found.items():
+            if row['STATUS'] != self.jobs[job_id]['STATUS']:
+                changed.append(row)
+            self.jobs[job_id] = row
+        return changed
+
+    def _scan_list(self, wanted: set) -> Dict[str, Dict]:
+        found, page = {}, 1
+        while len(found) < len(wanted) and page <= self.max_pages:
+            self.requests += 1
+            jobs = list_aijobs(self.client, self.pool_id, page_no=page, page_size=self.page_size).result.jobs
+            found.update((job.jobId, job_row(job.jobId, job)) for job in jobs if job.jobId in wanted)
+            if len(jobs) < self.page_size:
+                break
+            page += 1
+        return found
+
+    def _get_one(self, job_id: str) -> Dict:
+        try:
+            return job_row(job_id, self.client.get_aijob(self.pool_id, job_id).result)
+        except Exception as e:
+            if is_not_found(e):
+                return dict(self.jobs[job_id], STATUS='NotFound')
+            raise
+
+    def exit_code(self, until: str) -> Optional[int]:
+        """退出条件满足时返回退出码（0 成功，1 失败），否则返回 None"""
+        statuses = [row['STATUS'] for row in self.jobs.values()]
+        done = [s for s in statuses if s in TERMINAL_STATUSES]
+        failed = [s for s in done if s not in SUCCESS_STATUSES]
+        if until == 'all-done':
+            if len(done) == len(statuses):
+                return 1 if failed else 0
+        elif until == 'all-succeeded':
+            # 任意任务失败立即退出
+            if failed:
+                return 1
+            if len(done) == len(statuses):
+                return 0
+        elif until == 'any-done':
+            if done:
+                return 1 if failed else 0
+        return None
+
+def discover_jobs(client, pool_id: str, statuses: Optional[List[str]] = None, name: Optional[str] = None,
+                  max_pages: int = 5, page_size: int = 100) -> List[Dict]:
+    """从最近创建的任务中找出符合筛选条件（状态、名称包含）的任务"""
+    rows = []
+    for page in range(1, max_pages + 1):
+        jobs = list_aijobs(client, pool_id, page_no=page, page_size=page_size).result.jobs
+        rows.extend(job_row(job.jobId, job) for job in jobs
+                    if (not statuses or job.status in statuses) and (not name or name in job.name))
+        if len(jobs) < page_size:
+            break
+    return rows
@@ -0,0 +1,108 @@
+"""Web服务的结构化日志
+
+日志记录只放入内存队列，由后台线程格式化并写入文件或标准错误，请求处理线程（或事件循环）不等待磁盘IO。
+每条日志可以通过 extra={'fields': {...}} 附带结构化字段，text 格式输出为 key=value，json 格式为一行JSON。
+级别、文件和格式由 aihcx web 的 --log-level/--log-file/--log-format 设置，
+通过环境变量传给 async 引擎的工作进程（见 LOG_ENV）。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Dict, Optional
+
+# 传给工作进程的环境变量：(level, file, format)
+LOG_ENV = {'level': 'AIHCX_LOG_LEVEL', 'path': 'AIHCX_LOG_FILE', 'fmt': 'AIHCX_LOG_FORMAT'}
+
+# Web服务的日志都在这个 logger 下
+logger = logging.getLogger('aihcx.web')
+
+# SDK 的请求日志（DEBUG 级别时才输出）
+SDK_LOGGER = 'baidubce.http.bce_http_client'
+
+_listener = None
+
+class StructuredFormatter(logging.Formatter):
+    """text: 时间 级别 logger 消息 key=value...；json: 每条日志一行JSON"""
+
+    def __init__(self, fmt: str = 'text'):
+        super().__init__()
+        self.json = fmt == 'json'
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields: Dict = getattr(record, 'fields', None) or {}
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if self.json:
+            entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name, 'msg': message}
+            entry.update(fields)
+            if record.exc_text:
+                entry['exc'] = record.exc_text
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.created))},{int(record.msecs):03d} "
+                f"{record.levelname} {record.name} {message}")
+        if fields:
+            line += ' ' + ' '.join(f'{k}={v}' for k, v in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """只把记录放入队列，格式化留给后台线程"""
+
+    def prepare(self, record):
+        # 消息参数和异常在当前线程展开，避免对象在后台线程格式化前被修改
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging(level: Optional[str] = None, path: Optional[str] = None, fmt: Optional[str] = None):
+    """配置Web服务日志，参数为 None 时读取 LOG_ENV 中的环境变量；重复调用不会重复添加输出"""
+    global _listener
+    if _listener is not None:
+        return
+    level = (level or os.environ.get(LOG_ENV['level']) or 'INFO').upper()
+    path = path or os.environ.get(LOG_ENV['path']) or None
+    fmt = fmt or os.environ.get(LOG_ENV['fmt']) or 'text'
+
+    output = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    output.setFormatter(StructuredFormatter(fmt))
+    handler = _QueueHandler(queue.SimpleQueue())
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    # SDK 导入时调用了 logging.basicConfig，替换掉根 logger 上同步输出的 handler，其他库的日志也经过队列
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.WARNING)
+    logger.setLevel(level)
+    logging.getLogger(SDK_LOGGER).setLevel(logging.DEBUG if level == 'DEBUG' else logging.WARNING)
+
+def stop_logging():
+    """写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def export_env(level: Optional[str], path: Optional[str], fmt: Optional[str]):
+    """把日志设置写入环境变量，由工作进程中的 setup_logging() 读取"""
+    for key, value in (('level', level), ('path', path and os.path.abspath(path)), ('fmt', fmt)):
+        if value:
+            os.environ[LOG_ENV[key]] = value
+
+def log_access(method: str, path: str, action: str, status: int, seconds: float, cache: Optional[str] = None):
+    """每个 /api 代理请求一条 INFO 日志"""
+    if logger.isEnabledFor(logging.INFO):
+        fields = {'method': method, 'path': path, 'action': action, 'status': status, 'ms': round(seconds * 1000, 1)}
+        if cache:
+            fields['cache'] = cache
+        logger.info('代理请求', extra={'fields': fields})
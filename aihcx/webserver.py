@@ -1,91 +1,55 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, Response, render_template, request
 from flask_cors import CORS
 import os
-import sys
-import time
 
-from requests import delete
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from client import AIJobConfig
+from .client import CONFIG_KEYS, client_registry, get_config
+from .proxy import (POOL_QUEUE_ACTIONS, CACHE_TTLS, response_cache, single_flight, is_read_action, cache_key,
+                    is_read_request, build_action_request, build_path_request, send_upstream, proxy_action,
+                    register_metrics)
+from .compression import json_body, negotiate
+from .template_store import handle_templates, handle_template_detail
 from flask import jsonify
-# from baidubce.services.aihc_v2.aihc_client import AIHCV2Client
-from baidubce.services.aihc.aihc_client import AIHCClient, AihcClient
-import logging
-from baidubce.bce_client_configuration import BceClientConfiguration
-from baidubce.auth.bce_credentials import BceCredentials
 from baidubce.http import http_methods
 import json
-from baidubce.utils import Expando
+import time
 
-def parse_json(http_response, response):
-    body = http_response.read()
-    if body:
-        response.__dict__.update(json.loads(
-            body, object_hook=dict_to_python_object).__dict__)
-        
-        # 移除metadata key（如果存在）
-        if 'metadata' in response.__dict__:
-            del response.__dict__['metadata']
-    http_response.close()
-    return True
-
-def dict_to_python_object(d):
-    """
-
-    :param d:
-    :return:
-    """
-    attr = {}
-    for k, v in list(d.items()):
-        k = str(k)
-        attr[k] = v
-    return Expando(attr)
-
-def to_dict(obj):
-    if isinstance(obj, dict):
-        return {k: to_dict(v) for k, v in obj.items()}
-    elif hasattr(obj, '__dict__'):
-        return {k: to_dict(v) for k, v in obj.__dict__.items()}
-    elif isinstance(obj, list):
-        return [to_dict(i) for i in obj]
-    else:
-        return obj
-
-
-logger = logging.getLogger('baidubce.http.bce_http_client')
-fh = logging.FileHandler('sample.log')
-fh.setLevel(logging.DEBUG)
-
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-logger.setLevel(logging.DEBUG)
-logger.addHandler(fh)
+from . import metrics
+from .weblog import logger, log_access, setup_logging
 
 
 app = Flask(__name__, template_folder=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'aihcx', 'templates'))
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 
+def json_response(data, status=200):
+    """本地生成的JSON响应：按 Accept-Encoding 压缩，GET 请求带 ETag 并支持 304"""
+    body, etag = json_body(data)
+    if request.method != 'GET' or status != 200:
+        etag = None
+    not_modified, body, headers = negotiate(body, etag, request.headers.get('Accept-Encoding', ''),
+                                            request.headers.get('If-None-Match', ''))
+    return Response(body, status=304 if not_modified else status, headers=headers, mimetype='application/json')
+
 @app.route('/config', methods=['GET', 'POST'])
 def config():
-    cfg = AIJobConfig()
+    cfg = get_config()
     saved = False
     if request.method == 'POST':
-        for key in ['host', 'access_key', 'secret_key', 'pool', 'queue', 'path']:
-            value = request.form.get(key, '')
-            if value:
-                cfg.set(key, value)
+        # 全部非空配置项一次写入
+        values = {key: request.form.get(key) for key in CONFIG_KEYS if request.form.get(key)}
+        if values:
+            cfg.update(**values)
         saved = True
     # 读取最新配置
-    config_data = {k: cfg.get(k) or '' for k in ['host', 'access_key', 'secret_key', 'pool', 'queue', 'path']}
+    config_data = {k: cfg.get(k) or '' for k in CONFIG_KEYS}
     return render_template('config.html', saved=saved, **config_data)
 
 @app.route('/api/config-json', methods=['GET'])
 def config_json():
     """为Vue应用提供JSON格式的配置API"""
-    cfg = AIJobConfig()
-    config_data = {k: cfg.get(k) or '' for k in ['host', 'access_key', 'secret_key', 'pool', 'queue', 'path']}
-    return jsonify(config_data)
+    cfg = client_registry.config()
+    config_data = {k: cfg.get(k) or '' for k in CONFIG_KEYS}
+    return json_response(config_data)
 
 @app.route('/templates', methods=['GET'])
 def templates():
@@ -94,107 +58,16 @@ def templates():
 @app.route('/api/templates', methods=['GET', 'POST'])
 def api_templates():
     """模板管理API"""
-    try:
-        cfg = AIJobConfig()
-        config_path = cfg.get('path') or ''
-        
-        if not config_path:
-            return jsonify({'error': '配置路径未设置'}), 400
-        
-        templates_dir = os.path.join(config_path, 'templates')
-        
-        # 确保templates目录存在
-        os.makedirs(templates_dir, exist_ok=True)
-        
-        if request.method == 'GET':
-            # 获取模板列表
-            templates = []
-            if os.path.exists(templates_dir):
-                for filename in os.listdir(templates_dir):
-                    if filename.endswith('.json'):
-                        filepath = os.path.join(templates_dir, filename)
-                        try:
-                            with open(filepath, 'r', encoding='utf-8') as f:
-                                template_data = json.load(f)
-                                templates.append(template_data)
-                        except Exception as e:
-                            print(f'读取模板文件失败 {filename}: {e}')
-                            continue
-            
-            # 按创建时间排序
-            templates.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
-            return jsonify({'templates': templates})
-        
-        elif request.method == 'POST':
-            # 创建新模板
-            template_data = request.get_json()
-            if not template_data or 'name' not in template_data:
-                return jsonify({'error': '模板数据无效'}), 400
-            
-            # 生成文件名
-            template_id = template_data.get('id', str(int(time.time() * 1000)))
-            filename = f"{template_id}.json"
-            filepath = os.path.join(templates_dir, filename)
-            
-            # 保存模板文件
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(template_data, f, ensure_ascii=False, indent=2)
-            
-            return jsonify({'template': template_data})
-    
-    except Exception as e:
-        print(f'模板API错误: {e}')
-        return jsonify({'error': str(e)}), 500
+    template_data = request.get_json(silent=True) if request.method == 'POST' else None
+    data, status = handle_templates(request.method, template_data, request.args.to_dict())
+    return json_response(data, status)
 
 @app.route('/api/templates/<template_id>', methods=['GET', 'PUT', 'DELETE'])
 def api_template_detail(template_id):
     """单个模板的获取、更新和删除API"""
-    try:
-        cfg = AIJobConfig()
-        config_path = cfg.get('path') or ''
-        
-        if not config_path:
-            return jsonify({'error': '配置路径未设置'}), 400
-        
-        templates_dir = os.path.join(config_path, 'templates')
-        filepath = os.path.join(templates_dir, f"{template_id}.json")
-        
-        if request.method == 'GET':
-            # 获取模板详情
-            if not os.path.exists(filepath):
-                return jsonify({'error': '模板不存在'}), 404
-            
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    template_data = json.load(f)
-                return jsonify({'template': template_data})
-            except Exception as e:
-                print(f'读取模板文件失败 {template_id}: {e}')
-                return jsonify({'error': '读取模板文件失败'}), 500
-        
-        elif request.method == 'PUT':
-            # 更新模板
-            template_data = request.get_json()
-            if not template_data:
-                return jsonify({'error': '模板数据无效'}), 400
-            
-            template_data['id'] = template_id
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(template_data, f, ensure_ascii=False, indent=2)
-            
-            return jsonify({'template': template_data})
-        
-        elif request.method == 'DELETE':
-            # 删除模板
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                return jsonify({'success': True})
-            else:
-                return jsonify({'error': '模板不存在'}), 404
-    
-    except Exception as e:
-        print(f'模板详情API错误: {e}')
-        return jsonify({'error': str(e)}), 500
+    template_data = request.get_json(silent=True) if request.method == 'PUT' else None
+    data, status = handle_template_detail(request.method, template_id, template_data)
+    return json_response(data, status)
 
 @app.route('/datasets', methods=['GET'])
 def datasets():
@@ -214,7 +87,7 @@ def resourcepools():
 
 @app.route('/jobs', methods=['GET'])
 def jobs():
-    cfg = AIJobConfig()
+    cfg = get_config()
     default_pool_id = cfg.get('pool') or ''
     return render_template('jobs.html', default_pool_id=default_pool_id)
 
@@ -270,131 +143,126 @@ def welcome():
         
         return render_template('welcome.html', readme_content=readme_content)
     except Exception as e:
-        print(f'读取README文件失败: {e}')
+        logger.warning('读取README文件失败: %s', e)
         return render_template('welcome.html', readme_content='<p>无法加载README内容，请检查文件是否存在。</p>')
 
+def forward_action(http_method, params, body):
+    """按 action 参数透传请求，返回未解码的上游响应"""
+    upstream = build_action_request(http_method, params, body)
+    # 资源池/队列接口原样返回，任务/数据集等接口与SDK一致去掉 metadata 字段
+    return send_upstream(upstream, strip_metadata=params['action'] not in POOL_QUEUE_ACTIONS)
+
+def forward_path(http_method, url_path, params, body, version):
+    """按 /v1/、/v2/ 路径透传请求"""
+    return send_upstream(build_path_request(http_method, url_path, params, body, version), strip_metadata=True)
+
+def raw_response(raw, cache_status=None):
+    """把上游响应体原样（包括压缩格式）写回浏览器，只读请求支持 If-None-Match"""
+    if_none_match = None
+    if is_read_request(request.method, request.args):
+        if_none_match = request.headers.get('If-None-Match', '')
+    status, body, headers = raw.for_client(request.headers.get('Accept-Encoding', ''), if_none_match)
+    response = Response(body, status=status, headers=headers)
+    if cache_status:
+        response.headers['X-AIHCX-Cache'] = cache_status
+    return response
+
+@app.route('/api/proxy-stats', methods=['GET'])
+def proxy_stats():
+    """代理缓存等运行统计"""
+    return jsonify({
+        'cache': response_cache.stats(),
+        'singleflight': single_flight.stats(),
+        'transport': client_registry.transport().stats(),
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 格式的运行指标"""
+    return Response(metrics.registry.render(), mimetype=metrics.CONTENT_TYPE)
+
 # 代理aihc api，透传请求
 @app.route('/api', methods=['POST', 'GET'])
 @app.route('/api/<path:subpath>', methods=['POST', 'GET'])
 def proxy_aihc(subpath=None):
-    logger.info('proxy_aihc')
+    params = request.args.to_dict()
+    action = proxy_action(request.method, request.path, params)
+    start = time.perf_counter()
+    with metrics.observe(metrics.PROXY_REQUESTS, metrics.PROXY_LATENCY, metrics.PROXY_IN_FLIGHT, action) as result:
+        response = app.make_response(handle_proxy(params, action))
+        result['status'] = response.status_code
+    cache_status = response.headers.get('X-AIHCX-Cache')
+    if cache_status:
+        metrics.PROXY_CACHE.inc(action=action, result=cache_status)
+    log_access(request.method, request.full_path.rstrip('?'), action, response.status_code,
+               time.perf_counter() - start, cache_status)
+    return response
+
+def handle_proxy(params, action):
     try:
-        # 从配置文件中读取host, ak, sk
-        cfg = AIJobConfig()
-        HOST = cfg.get('host')
-        AK = cfg.get('access_key')
-        SK = cfg.get('secret_key')
-        aihc_sample_conf = BceClientConfiguration(credentials=BceCredentials(AK, SK), endpoint=HOST)
-
+        # 客户端由注册表按 (host, AK, SK, API版本) 复用，配置文件变化时自动重建
         # 解析请求参数
         http_method = http_methods.GET if request.method == 'GET' else http_methods.POST
-        path = b'/'
-        params = request.args
-        url = request.url
-        logger.info('url: %s', url)
-        
+
         # 安全地获取JSON body
         try:
-            body = request.get_json()
-            print('body', body)
-            body = json.dumps(body)
+            body = json.dumps(request.get_json())
         except Exception as e:
-            print('没有body参数:', e)
+            logger.debug('没有body参数: %s', e)
             body = json.dumps({})
-
-        print('http_method', http_method)
-        print('path', path)
-        print('body', body)
-        print('params', params)
-        print('params keys:', list(params.keys()))
+        logger.debug('请求参数 %s %s', request.method, request.path,
+                     extra={'fields': {'action': action, 'params': params, 'body': body}})
 
         # 检查URL路径是否包含v1或v2
         url_path = request.path
-        logger.info('url_path: %s', url_path)
 
         # 如果query参数中包含action，则透传到aihc api
         if 'action' in params:
-            print('找到action参数，开始透传请求...', params['action'])
+            if not is_read_action(action):
+                # 写操作（创建/停止/删除等）之后，已缓存的查询结果全部失效
+                try:
+                    return raw_response(forward_action(http_method, params, body))
+                finally:
+                    response_cache.invalidate()
+
+            key = cache_key(action, params, body)
+
+            def load():
+                return single_flight.do(key, lambda: forward_action(http_method, params, body))[0]
+
+            ttl = CACHE_TTLS.get(action)
+            if ttl is None:
+                return raw_response(load())
+
+            if 'no-cache' in request.headers.get('Cache-Control', ''):
+                # 客户端要求跳过缓存时强制回源，并用新结果刷新缓存
+                response_cache.invalidate(lambda k: k == key)
+            result, cache_status = response_cache.get_or_load(key, ttl, load)
+            return raw_response(result, cache_status)
+
+        elif '/v1/' in url_path or '/v2/' in url_path:
+            version = b'v1' if '/v1/' in url_path else b'v2'
             # 透传请求
-
-            if params['action'] in ['DescribeResourcePools', 'DescribeResourcePool', 'DescribeQueues', 'DescribeQueue']:
-                print('获取资源池/队列相关接口请求:', http_method, '/', body, params)
-                aihc_client = AihcClient(aihc_sample_conf)
-                print('开始请求...')
-                response = aihc_client.base_client._aihc_request(
-                    http_method=http_method,
-                    path='/',
-                    body=body,
-                    params=params,
-                )
-                print('请求完成...')
-                # print('获取资源池/队列相关接口响应:', response)         # 返回响应
-                return jsonify(json.loads(response.raw_data)), 200
-            else:
-                print('数据集/模型/任务等相关接口请求:', http_method, path, body, params)
-                aihc_client = AIHCClient(aihc_sample_conf)
-                response = aihc_client._send_request(
-                    http_method=http_method,
-                    path=path,
-                    body=body,
-                    params=params,
-                    headers={
-                        b'version': b'v2',
-                        b'X-API-Version': b'v2',
-                    },
-                    body_parser=parse_json
-                )
-                print('数据集/模型/任务等相关接口响应:', response)         # 返回响应
-                return jsonify(to_dict(response)), 200
-
-        elif '/v1/' in url_path:
-            logger.info('找到v1路径，开始透传请求...')
-            # 透传请求
-            aihc_client = AIHCClient(aihc_sample_conf)
-            response = aihc_client._send_request(
-                http_method=http_method,
-                path=url_path.encode('utf-8'),
-                body=body,
-                params=params,
-                headers={
-                    b'version': b'v1',
-                    b'X-API-Version': b'v1',
-                },
-                body_parser=parse_json
-            )
-
-            print('请求response', response)
-
-            # 返回响应
-            return jsonify(to_dict(response)), 200
-        elif '/v2/' in url_path:
-            logger.info('找到v2路径，开始透传请求...')
-            # 透传请求
-            aihc_client = AIHCClient(aihc_sample_conf)
-            response = aihc_client._send_request(
-                http_method=http_method,
-                path=url_path.encode('utf-8'),
-                body=body,
-                params=params,
-                headers={
-                    b'version': b'v2',
-                    b'X-API-Version': b'v2',
-                },
-                body_parser=parse_json
-            )
-
-            print('请求response', response)
-
-            # 返回响应
-            return jsonify(to_dict(response)), 200
+            if http_method == http_methods.GET:
+                key = cache_key(url_path, params, body)
+                result, _ = single_flight.do(
+                    key, lambda: forward_path(http_method, url_path, params, body, version))
+                return raw_response(result)
+            try:
+                return raw_response(forward_path(http_method, url_path, params, body, version))
+            finally:
+                response_cache.invalidate()
         else:
-            print('未找到action参数或v1/v2路径，返回404')
             # 返回404
             return jsonify({'error': 'Not Found'}), 404
     except Exception as e:
-        print('proxy_aihc函数发生异常:', e)
+        metrics.PROXY_ERRORS.inc(action=action, error=type(e).__name__)
+        logger.warning('代理请求失败: %s', e, extra={'fields': {'action': action, 'error': type(e).__name__}})
         return jsonify({'error': str(e)}), 500
 
-def run_webserver(host='127.0.0.1', port=38765):
+def run_webserver(host='127.0.0.1', port=38765, log_level=None, log_file=None, log_format=None, debug=False):
+    setup_logging(log_level, log_file, log_format)
+    register_metrics(single_flight)
     print(f"Web服务已启动，请在浏览器中访问配置页面: http://{host}:{port}/config")
-    app.run(host=host, port=port, debug=True) 
\ No newline at end of file
+    # 调试模式会开启 Werkzeug 交互式调试器（可执行任意代码），服务持有 AK/SK，只在显式指定 --debug 时开启
+    app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""本地模拟的 AIHC OpenAPI 服务，供基准测试使用
+
+提供 CLI 用到的 v1 接口（任务列表/详情/事件/Pod日志、资源池/节点/队列列表、创建/停止/删除任务）和
+/api 代理按 action 转发的接口（DescribeJobs、DescribeJob、DescribeResourcePools）。
+任务数、每个任务的 Pod 数、日志行数和每个请求的延迟都可以配置；不校验签名。
+
+    python benchmarks/fake_server.py [--port 8000] [--jobs 1000] [--pods 8] [--latency-ms 20]
+
+也可以在基准脚本中直接使用：
+
+    with FakeAIHCServer(jobs=5000, latency_ms=20) as server:
+        ...  # 配置 host 为 server.url
+"""
+import argparse
+import functools
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple
+
+POOL_ID = 'pool-bench'
+
+class FakeOptions(NamedTuple):
+    jobs: int = 1000          # 资源池中的任务数
+    pools: int = 5            # 资源池数
+    pods: int = 8             # 每个任务的 Pod 数
+    log_lines: int = 1000     # 每个 Pod 的日志行数
+    nodes: int = 200          # 每个资源池的节点数
+    queues: int = 4           # 每个资源池的队列数
+    latency_ms: float = 0.0   # 每个请求的额外延迟
+
+def _timestamp(seconds: float) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+class FakeData:
+    """按参数生成的确定性数据；编码后的响应体按请求参数缓存，避免服务端自身成为瓶颈"""
+
+    def __init__(self, options: FakeOptions):
+        self.options = options
+        self.created = time.time()
+
+    def job_summary(self, i: int) -> Dict:
+        status = ('Running', 'Succeeded', 'Failed', 'Pending')[i % 4]
+        created = self.created - i * 60
+        return {
+            'jobId': f'job-{i:05d}',
+            'name': f'bench-{i:05d}',
+            'status': status,
+            'resourcePoolId': POOL_ID,
+            'queue': ('default', 'train', 'eval')[i % 3],
+            'priority': 'normal',
+            'replicas': 1 + i % 2,
+            'resources': [{'name': 'baidu.com/a800_80g_cgpu', 'quantity': 8}],
+            'createdAt': _timestamp(created),
+            'runningAt': _timestamp(created + 30) if status != 'Pending' else None,
+            'finishedAt': _timestamp(created + 1800) if status in ('Succeeded', 'Failed') else None,
+        }
+
+    def job_detail(self, job_id: str) -> Dict:
+        index = int(job_id.rsplit('-', 1)[-1]) if job_id.rsplit('-', 1)[-1].isdigit() else 0
+        job = dict(self.job_summary(index), jobId=job_id, replicas=self.options.pods,
+                   command='python train.py', envs=[{'name': f'ENV_{i}', 'value': str(i)} for i in range(20)])
+        job['podList'] = {'pods': [{
+            'replicaType': 'worker',
+            'objectMeta': {'name': f'{job_id}-worker-{i}', 'namespace': 'default',
+                           'creationTimestamp': job['createdAt'],
+                           'labels': {f'label-{k}': f'value-{k}' for k in range(8)}},
+            'podStatus': {'podPhase': 'Running', 'status': 'Running',
+                          'conditions': [{'type': t, 'status': 'True', 'lastTransitionTime': job['createdAt']}
+                                         for t in ('Initialized', 'Ready', 'ContainersReady', 'PodScheduled')],
+                          'containerStatuses': [{'name': 'main', 'ready': True, 'restartCount': 0,
+                                                 'image': 'registry/train:latest',
+                                                 'state': {'running': {'startedAt': job['createdAt']}}}]},
+        } for i in range(self.options.pods)]}
+        return job
+
+    @functools.lru_cache(maxsize=1024)
+    def job_page(self, page: int, size: int, order: str) -> bytes:
+        indexes = range(self.options.jobs)
+        if order == 'asc':
+            indexes = reversed(indexes)
+        indexes = list(indexes)[(page - 1) * size:page * size]
+        jobs = [self.job_summary(i) for i in indexes]
+        return _encode({'requestId': 'bench', 'result': {'jobs': jobs, 'totalCount': self.options.jobs}})
+
+    @functools.lru_cache(maxsize=256)
+    def job(self, job_id: str) -> bytes:
+        return _encode({'requestId': 'bench', 'result': self.job_detail(job_id)})
+
+    @functools.lru_cache(maxsize=1)
+    def pools(self) -> bytes:
+        pools = [{'metadata': {'id': f'{POOL_ID}-{i}' if i else POOL_ID, 'name': f'bench-{i}',
+                               'createdAt': _timestamp(self.created)},
+                  'status': {'phase': 'running', 'nodeCount': {'used': i, 'total': 16},
+                             'gpuCount': {'used': i * 8, 'total': 128}}}
+                 for i in range(self.options.pools)]
+        return _encode({'requestId': 'bench', 'result': {'resourcePools': pools, 'totalCount': len(pools)}})
+
+    @functools.lru_cache(maxsize=1024)
+    def nodes(self, pool_id: str, page: int, size: int) -> bytes:
+        models = ('A800', 'H800', 'L20')
+        nodes = [{'nodeName': f'{pool_id}-node-{i:05d}', 'instanceId': f'i-{i:08d}', 'instanceName': f'node-{i:05d}',
+                  'statusPhase': 'NotReady' if i % 50 == 49 else 'Ready', 'region': 'bj', 'zone': f'zone{"ABC"[i % 3]}',
+                  'gpuType': models[i % len(models)], 'gpuTotal': 8, 'gpuAllocated': i % 9,
+                  'createdAt': _timestamp(self.created - i)}
+                 for i in range((page - 1) * size, min(page * size, self.options.nodes))]
+        return _encode({'requestId': 'bench', 'result': {'nodes': nodes, 'totalCount': self.options.nodes}})
+
+    @functools.lru_cache(maxsize=64)
+    def queues(self, pool_id: str) -> bytes:
+        gpus = self.options.nodes * 8 // max(1, self.options.queues)
+        queues = [{'name': f'queue-{i}', 'queueType': 'Elastic', 'state': 'Open',
+                   'capability': {'milliCPUcores': 96000, 'memoryGi': 1024, 'accelerators': {'baidu.com/a800_80g_cgpu': gpus}},
+                   'allocated': {'milliCPUcores': 48000, 'memoryGi': 512, 'accelerators': {'baidu.com/a800_80g_cgpu': gpus // (i + 2)}}}
+                  for i in range(self.options.queues)]
+        return _encode({'requestId': 'bench', 'result': {'queues': queues, 'total': len(queues)}})
+
+    def events(self, job_id: str) -> bytes:
+        events = [{'reason': 'Started', 'message': f'{job_id} pod {i} started', 'firstTimestamp': _timestamp(self.created)}
+                  for i in range(self.options.pods)]
+        return _encode({'requestId': 'bench', 'result': {'events': events, 'total': len(events)}})
+
+    @functools.lru_cache(maxsize=64)
+    def logs(self, pod_name: str, max_lines: int) -> bytes:
+        count = min(self.options.log_lines, max_lines) if max_lines else self.options.log_lines
+        lines = [f'{_timestamp(self.created)} {pod_name} step {i} loss {1.0 / (i + 1):.6f}' for i in range(count)]
+        return _encode({'requestId': 'bench', 'result': {'logs': lines}})
+
+    def describe(self, action: str, params: Dict, body: Dict) -> bytes:
+        """/api 代理转发的 action 接口，响应格式与 v1 接口相同"""
+        if action == 'DescribeJobs':
+            page = int(body.get('pageNumber') or params.get('pageNumber') or 1)
+            size = int(body.get('pageSize') or params.get('pageSize') or 50)
+            return self.job_page(page, size, 'desc')
+        if action == 'DescribeJob':
+            return self.job(body.get('jobId') or params.get('jobId') or 'job-00000')
+        if action == 'DescribeResourcePools':
+            return self.pools()
+        return _encode({'requestId': 'bench', 'result': {}})
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，keep-alive 连接上不关闭 Nagle 会被延迟确认拖慢约 40ms
+    disable_nagle_algorithm = True
+    server: '_Server'
+
+    def _reply(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        self.server.count()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+        data = self.server.data
+        parts = [p for p in url.path.split('/') if p]
+
+        if 'action' in params:
+            return self._reply(200, data.describe(params['action'], params, body if isinstance(body, dict) else {}))
+        if parts[:3] == ['api', 'v1', 'resourcepools'] and len(parts) == 3:
+            return self._reply(200, data.pools())
+        if parts[:3] == ['api', 'v1', 'resourcepools'] and parts[4:] == ['nodes']:
+            return self._reply(200, data.nodes(parts[3], int(params.get('pageNo', 1)), int(params.get('pageSize', 50))))
+        if parts[:3] == ['api', 'v1', 'resourcepools'] and parts[4:] == ['queue']:
+            return self._reply(200, data.queues(parts[3]))
+        if parts[:3] != ['api', 'v1', 'aijobs']:
+            return self._reply(404, _encode({'code': 'NotFound', 'message': url.path, 'requestId': 'bench'}))
+        rest = parts[3:]
+        if not rest:
+            if self.command == 'POST':
+                return self._reply(200, _encode({'requestId': 'bench', 'result': {
+                    'jobId': 'job-' + params.get('clientToken', 'new')[-8:], 'jobName': body.get('name')}}))
+            page = int(params.get('pageNo', 1))
+            size = int(params.get('pageSize', 10))
+            return self._reply(200, data.job_page(page, size, params.get('order', 'desc')))
+        job_id = rest[0]
+        if len(rest) == 1:
+            if self.command == 'DELETE':
+                return self._reply(200, _encode({'requestId': 'bench', 'result': {'jobId': job_id}}))
+            return self._reply(200, data.job(job_id))
+        if rest[1:] == ['stop']:
+            return self._reply(200, _encode({'requestId': 'bench', 'result': {'jobId': job_id}}))
+        if rest[1:] == ['events']:
+            return self._reply(200, data.events(job_id))
+        if len(rest) == 4 and rest[1] == 'pods' and rest[3] == 'logs':
+            return self._reply(200, data.logs(rest[2], int(params.get('maxLines') or 0)))
+        return self._reply(404, _encode({'code': 'NotFound', 'message': url.path, 'requestId': 'bench'}))
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address, data: FakeData):
+        super().__init__(address, _Handler)
+        self.data = data
+        self.latency = data.options.latency_ms / 1000
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+class FakeAIHCServer:
+    """在后台线程中运行的模拟服务，port 为 0 时自动选择空闲端口"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **options):
+        self.options = FakeOptions(**options)
+        self._server = _Server((host, port), FakeData(self.options))
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def start(self) -> 'FakeAIHCServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeAIHCServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    for field, default in FakeOptions._field_defaults.items():
+        parser.add_argument('--' + field.replace('_', '-'), type=type(default), default=default)
+    args = vars(parser.parse_args(argv))
+    server = FakeAIHCServer(args.pop('host'), args.pop('port'), **args)
+    print(f"模拟 AIHC OpenAPI 服务: {server.url}（资源池 {POOL_ID}），Ctrl+C 退出")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""响应序列化微基准：旧路径（Expando + 递归转换 + 纯 Python yaml.dump）与新路径对比
+
+用合成的任务详情响应（默认 500 个 Pod）分别计时并统计峰值内存，另对比 job pods 的表格输出
+（每个 Pod 一个 dict + tabulate 与 PodRecord + 流式表格）：
+
+    python benchmarks/serialization.py [--pods 500] [--repeat 5] [--json results.json]
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+from baidubce.services.aihc.aihc_handler import dict_to_python_object
+
+from aihcx.output import TableWriter, write_document, yaml_dumper
+from aihcx.records import PodRecord, pod_records
+
+def make_body(pods: int) -> bytes:
+    """合成一个带 pods 个 Pod 的任务详情响应体"""
+    job = {
+        'jobId': 'job-bench', 'name': 'bench', 'status': 'Running', 'queue': 'default',
+        'resourcePoolId': 'pool-bench', 'priority': 'normal', 'replicas': pods, 'command': 'python train.py',
+        'envs': [{'name': f'ENV_{i}', 'value': str(i)} for i in range(20)],
+        'podList': {'pods': [{
+            'replicaType': 'worker',
+            'objectMeta': {'name': f'bench-worker-{i}', 'namespace': 'default', 'creationTimestamp': '2024-01-01T00:00:00Z',
+                           'labels': {f'label-{k}': f'value-{k}' for k in range(8)}},
+            'podStatus': {'podPhase': 'Running', 'status': 'Running',
+                          'conditions': [{'type': t, 'status': 'True', 'lastTransitionTime': '2024-01-01T00:00:00Z'}
+                                         for t in ('Initialized', 'Ready', 'ContainersReady', 'PodScheduled')],
+                          'containerStatuses': [{'name': 'main', 'ready': True, 'restartCount': 0,
+                                                 'image': 'registry/train:latest', 'state': {'running': {'startedAt': 'x'}}}]},
+        } for i in range(pods)]},
+    }
+    return json.dumps({'requestId': 'bench', 'result': job}).encode('utf-8')
+
+def recursive_to_dict(obj):
+    """原来的递归实现"""
+    if isinstance(obj, dict):
+        return {k: recursive_to_dict(v) for k, v in obj.items()}
+    elif hasattr(obj, '__dict__'):
+        return {k: recursive_to_dict(v) for k, v in obj.__dict__.items()}
+    elif isinstance(obj, list):
+        return [recursive_to_dict(item) for item in obj]
+    return obj
+
+def old_yaml(body):
+    result = json.loads(body, object_hook=dict_to_python_object).result
+    return yaml.dump(recursive_to_dict(result), allow_unicode=True)
+
+def new_yaml(body):
+    out = io.StringIO()
+    yaml.dump(json.loads(body)['result'], out, Dumper=yaml_dumper(), allow_unicode=True)
+    return out.getvalue()
+
+def new_json(body):
+    out = io.StringIO()
+    stdout, sys.stdout = sys.stdout, out
+    try:
+        write_document(json.loads(body)['result'], 'json')
+    finally:
+        sys.stdout = stdout
+    return out.getvalue()
+
+def old_convert(body):
+    return recursive_to_dict(json.loads(body, object_hook=dict_to_python_object).result)
+
+def raw_decode(body):
+    return json.loads(body)['result']
+
+def old_pod_table(body):
+    from tabulate import tabulate
+    rows = [{
+        'replicaType': pod['replicaType'],
+        'name': pod['objectMeta']['name'],
+        'namespace': pod['objectMeta']['namespace'],
+        'podPhase': pod['podStatus']['podPhase'],
+        'status': pod['podStatus']['status'],
+        'creationTimestamp': pod['objectMeta']['creationTimestamp'],
+    } for pod in json.loads(body)['result']['podList']['pods']]
+    return tabulate(rows, headers='keys', tablefmt='plain')
+
+def new_pod_table(body):
+    pods = json.loads(body)['result']['podList']['pods']
+    writer = TableWriter(list(PodRecord._fields))
+    # 与 RowWriter.write 一样按块格式化，这里只保留最后一块的文本
+    records, text = pod_records(pods), None
+    while True:
+        chunk = list(itertools.islice(records, 1000))
+        if not chunk:
+            return text
+        text = writer.format(chunk)
+
+CASES = [
+    ('yaml (old: Expando + recursive + yaml.Dumper)', old_yaml),
+    ('yaml (new: raw json + CSafeDumper)', new_yaml),
+    ('json (new: raw json + streaming encoder)', new_json),
+    ('convert (old: Expando + recursive to_dict)', old_convert),
+    ('convert (new: raw body json.loads)', raw_decode),
+    ('pod table (old: dict rows + tabulate)', old_pod_table),
+    ('pod table (new: PodRecord + streaming table)', new_pod_table),
+]
+
+def measure(fn, body, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=500, help='合成响应中的Pod数')
+    parser.add_argument('--repeat', type=int, default=5, help='每种方式运行次数，取最快一次')
+    parser.add_argument('--json', dest='json_path', help='把结果写入JSON文件')
+    args = parser.parse_args()
+
+    body = make_body(args.pods)
+    assert yaml.safe_load(old_yaml(body)) == yaml.safe_load(new_yaml(body)) == json.loads(new_json(body))
+    results = []
+    print(f"响应体 {len(body) / 1024:.0f} KiB，{args.pods} 个Pod，libyaml: {'CSafeDumper' in yaml_dumper().__name__}")
+    for name, fn in CASES:
+        seconds, peak = measure(fn, body, args.repeat)
+        results.append({'case': name, 'ms': round(seconds * 1000, 2), 'peak_kib': round(peak / 1024)})
+        print(f"{name:48} {seconds * 1000:9.2f} ms  peak {peak / 1024 / 1024:7.2f} MiB")
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'pods': args.pods, 'body_bytes': len(body), 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""CLI 启动开销基准
+
+用 `python -X importtime` 统计常用命令（版本、帮助、shell补全等）的导入耗时，
+超出预算或导入了不该导入的重量级依赖时以非零状态退出，便于在 CI 中发现启动变慢。
+
+    python benchmarks/startup.py [--repeat 5] [--budget-ms 80] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 这些场景都不应该导入的依赖
+HEAVY_MODULES = ['baidubce', 'requests', 'flask', 'flask_cors', 'yaml', 'tabulate', 'questionary', 'http.client']
+
+# (场景名, 命令行参数, 额外环境变量)
+SCENARIOS = [
+    ('version', ['version'], {}),
+    ('help', ['--help'], {}),
+    ('job-help', ['job', 'status', '--help'], {}),
+    ('complete-job-id', [], {'_AIHCX_COMPLETE': 'bash_complete', 'COMP_WORDS': 'aihcx job get job-', 'COMP_CWORD': '3'}),
+    ('complete-pool', [], {'_AIHCX_COMPLETE': 'bash_complete', 'COMP_WORDS': 'aihcx node list --pool ', 'COMP_CWORD': '4'}),
+]
+
+RUNNER = 'import sys; from aihcx.cli import cli; cli(sys.argv[1:], prog_name="aihcx")'
+
+def parse_importtime(stderr: str):
+    """解析 -X importtime 输出，返回 (顶层导入的累计耗时微秒, 导入的模块名集合)"""
+    total, modules = 0, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return total, modules
+
+def run_once(args, env, code=RUNNER):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code] + args,
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    import_us, modules = parse_importtime(proc.stderr)
+    return wall, import_us, modules, proc.returncode
+
+def prepare_home(home: Path):
+    """临时 HOME：写入配置并预置补全索引，补全场景不访问网络"""
+    config_dir = home / '.aijob'
+    config_dir.mkdir(parents=True)
+    (config_dir / 'config.json').write_text(json.dumps({
+        'host': 'http://127.0.0.1:9', 'access_key': 'ak', 'secret_key': 'sk', 'pool': 'pool-bench'}))
+    code = ('from aihcx.completion import CompletionIndex; i = CompletionIndex(); '
+            'i.replace("pool", "", [("pool-%d" % n, "bench") for n in range(50)]); '
+            'i.replace("job", "pool-bench", [("job-%05d" % n, "bench") for n in range(500)])')
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                   env=dict(os.environ, HOME=str(home)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='每个场景运行次数，取中位数')
+    parser.add_argument('--budget-ms', type=float, default=80.0, help='每个场景的导入耗时预算（毫秒，已扣除解释器自身开销）')
+    parser.add_argument('--json', dest='json_path', help='把结果写入JSON文件')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp)
+        prepare_home(home)
+        env = dict(os.environ, HOME=str(home))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+
+        # 解释器本身（site 等）的导入开销，从各场景中扣除
+        baseline_us = statistics.median(run_once([], env, code='pass')[1] for _ in range(args.repeat))
+
+        results, failed = [], False
+        for name, argv, extra_env in SCENARIOS:
+            runs = [run_once(argv, dict(env, **extra_env)) for _ in range(args.repeat)]
+            import_ms = max(0.0, statistics.median(r[1] for r in runs) - baseline_us) / 1000
+            heavy = sorted({h for r in runs for m in r[2] for h in HEAVY_MODULES
+                            if m == h or m.startswith(h + '.')})
+            ok = import_ms <= args.budget_ms and not heavy and all(r[3] == 0 for r in runs)
+            failed = failed or not ok
+            results.append({
+                'scenario': name,
+                'wall_ms': round(statistics.median(r[0] for r in runs) * 1000, 1),
+                'import_ms': round(import_ms, 1),
+                'budget_ms': args.budget_ms,
+                'heavy_modules': heavy,
+                'exit_codes': sorted({r[3] for r in runs}),
+                'ok': ok,
+            })
+
+    for r in results:
+        status = 'OK' if r['ok'] else 'FAIL'
+        extra = f"  heavy={','.join(r['heavy_modules'])}" if r['heavy_modules'] else ''
+        print(f"{status:4}  {r['scenario']:16} import {r['import_ms']:6.1f}ms  wall {r['wall_ms']:6.1f}ms{extra}")
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'baseline_import_ms': round(baseline_us / 1000, 1), 'results': results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
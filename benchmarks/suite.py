@@ -0,0 +1,332 @@
+"""基准测试套件：在本地模拟的 AIHC OpenAPI 服务上测量常用操作，结果输出为 JSON 便于跨版本对比
+
+    python benchmarks/suite.py [--json results.json] [--only job-list,proxy] [--quick]
+
+场景：
+    startup       CLI 启动开销（调用 startup.py）
+    job-list      job list --all 拉取多页任务的耗时（默认并发 / 单线程）
+    completion    任务ID补全的延迟（无索引时同步拉取 / 已有索引）
+    proxy         aihcx web 的 /api 代理吞吐和延迟分位数（缓存命中 / 强制回源）
+    get-job       Pod 很多的任务详情输出为 yaml/json 的耗时和峰值内存
+    capacity      pool capacity 汇总全部资源池节点和队列的耗时
+    daemon        通过 aihcx 入口重复执行 job status：daemon 转发 / 进程内执行
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_server import POOL_ID, FakeAIHCServer  # noqa: E402
+
+RUNNER = 'import sys; from aihcx.cli import cli; cli(sys.argv[1:], prog_name="aihcx")'
+
+# aihcx 入口（daemon 运行时转发命令）
+MAIN_RUNNER = 'from aihcx.daemon import main; main()'
+
+def make_home(home: Path, url: str) -> Dict[str, str]:
+    """临时 HOME 和指向模拟服务的配置，返回运行 CLI 用的环境变量"""
+    config_dir = home / '.aijob'
+    config_dir.mkdir(parents=True, exist_ok=True)
+    (config_dir / 'config.json').write_text(json.dumps({
+        'host': url, 'access_key': 'ak', 'secret_key': 'sk', 'pool': POOL_ID, 'queue': 'default'}))
+    env = dict(os.environ, HOME=str(home))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+    return env
+
+def run_cli(args: List[str], env: Dict[str, str], runner: str = RUNNER) -> Dict:
+    """在子进程中运行一次 CLI，返回耗时、输出字节数和子进程的峰值内存"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', runner] + args, cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    size = len(proc.stdout.read())
+    proc.stdout.close()
+    max_rss_kib = None
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # Linux 上单位是 KiB，macOS 上是字节
+        max_rss_kib = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    else:
+        proc.wait()
+    return {'seconds': time.perf_counter() - start, 'bytes': size, 'max_rss_kib': max_rss_kib,
+            'exit_code': proc.returncode}
+
+def summarize_runs(runs: List[Dict]) -> Dict:
+    """多次运行取中位数"""
+    rss = [r['max_rss_kib'] for r in runs if r['max_rss_kib'] is not None]
+    return {
+        'wall_ms': round(statistics.median(r['seconds'] for r in runs) * 1000, 1),
+        'min_ms': round(min(r['seconds'] for r in runs) * 1000, 1),
+        'output_bytes': runs[0]['bytes'],
+        'max_rss_mib': round(max(rss) / 1024, 1) if rss else None,
+        'exit_codes': sorted({r['exit_code'] for r in runs}),
+    }
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def bench_startup(args, server) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / 'startup.json'
+        proc = subprocess.run([sys.executable, str(ROOT / 'benchmarks' / 'startup.py'),
+                               '--repeat', str(args.repeat), '--json', str(out)],
+                              cwd=ROOT, capture_output=True, text=True)
+        result = json.loads(out.read_text()) if out.exists() else {'error': proc.stderr[-500:]}
+    result['ok'] = proc.returncode == 0
+    return result
+
+def bench_job_list(args, server) -> Dict:
+    pages = (server.options.jobs + args.page_size - 1) // args.page_size
+    results = {'jobs': server.options.jobs, 'page_size': args.page_size, 'pages': pages}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_home(Path(tmp), server.url)
+        for name, workers in (('concurrent', 8), ('sequential', 1)):
+            argv = ['job', 'list', '--all', '--size', str(args.page_size), '--workers', str(workers), '-o', 'jsonl']
+            results[name] = summarize_runs([run_cli(argv, env) for _ in range(args.repeat)])
+    return results
+
+def bench_completion(args, server) -> Dict:
+    argv = []
+    comp_env = {'_AIHCX_COMPLETE': 'bash_complete', 'COMP_WORDS': 'aihcx job get job-000', 'COMP_CWORD': '3'}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_home(Path(tmp), server.url)
+        cold = []
+        for _ in range(args.repeat):
+            index = Path(tmp) / '.aijob' / 'completion.db'
+            if index.exists():
+                index.unlink()
+            cold.append(run_cli(argv, dict(env, **comp_env)))
+        results['cold'] = summarize_runs(cold)
+        results['warm'] = summarize_runs([run_cli(argv, dict(env, **comp_env)) for _ in range(args.repeat)])
+    return results
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_http(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/config-json')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'aihcx web 未能在 {timeout}s 内启动')
+
+def load_test(port: int, path: str, body: bytes, headers: Dict[str, str], concurrency: int, requests: int) -> Dict:
+    """concurrency 个线程各自用 keep-alive 连接发送请求，统计吞吐和延迟分位数"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    per_thread = max(1, requests // concurrency)
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            local.append(time.perf_counter() - start)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+def bench_proxy(args, server) -> Dict:
+    results = {}
+    engines = ['flask']
+    # 只检查 async 引擎的可选依赖是否已安装，不在本进程中导入
+    if all(importlib.util.find_spec(name) for name in ('httpx', 'uvicorn')):
+        engines.append('async')
+    body = json.dumps({'resourcePoolId': POOL_ID, 'pageNumber': 1, 'pageSize': 50}).encode()
+    base_headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_home(Path(tmp), server.url)
+        for engine in engines:
+            port = _free_port()
+            proc = subprocess.Popen([sys.executable, '-c', RUNNER, 'web', '--port', str(port), '--engine', engine],
+                                    cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_http(port)
+                upstream_before = server.requests
+                results[engine] = {
+                    'cached': load_test(port, '/api?action=DescribeJobs', body, base_headers,
+                                        args.concurrency, args.requests),
+                    'no_cache': load_test(port, '/api?action=DescribeJobs', body,
+                                          dict(base_headers, **{'Cache-Control': 'no-cache'}),
+                                          args.concurrency, args.requests),
+                }
+                results[engine]['upstream_requests'] = server.requests - upstream_before
+            finally:
+                proc.terminate()
+                proc.wait()
+    return results
+
+def bench_get_job(args, server) -> Dict:
+    results = {'pods': server.options.pods}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_home(Path(tmp), server.url)
+        for output in ('yaml', 'json'):
+            argv = ['job', 'get', 'job-00000', '-o', output]
+            results[output] = summarize_runs([run_cli(argv, env) for _ in range(args.repeat)])
+    return results
+
+def bench_capacity(args, server) -> Dict:
+    results = {'pools': server.options.pools, 'nodes_per_pool': server.options.nodes}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_home(Path(tmp), server.url)
+        argv = ['pool', 'capacity', '-o', 'jsonl']
+        results['all_pools'] = summarize_runs([run_cli(argv, env) for _ in range(args.repeat)])
+    return results
+
+def bench_daemon(args, server) -> Dict:
+    results = {}
+    argv = ['job', 'status', 'job-00001']
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_home(Path(tmp), server.url)
+        results['in_process'] = summarize_runs([run_cli(argv, dict(env, AIHCX_NO_DAEMON='1'), MAIN_RUNNER)
+                                                for _ in range(args.repeat * 4)])
+        run_cli(['daemon', 'start'], env)
+        try:
+            results['daemon'] = summarize_runs([run_cli(argv, env, MAIN_RUNNER) for _ in range(args.repeat * 4)])
+        finally:
+            run_cli(['daemon', 'stop'], env)
+        # 解释器本身的启动耗时，daemon 模式下剩余的开销主要是它
+        results['interpreter_ms'] = summarize_runs([run_cli([], env, 'pass') for _ in range(args.repeat * 4)])['wall_ms']
+    return results
+
+# (场景名, 函数, 模拟服务参数)
+SCENARIOS = [
+    ('startup', bench_startup, None),
+    ('job-list', bench_job_list, 'list'),
+    ('completion', bench_completion, 'list'),
+    ('proxy', bench_proxy, 'list'),
+    ('get-job', bench_get_job, 'detail'),
+    ('capacity', bench_capacity, 'capacity'),
+    ('daemon', bench_daemon, 'detail'),
+]
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--json', dest='json_path', help='把结果写入JSON文件')
+    parser.add_argument('--only', help='只运行指定场景（逗号分隔）: ' + ','.join(s[0] for s in SCENARIOS))
+    parser.add_argument('--quick', action='store_true', help='缩小数据量和运行次数，用于快速检查')
+    parser.add_argument('--repeat', type=int, help='每个CLI场景运行次数，取中位数（默认 5，--quick 时 2）')
+    parser.add_argument('--jobs', type=int, help='模拟资源池中的任务数（默认 5000，--quick 时 500）')
+    parser.add_argument('--page-size', type=int, default=100, help='job list 每页大小')
+    parser.add_argument('--pods', type=int, help='get-job 场景的Pod数（默认 2000，--quick 时 200）')
+    parser.add_argument('--nodes', type=int, help='capacity 场景全部资源池的节点总数（默认 5000，--quick 时 500）')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='模拟服务每个请求的延迟')
+    parser.add_argument('--concurrency', type=int, default=16, help='proxy 场景的并发连接数')
+    parser.add_argument('--requests', type=int, help='proxy 场景每轮的请求总数（默认 2000，--quick 时 200）')
+    args = parser.parse_args()
+    args.repeat = args.repeat or (2 if args.quick else 5)
+    args.jobs = args.jobs or (500 if args.quick else 5000)
+    args.pods = args.pods or (200 if args.quick else 2000)
+    args.requests = args.requests or (200 if args.quick else 2000)
+    args.nodes = args.nodes or (500 if args.quick else 5000)
+
+    selected = set(args.only.split(',')) if args.only else {s[0] for s in SCENARIOS}
+    unknown = selected - {s[0] for s in SCENARIOS}
+    if unknown:
+        parser.error(f"未知的场景: {', '.join(sorted(unknown))}")
+
+    servers = {
+        'list': FakeAIHCServer(jobs=args.jobs, latency_ms=args.latency_ms),
+        'detail': FakeAIHCServer(jobs=10, pods=args.pods, latency_ms=args.latency_ms),
+        'capacity': FakeAIHCServer(jobs=10, pools=5, nodes=args.nodes // 5, latency_ms=args.latency_ms),
+    }
+    results = {}
+    try:
+        for server in servers.values():
+            server.start()
+        for name, fn, server_name in SCENARIOS:
+            if name not in selected:
+                continue
+            print(f"运行 {name} ...", file=sys.stderr)
+            start = time.perf_counter()
+            results[name] = fn(args, servers.get(server_name))
+            results[name]['elapsed_s'] = round(time.perf_counter() - start, 1)
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    from aihcx import __version__
+    report = {
+        'meta': {
+            'version': __version__,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'options': {k: v for k, v in vars(args).items() if k not in ('json_path', 'only')},
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,7 @@ REM 识别平台（仅支持 Windows）
 set PLATFORM=win
 
 REM 打包
-pyinstaller --onefile -n aihcx aihcx/cli.py
+pyinstaller --onefile -n aihcx --hidden-import aihcx.cli --hidden-import aihcx.commands aihcx/__main__.py
 if errorlevel 1 (
     echo 打包失败
     exit /b 1
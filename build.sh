@@ -30,7 +30,7 @@ else
 fi
 
 # 打包
-pyinstaller --onefile -n aihcx aihcx/cli.py
+pyinstaller --onefile -n aihcx --hidden-import aihcx.cli --hidden-import aihcx.commands aihcx/__main__.py
 
 # 创建目标目录
 OUTDIR=dist/$VERSION/$PLATFORM
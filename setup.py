@@ -14,9 +14,20 @@ setup(
         "bce-python-sdk-next>=100.9.19.19",
         "questionary>=1.10.0",
     ],
+    extras_require={
+        # aihcx web --engine async
+        "async": [
+            "uvicorn>=0.20.0",
+            "httpx>=0.23.0",
+        ],
+        # Web服务响应的 brotli 压缩（未安装时使用 gzip）
+        "brotli": [
+            "brotli>=1.0.0",
+        ],
+    },
     entry_points={
         "console_scripts": [
-            "aihcx=aihcx.cli:cli",
+            "aihcx=aihcx.daemon:main",
         ],
     },
     description="AI训练平台命令行工具",
@@ -0,0 +1,50 @@
+import pytest
+
+class FakeClock:
+    """替代模块中的 time：monotonic/time 返回手动推进的时间，sleep 只推进时间不真正等待"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    """只替换被测模块里的 time，不影响线程和事件循环自己的计时"""
+    from aihcx import cache, transport
+
+    fake = FakeClock()
+    monkeypatch.setattr(cache, 'time', fake)
+    monkeypatch.setattr(transport, 'time', fake)
+    return fake
+
+@pytest.fixture
+def home(monkeypatch, tmp_path):
+    """以临时目录作为 HOME，配置文件和本地数据库都写到这里"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.delenv('AIHCX_PROFILE', raising=False)
+    return tmp_path
+
+@pytest.fixture
+def fake_server():
+    """本地模拟的 AIHC OpenAPI 服务（benchmarks/fake_server.py）"""
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+    from fake_server import FakeAIHCServer
+
+    with FakeAIHCServer(jobs=50, pools=1, pods=2, nodes=5) as server:
+        yield server
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('uvicorn')
+httpx = pytest.importorskip('httpx')
+
+from aihcx import proxy, template_store
+from aihcx.asyncserver import AsyncProxyApp
+from aihcx.client import AIJobConfig, client_registry
+
+@pytest.fixture
+def config_dir(home):
+    path = home / 'aihcx-data'
+    (path / 'templates').mkdir(parents=True)
+    AIJobConfig().update(path=str(path))
+    client_registry.clear()
+    template_store._stores.clear()
+    yield path
+    client_registry.clear()
+    template_store._stores.clear()
+
+async def fallback(scope, receive, send):
+    raise AssertionError(f"unexpected fallback: {scope['path']}")
+
+def call(method, path, body=None, query=b''):
+    """直接调用 ASGI 应用；path 与服务器交给应用的 scope['path'] 一样是解码一次之后的值"""
+    async def run():
+        app = AsyncProxyApp(fallback)
+        app.http = httpx.AsyncClient()
+        messages = []
+        content = json.dumps(body).encode() if body is not None else b''
+
+        async def receive():
+            return {'type': 'http.request', 'body': content, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+                 'headers': [(b'content-type', b'application/json')]}
+        try:
+            await app(scope, receive, send)
+        finally:
+            await app.http.aclose()
+        return messages[0]['status'], json.loads(messages[1]['body'])
+
+    return asyncio.run(run())
+
+def test_template_id_is_not_decoded_twice(config_dir):
+    secret = config_dir / 'secret.json'
+    secret.write_text('{}')
+    # 浏览器请求 /api/templates/..%252Fsecret，服务器解码一次后是 ..%2Fsecret
+    status, data = call('DELETE', '/api/templates/..%2Fsecret')
+    assert status == 400 and '无效的模板ID' in data['error']
+    status, _ = call('PUT', '/api/templates/..%2Fsecret', {'name': 'x'})
+    assert status == 400
+    assert secret.exists()
+    assert sorted(p.name for p in config_dir.iterdir()) == ['secret.json', 'templates']
+
+def test_template_detail_round_trip(config_dir):
+    status, data = call('PUT', '/api/templates/t1', {'name': 'first'})
+    assert (status, data['template']) == (200, {'name': 'first', 'id': 't1'})
+    assert call('GET', '/api/templates/t1') == (200, {'template': {'name': 'first', 'id': 't1'}})
+    assert call('DELETE', '/api/templates/t1') == (200, {'success': True})
+    assert call('GET', '/api/templates/t1')[0] == 404
+
+def test_config_reads_and_signing_run_off_the_event_loop(home, fake_server, monkeypatch):
+    AIJobConfig().update(host=fake_server.url, access_key='ak', secret_key='sk', max_retries=0)
+    client_registry.clear()
+    proxy.response_cache.invalidate()
+    threads = []
+    config = client_registry.config
+
+    def recording_config():
+        threads.append(threading.current_thread())
+        return config()
+
+    monkeypatch.setattr(client_registry, 'config', recording_config)
+    status, data = call('GET', '/api/v1/aijobs', query=b'resourcePoolId=pool-bench&pageSize=5')
+    client_registry.clear()
+    assert status == 200 and len(data['result']['jobs']) == 5
+    # cache_key、签名和 transport 都会读取配置（stat 配置文件），不能在事件循环线程中执行
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+
+from aihcx.cache import HIT, MISS, STALE, AsyncSingleFlight, ResponseCache, SingleFlight
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.001)
+
+def test_response_cache_hit_within_ttl(clock):
+    cache = ResponseCache()
+    calls = []
+    assert cache.get_or_load('k', 10, lambda: calls.append(1) or 'v1') == ('v1', MISS)
+    clock.advance(9.9)
+    assert cache.get_or_load('k', 10, lambda: 'v2') == ('v1', HIT)
+    assert calls == [1]
+
+def test_response_cache_stale_while_revalidate(clock):
+    cache = ResponseCache(stale_factor=5)
+    cache.get_or_load('k', 10, lambda: 'v1')
+    clock.advance(10)
+
+    release = threading.Event()
+    refreshes = []
+
+    def loader():
+        refreshes.append(1)
+        release.wait(5)
+        return 'v2'
+
+    # 过期后返回旧值并只发起一次后台刷新
+    assert cache.get_or_load('k', 10, loader) == ('v1', STALE)
+    assert cache.get_or_load('k', 10, loader) == ('v1', STALE)
+    release.set()
+    wait_until(lambda: cache.stats()['refreshes'] == 1)
+    assert refreshes == [1]
+    assert cache.get_or_load('k', 10, loader) == ('v2', HIT)
+
+def test_response_cache_refresh_error_keeps_stale_value(clock):
+    cache = ResponseCache(stale_factor=5)
+    cache.get_or_load('k', 10, lambda: 'v1')
+    clock.advance(10)
+
+    def loader():
+        raise RuntimeError('boom')
+
+    assert cache.get_or_load('k', 10, loader) == ('v1', STALE)
+    wait_until(lambda: cache.stats()['refresh_errors'] == 1)
+    assert cache.get_or_load('k', 10, lambda: 'v2') == ('v1', STALE)
+
+def test_response_cache_miss_after_stale_window(clock):
+    cache = ResponseCache(stale_factor=5)
+    cache.get_or_load('k', 10, lambda: 'v1')
+    clock.advance(60)
+    assert cache.get_or_load('k', 10, lambda: 'v2') == ('v2', MISS)
+
+def test_response_cache_lru_eviction(clock):
+    cache = ResponseCache(maxsize=2)
+    cache.get_or_load('a', 10, lambda: 1)
+    cache.get_or_load('b', 10, lambda: 2)
+    cache.get_or_load('a', 10, lambda: 1)
+    cache.get_or_load('c', 10, lambda: 3)
+    assert cache.get_or_load('a', 10, lambda: 'new') == (1, HIT)
+    assert cache.get_or_load('b', 10, lambda: 'new') == ('new', MISS)
+    assert cache.stats()['evictions'] == 2
+
+def test_response_cache_invalidate_by_predicate(clock):
+    cache = ResponseCache()
+    cache.get_or_load(('pool', 1), 10, lambda: 1)
+    cache.get_or_load(('job', 1), 10, lambda: 2)
+    cache.invalidate(lambda key: key[0] == 'job')
+    assert cache.get_or_load(('pool', 1), 10, lambda: 'new') == (1, HIT)
+    assert cache.get_or_load(('job', 1), 10, lambda: 'new') == ('new', MISS)
+
+def test_response_cache_drops_result_loaded_across_invalidation(clock):
+    cache = ResponseCache()
+
+    def loader():
+        # 加载期间发生写操作，缓存失效
+        cache.invalidate()
+        return 'old'
+
+    assert cache.get_or_load('k', 10, loader) == ('old', MISS)
+    assert cache.get_or_load('k', 10, lambda: 'new') == ('new', MISS)
+    assert cache.stats()['size'] == 1
+
+def test_response_cache_stats_hit_ratio(clock):
+    cache = ResponseCache()
+    cache.get_or_load('k', 10, lambda: 1)
+    cache.get_or_load('k', 10, lambda: 1)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', fn)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do('k', fn)))
+    follower.start()
+    wait_until(lambda: flight.stats()['coalesced'] == 1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == [1]
+    assert sorted(results) == [('value', False), ('value', True)]
+    assert flight.stats()['in_flight'] == 0
+
+def test_single_flight_shares_error():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fn():
+        started.set()
+        release.wait(5)
+        raise ValueError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('k', fn)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    wait_until(lambda: flight.stats()['coalesced'] == 1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert flight.stats()['errors'] == 1
+    # 失败后不保留结果，下一次调用重新执行
+    assert flight.do('k', lambda: 'ok') == ('ok', False)
+
+def test_async_single_flight_coalesces_and_shares_error():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        results = await asyncio.gather(flight.do('k', fn), flight.do('k', fn), flight.do('k', fn))
+        assert calls == [1]
+        assert results == [('value', False), ('value', True), ('value', True)]
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(flight.do('e', failing), flight.do('e', failing), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        stats = flight.stats()
+        assert (stats['executions'], stats['errors'], stats['in_flight']) == (2, 1, 0)
+
+    asyncio.run(main())
+
+def test_async_single_flight_leader_cancel_does_not_cancel_waiters():
+    async def main():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await release.wait()
+            return 'value'
+
+        leader = asyncio.ensure_future(flight.do('k', fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('k', fn))
+        await asyncio.sleep(0)
+
+        # 发起调用的请求断开，另一个等待者仍应拿到结果
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert leader.cancelled()
+        release.set()
+        assert await follower == ('value', True)
+        assert calls == [1]
+        assert flight.stats()['in_flight'] == 0
+
+    asyncio.run(main())
+
+def test_async_single_flight_cancels_call_when_all_waiters_cancel():
+    async def main():
+        flight = AsyncSingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fn():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do('k', fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 5)
+        await asyncio.sleep(0)
+        assert flight.stats()['in_flight'] == 0
+
+    asyncio.run(main())
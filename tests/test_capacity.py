@@ -0,0 +1,105 @@
+import pytest
+
+from aihcx import capacity
+from aihcx.capacity import NodeColumns, collect_capacity, fetch_pages, gpu_quantity, queue_capacity_rows
+
+def node(zone='zone-a', model='A800', phase='Ready', total=8, allocated=0):
+    return {'zone': zone, 'gpuType': model, 'statusPhase': phase, 'gpuTotal': total, 'gpuAllocated': allocated}
+
+class FakePages:
+    """按 pageNo/pageSize 返回内存中的列表；with_total=False 时模拟不返回总数的接口"""
+
+    def __init__(self, lists, with_total=True):
+        self.lists = lists
+        self.with_total = with_total
+        self.calls = []
+
+    def __call__(self, client, path, params):
+        self.calls.append((path, params['pageNo']))
+        if path not in self.lists:
+            raise OSError(f'connection refused: {path}')
+        kind, items = self.lists[path]
+        start = (params['pageNo'] - 1) * params['pageSize']
+        result = {kind: items[start:start + params['pageSize']]}
+        if self.with_total:
+            result['totalCount'] = len(items)
+        return result
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(capacity, 'PAGE_SIZE', 3)
+
+def test_extend_handles_field_names_with_whitespace():
+    columns = NodeColumns()
+    columns.extend('pool-1', [{' zone ': 'zone-a', 'acceleratorType ': 'H800', 'statusPhase': 'Ready',
+                               ' gpuTotal': '8', 'gpuAllocated ': 2}])
+    assert (columns.zone, columns.model) == (['zone-a'], ['H800'])
+    assert (list(columns.gpu_total), list(columns.gpu_allocated), list(columns.ready)) == ([8], [2], [1])
+
+def test_extend_defaults_for_missing_fields():
+    columns = NodeColumns()
+    columns.extend('pool-1', [{'statusPhase': 'Ready'}])
+    columns.extend('pool-1', [])
+    assert (len(columns), columns.zone, columns.model, list(columns.gpu_total)) == (1, ['-'], ['-'], [0])
+
+def test_group_excludes_not_ready_nodes_from_free():
+    columns = NodeColumns()
+    columns.extend('pool-1', [node(allocated=6), node(phase='NotReady', allocated=2), node(zone='zone-b', phase='running')])
+    columns.extend('pool-2', [node(model='H800', total=4, allocated=5)])
+    rows = columns.group('zone')
+    assert [r['KEY'] for r in rows] == ['zone-a', 'zone-b', 'TOTAL']
+    zone_a, zone_b, total = rows
+    # NotReady 节点计入 GPU_TOTAL 和 NOT_READY，但空闲GPU不算；超分配的节点空闲为0
+    assert (zone_a['NODES'], zone_a['NOT_READY'], zone_a['GPU_TOTAL'], zone_a['GPU_ALLOCATED'], zone_a['GPU_FREE']) == \
+        (3, 1, 20, 13, 2)
+    assert (zone_b['GPU_FREE'], zone_b['GPU_UTIL']) == (8, '0%')
+    assert (total['NODES'], total['NOT_READY'], total['GPU_TOTAL'], total['GPU_ALLOCATED'], total['GPU_FREE']) == \
+        (4, 1, 28, 13, 10)
+    assert total['GPU_UTIL'] == '46%'
+    assert [r['KEY'] for r in columns.group('model')] == ['A800', 'H800', 'TOTAL']
+
+def test_group_without_nodes_has_only_total():
+    assert NodeColumns().group('pool') == [capacity.capacity_row('pool', 'TOTAL', 0, 0, 0, 0, 0)]
+
+def test_gpu_quantity():
+    assert gpu_quantity({'accelerators': {'nvidia.com/gpu': '8', 'huawei.com/npu': 4}, 'cpu': 96}) == 12
+    assert gpu_quantity({'resources': {'accelerators': {'a': 2}}, 'baidu.com/a800_80g_cgpu': '1.5'}) == 3.5
+    assert gpu_quantity({'memory': '1Ti'}) == 0
+    assert gpu_quantity(None) == 0
+
+def test_queue_rows():
+    queues = [{'name': 'q1', 'capability': {'accelerators': {'gpu': 16}}, 'allocated': {'accelerators': {'gpu': 4.5}}},
+              {'name': 'q2', 'capability': {}, 'allocated': {'nvidia.com/gpu': 2}}]
+    rows = queue_capacity_rows('pool-1', queues)
+    assert [(r['KEY'], r['GPU_TOTAL'], r['GPU_ALLOCATED'], r['GPU_FREE'], r['GPU_UTIL']) for r in rows] == [
+        ('pool-1/q1', 16, 4.5, 11.5, '28%'),
+        ('pool-1/q2', 0, 2, 0, '-'),
+    ]
+
+def test_fetch_pages_uses_total_to_fetch_remaining_pages(monkeypatch):
+    nodes = [node() for _ in range(7)]
+    fake = FakePages({'/api/v1/resourcepools/pool-1/nodes': ('nodes', nodes)})
+    monkeypatch.setattr(capacity, 'get_result_json', fake)
+    pages = list(fetch_pages(None, [('nodes', 'pool-1')], workers=2))
+    assert [len(items) for _, _, items in pages] == [3, 3, 1]
+    assert sorted(page for _, page in fake.calls) == [1, 2, 3]
+
+@pytest.mark.parametrize('count, expected_pages', [(7, [1, 2, 3]), (6, [1, 2, 3]), (0, [1])])
+def test_fetch_pages_without_total_stops_at_short_page(monkeypatch, count, expected_pages):
+    fake = FakePages({'/api/v1/resourcepools/pool-1/nodes': ('nodes', [node() for _ in range(count)])},
+                     with_total=False)
+    monkeypatch.setattr(capacity, 'get_result_json', fake)
+    pages = list(fetch_pages(None, [('nodes', 'pool-1')]))
+    assert sum(len(items) for _, _, items in pages) == count
+    assert [page for _, page in fake.calls] == expected_pages
+
+def test_collect_capacity_reports_failed_pools(monkeypatch):
+    fake = FakePages({
+        '/api/v1/resourcepools/pool-1/nodes': ('nodes', [node(), node(allocated=8)]),
+        '/api/v1/resourcepools/pool-1/queue': ('queues', [{'name': 'q1', 'capability': {'gpu': 16}}]),
+    })
+    monkeypatch.setattr(capacity, 'get_result_json', fake)
+    rows, errors = collect_capacity(None, ['pool-1', 'pool-2'], ['pool', 'queue'])
+    assert [(r['GROUP_BY'], r['KEY']) for r in rows] == [('pool', 'pool-1'), ('pool', 'TOTAL'), ('queue', 'pool-1/q1')]
+    assert rows[0]['GPU_FREE'] == 8
+    assert list(errors) == ['pool-2'] and 'connection refused' in str(errors['pool-2'])
@@ -0,0 +1,159 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from aihcx import client
+from aihcx.client import PROFILE_ENV, AIJobConfig, ClientRegistry
+
+def read_file(home):
+    return json.loads((home / '.aijob' / 'config.json').read_text())
+
+@pytest.fixture
+def writes(monkeypatch):
+    """记录每次写入配置文件的内容"""
+    written = []
+    write = AIJobConfig._write
+
+    def counting_write(self, data):
+        written.append(json.loads(json.dumps(data)))
+        write(self, data)
+
+    monkeypatch.setattr(AIJobConfig, '_write', counting_write)
+    return written
+
+def test_update_writes_all_values_once(home, writes):
+    config = AIJobConfig()
+    config.update(host='http://h', access_key='ak', secret_key='sk')
+    assert writes == [{'host': 'http://h', 'access_key': 'ak', 'secret_key': 'sk'}]
+    assert read_file(home) == writes[0]
+    assert config.get('host') == 'http://h'
+
+def test_update_without_values_does_not_write(home, writes):
+    AIJobConfig().update()
+    assert writes == []
+    assert not (home / '.aijob' / 'config.json').exists()
+
+def test_update_none_removes_key(home):
+    config = AIJobConfig()
+    config.update(pool='p', queue='q')
+    config.update(queue=None)
+    assert read_file(home) == {'pool': 'p'}
+
+def test_update_rejects_reserved_keys(home):
+    with pytest.raises(ValueError):
+        AIJobConfig().update(profiles={})
+
+def test_update_merges_changes_from_other_writers(home):
+    first, second = AIJobConfig(), AIJobConfig()
+    first.update(host='http://h')
+    # second 读取的是旧内容，写入前会在锁内重新读取文件
+    second.update(pool='p')
+    assert read_file(home) == {'host': 'http://h', 'pool': 'p'}
+    assert second.config == {'host': 'http://h', 'pool': 'p'}
+
+def test_concurrent_updates_keep_every_key(home):
+    def writer(n):
+        config = AIJobConfig()
+        for i in range(10):
+            config.update(**{f'key_{n}_{i}': i})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(read_file(home)) == 80
+
+def test_write_is_atomic_and_fsynced(home, monkeypatch):
+    config = AIJobConfig()
+    config.update(host='http://h')
+    assert stat.S_IMODE(os.stat(home / '.aijob' / 'config.json').st_mode) == 0o600
+
+    fsynced = []
+    fsync = os.fsync
+    monkeypatch.setattr(client.os, 'fsync', lambda fd: fsynced.append(fd) or fsync(fd))
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(client.os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        config.update(host='http://other')
+    # 替换失败时原文件不变，临时文件被清理
+    assert read_file(home) == {'host': 'http://h'}
+    assert sorted(p.name for p in (home / '.aijob').iterdir()) == ['config.json', 'config.json.lock']
+    assert fsynced
+
+def test_write_keeps_existing_file_mode(home):
+    config = AIJobConfig()
+    config.update(host='http://h')
+    os.chmod(home / '.aijob' / 'config.json', 0o640)
+    config.update(pool='p')
+    assert stat.S_IMODE(os.stat(home / '.aijob' / 'config.json').st_mode) == 0o640
+
+def test_profiles_fall_back_to_default(home):
+    config = AIJobConfig()
+    config.update(host='http://default', pool='p-default')
+    config.update('gz', host='http://gz')
+    assert config.profiles() == ['default', 'gz']
+    assert config.profile_name == 'default'
+    assert config.get('host') == 'http://default'
+    assert config.get('host', profile='gz') == 'http://gz'
+    assert config.get('pool', profile='gz') == 'p-default'
+    assert read_file(home)['profiles'] == {'gz': {'host': 'http://gz'}}
+
+def test_use_selects_profile_for_reads_and_writes(home, monkeypatch):
+    config = AIJobConfig()
+    config.update(host='http://default')
+    config.update('gz', host='http://gz')
+
+    config.use('gz')
+    assert read_file(home)['current_profile'] == 'gz'
+    assert config.profile_name == 'gz'
+    assert config.get('host') == 'http://gz'
+    # 不指定 profile 时写入当前 profile
+    config.update(pool='p-gz')
+    assert read_file(home)['profiles']['gz'] == {'host': 'http://gz', 'pool': 'p-gz'}
+
+    # 环境变量优先于 current_profile
+    monkeypatch.setenv(PROFILE_ENV, 'default')
+    assert config.get('host') == 'http://default'
+    monkeypatch.delenv(PROFILE_ENV)
+
+    config.use('default')
+    assert 'current_profile' not in read_file(home)
+    assert config.get('host') == 'http://default'
+
+    with pytest.raises(ValueError, match='profile 不存在'):
+        config.use('missing')
+
+def test_registry_reloads_config_only_when_file_changes(home, monkeypatch):
+    registry = ClientRegistry()
+    monkeypatch.setattr(registry, '_create_client', lambda version, host, ak, sk: object())
+    AIJobConfig().update(host='http://h', access_key='ak', secret_key='sk')
+
+    config = registry.config()
+    assert registry.config() is config
+    api_client = registry.get()
+    assert registry.get() is api_client
+
+    # 其它进程修改配置文件后重新读取，并丢弃按旧配置创建的客户端
+    AIJobConfig().update(pool='pool-changed')
+    reloaded = registry.config()
+    assert reloaded is not config
+    assert reloaded.get('pool') == 'pool-changed'
+    assert registry.get() is not api_client
+
+def test_registry_reload_after_profile_switch(home, monkeypatch):
+    registry = ClientRegistry()
+    monkeypatch.setattr(registry, '_create_client', lambda version, host, ak, sk: (host, ak))
+    config = AIJobConfig()
+    config.update(host='http://default', access_key='ak', secret_key='sk')
+    config.update('gz', host='http://gz')
+    assert registry.get() == ('http://default', 'ak')
+
+    config.use('gz')
+    assert registry.get() == ('http://gz', 'ak')
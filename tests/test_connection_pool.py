@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aihcx import client
+from aihcx.client import AIJobConfig, client_registry, get_client, get_result_json
+
+@pytest.fixture
+def api(home, fake_server):
+    AIJobConfig().update(host=fake_server.url, access_key='ak', secret_key='sk', max_retries=0)
+    client_registry.clear()
+    yield get_client()
+    client_registry.clear()
+
+def idle_connections():
+    return sum(len(conns) for conns in client._connection_pool._idle.values())
+
+def test_successful_response_returns_connection(api):
+    get_result_json(api, '/api/v1/aijobs/job-00001', {'resourcePoolId': 'pool-bench'})
+    assert idle_connections() == 1
+    get_result_json(api, '/api/v1/aijobs/job-00002', {'resourcePoolId': 'pool-bench'})
+    assert idle_connections() == 1
+
+def test_error_response_does_not_return_connection(api):
+    with pytest.raises(Exception) as info:
+        get_result_json(api, '/api/v1/missing')
+    assert client.error_status(info.value) == 404
+    # SDK 在错误分支中会关闭该连接，不能先归还给连接池
+    assert idle_connections() == 0
+
+def test_concurrent_errors_do_not_close_other_requests(api):
+    def call(i):
+        if i % 2:
+            try:
+                get_result_json(api, '/api/v1/missing')
+            except Exception as e:
+                return client.error_status(e)
+            return 'unexpected success'
+        result = get_result_json(api, '/api/v1/aijobs', {
+            'resourcePoolId': 'pool-bench', 'orderBy': 'createdAt', 'order': 'desc', 'pageNo': 1, 'pageSize': 10})
+        return len(result['jobs'])
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(call, range(400)))
+    assert results == [10 if i % 2 == 0 else 404 for i in range(400)]
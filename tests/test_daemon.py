@@ -0,0 +1,150 @@
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aihcx import __version__, daemon
+from aihcx.client import AIJobConfig, client_registry
+from aihcx.daemon import DISABLE_ENV, EXIT, REFUSE, SOCKET_ENV, STDERR, STDOUT, daemon_env, should_forward
+
+pytestmark = pytest.mark.skipif(not hasattr(daemon.socket, 'AF_UNIX'), reason='需要 Unix 域套接字')
+
+@pytest.fixture
+def server(home, monkeypatch):
+    """在后台线程中运行 daemon；套接字放在短路径下（Unix 域套接字路径有长度限制）"""
+    monkeypatch.delenv(DISABLE_ENV, raising=False)
+    streams = sys.stdin, sys.stdout, sys.stderr
+    with tempfile.TemporaryDirectory(prefix='aihcx-') as directory:
+        path = f'{directory}/daemon.sock'
+        monkeypatch.setenv(SOCKET_ENV, path)
+        thread = threading.Thread(target=daemon.DaemonServer(path, idle_timeout=0).serve, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while daemon.status(path) is None:
+            assert time.monotonic() < deadline, 'daemon 未启动'
+            time.sleep(0.01)
+        try:
+            yield path
+        finally:
+            daemon.stop(path)
+            thread.join(5)
+            # serve() 把标准流替换成了按线程分发的 _ThreadStream
+            sys.stdin, sys.stdout, sys.stderr = streams
+    client_registry.clear()
+
+def thread_streams():
+    """pytest 在每个阶段开始时会重新替换 sys.stdout 等，执行命令前重新装上 daemon 按线程分发的流"""
+    for name in ('stdin', 'stdout', 'stderr'):
+        if not isinstance(getattr(sys, name), daemon._ThreadStream):
+            setattr(sys, name, daemon._ThreadStream(name, getattr(sys, name)))
+
+def run(path, argv, env=None):
+    """通过套接字执行命令，返回 {通道: 内容}"""
+    thread_streams()
+    frames = daemon.request('run', path, timeout=10, argv=argv, env=env if env is not None else daemon_env(),
+                            tty=[False, False])
+    output = {}
+    for channel, payload in frames:
+        output[channel] = output.get(channel, b'') + payload
+    return output
+
+@pytest.mark.parametrize('argv, forward', [
+    (['version'], True),
+    (['job', 'list'], True),
+    (['job', 'get', 'job-1', '-o', 'json'], True),
+    (['pool', 'list'], True),
+    # 写操作、交互式命令和配置不转发
+    (['job', 'delete', 'job-1'], False),
+    (['job', 'logs', 'job-1'], False),
+    (['config', '--show'], False),
+    (['daemon', 'status'], False),
+    # 顶层选项需要在当前进程内生效
+    (['--timing', 'job', 'list'], False),
+    # 耗时较长的命令
+    (['job', 'list', '--all'], False),
+    (['job', 'list', '--pools=a,b'], False),
+    (['job', 'query', '--sync'], False),
+    ([], False),
+])
+def test_should_forward(monkeypatch, argv, forward):
+    monkeypatch.delenv(DISABLE_ENV, raising=False)
+    monkeypatch.delenv('_AIHCX_COMPLETE', raising=False)
+    assert should_forward(argv) is forward
+
+def test_should_forward_disabled_by_env(monkeypatch):
+    monkeypatch.setenv(DISABLE_ENV, '1')
+    assert should_forward(['version']) is False
+    monkeypatch.delenv(DISABLE_ENV)
+    monkeypatch.setenv('_AIHCX_COMPLETE', 'bash_complete')
+    assert should_forward(['version']) is False
+
+def test_daemon_env_only_keeps_relevant_variables(monkeypatch):
+    monkeypatch.setenv('AIHCX_PROFILE', 'gz')
+    monkeypatch.setenv(DISABLE_ENV, '1')
+    monkeypatch.setenv(SOCKET_ENV, '/tmp/x.sock')
+    monkeypatch.setenv('TERM', 'xterm')
+    env = daemon_env()
+    assert env['AIHCX_PROFILE'] == 'gz' and env['HOME']
+    assert not {DISABLE_ENV, SOCKET_ENV, 'TERM'} & set(env)
+
+def test_status(server):
+    info = daemon.status(server)
+    assert (info['version'], info['socket'], info['active']) == (__version__, server, 1)
+
+def test_forwarded_command_round_trip(server):
+    assert run(server, ['version']) == {STDOUT: f'aihcx {__version__}\n'.encode(), EXIT: b'0'}
+
+def test_stderr_and_exit_code_are_forwarded(server):
+    output = run(server, ['job', 'status'])
+    assert output[EXIT] == b'2'
+    assert b'Usage' in output[STDERR] and STDOUT not in output
+
+def test_refuses_write_commands(server):
+    output = run(server, ['job', 'delete', 'job-1'])
+    assert list(output) == [REFUSE]
+
+def test_refuses_mismatched_env(server, home):
+    output = run(server, ['version'], env=dict(daemon_env(), HOME=str(home / 'other')))
+    assert output == {REFUSE: '环境变量不一致'.encode('utf-8')}
+    output = run(server, ['version'], env=dict(daemon_env(), AIHCX_PROFILE='gz'))
+    assert list(output) == [REFUSE]
+
+def test_concurrent_commands_keep_their_own_output(server, fake_server):
+    AIJobConfig().update(host=fake_server.url, access_key='ak', secret_key='sk', pool='pool-bench')
+    argvs = [['version'] if i % 2 else ['job', 'status', f'job-{i:05d}'] for i in range(16)]
+    thread_streams()
+    with ThreadPoolExecutor(8) as pool:
+        outputs = list(pool.map(lambda argv: run(server, argv), argvs))
+    for argv, output in zip(argvs, outputs):
+        assert output[EXIT] == b'0', output.get(STDERR)
+        text = output[STDOUT].decode()
+        if argv == ['version']:
+            assert text == f'aihcx {__version__}\n'
+        else:
+            assert f'bench-{argv[2][4:]}' in text and 'aihcx' not in text
+
+def test_main_falls_back_to_local_when_refused(server, monkeypatch):
+    calls = []
+    monkeypatch.setattr('aihcx.cli.cli', lambda prog_name: calls.append(sys.argv[1:]))
+    # 客户端与 daemon 的环境变量不一致时，daemon 拒绝执行，命令改为在当前进程内执行
+    env = daemon.daemon_env
+    main_thread = threading.current_thread()
+    monkeypatch.setattr(daemon, 'daemon_env',
+                        lambda: {'HOME': '/elsewhere'} if threading.current_thread() is main_thread else env())
+    monkeypatch.setattr(sys, 'argv', ['aihcx', 'version'])
+    assert daemon.forward(['version']) is None
+    daemon.main()
+    assert calls == [['version']]
+
+def test_main_runs_locally_without_daemon(home, monkeypatch):
+    monkeypatch.delenv(DISABLE_ENV, raising=False)
+    monkeypatch.setenv(SOCKET_ENV, str(home / 'missing.sock'))
+    calls = []
+    monkeypatch.setattr('aihcx.cli.cli', lambda prog_name: calls.append(sys.argv[1:]))
+    monkeypatch.setattr(sys, 'argv', ['aihcx', 'job', 'list'])
+    assert daemon.forward(['job', 'list']) is None
+    daemon.main()
+    assert calls == [['job', 'list']]
@@ -0,0 +1,130 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from aihcx import history
+from aihcx.history import HistoryStore, parse_time, sync_pools
+
+BASE_TS = 1700000000
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class FakeJobsClient:
+    """按 /api/v1/aijobs 的分页参数返回内存中的任务"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.pages = []
+
+    def add(self, job_id: str, offset: int, status: str = 'Succeeded'):
+        self.jobs[job_id] = {'jobId': job_id, 'name': job_id, 'status': status, 'createdAt': iso(BASE_TS + offset)}
+
+    def _send_request(self, method, path, body=None, params=None, body_parser=None):
+        assert path == b'/api/v1/aijobs'
+        page, size = params['pageNo'], params['pageSize']
+        self.pages.append(page)
+        jobs = sorted(self.jobs.values(), key=lambda j: j['createdAt'], reverse=params['order'] == 'desc')
+        result = {'jobs': jobs[(page - 1) * size:page * size], 'totalCount': len(jobs)}
+        return SimpleNamespace(payload={'result': result})
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / 'history.db')
+    yield store
+    store.close()
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(history, 'PAGE_SIZE', 5)
+    return FakeJobsClient()
+
+def sync(client, store, full=False):
+    client.pages.clear()
+    return next(sync_pools(client, ['pool'], full=full, workers=1, store=store))
+
+def local_ids(store):
+    return sorted(row['ID'] for row in store.query(['pool']))
+
+def test_parse_time():
+    assert parse_time('2024-01-01T00:00:00Z') == 1704067200
+    assert parse_time('2024-01-01T08:00:00+08:00') == 1704067200
+    assert parse_time('2024-01-01T00:00:00.123456789Z') == pytest.approx(1704067200.123456)
+    assert parse_time('') is None and parse_time('not a time') is None
+
+def test_first_sync_is_full(client, store):
+    for i in range(12):
+        client.add(f'job-{i}', i)
+    assert store.sync_floor('pool') is None
+    row = sync(client, store)
+    assert (row['MODE'], row['FETCHED'], row['NEW'], row['PAGES']) == ('full', 12, 12, 3)
+    assert store.sync_floor('pool') == BASE_TS + 11
+
+def test_floor_is_oldest_active_job(client, store):
+    for i in range(12):
+        client.add(f'job-{i}', i, 'Running' if i in (3, 7) else 'Succeeded')
+    sync(client, store)
+    assert store.sync_floor('pool') == BASE_TS + 3
+
+def test_incremental_sync_pages_back_to_floor_only(client, store):
+    for i in range(20):
+        client.add(f'job-{i}', i)
+    sync(client, store)
+    client.add('job-new', 100, 'Running')
+    row = sync(client, store)
+    assert row['MODE'] == 'incremental'
+    # 第一页已包含早于水位的任务，不再向后翻页
+    assert client.pages == [1]
+    assert (row['NEW'], row['UPDATED'], row['DELETED']) == (1, 0, 0)
+
+def test_incremental_sync_updates_status(client, store):
+    for i in range(12):
+        client.add(f'job-{i}', i, 'Running' if i == 2 else 'Succeeded')
+    sync(client, store)
+    client.jobs['job-2']['status'] = 'Failed'
+    row = sync(client, store)
+    assert (row['NEW'], row['UPDATED']) == (0, 1)
+    # 任务结束后水位不再被它拉低
+    assert store.sync_floor('pool') == BASE_TS + 11
+
+def test_incremental_sync_drops_active_job_deleted_on_server(client, store):
+    for i in range(30):
+        client.add(f'job-{i}', i, 'Running' if i == 1 else 'Succeeded')
+    sync(client, store)
+    assert store.sync_floor('pool') == BASE_TS + 1
+
+    del client.jobs['job-1']
+    row = sync(client, store)
+    assert row['DELETED'] == 1
+    assert 'job-1' not in local_ids(store)
+    assert store.sync_floor('pool') == BASE_TS + 29
+
+    # 之后的增量同步只拉取最新一页
+    client.add('job-new', 100)
+    sync(client, store)
+    assert client.pages == [1]
+
+def test_terminal_job_deleted_on_server_kept_until_full_sync(client, store):
+    for i in range(12):
+        client.add(f'job-{i}', i)
+    sync(client, store)
+    del client.jobs['job-0']
+    assert sync(client, store)['DELETED'] == 0
+    assert 'job-0' in local_ids(store)
+
+    row = sync(client, store, full=True)
+    assert (row['MODE'], row['DELETED']) == ('full', 1)
+    assert 'job-0' not in local_ids(store)
+
+def test_sync_error_keeps_store(client, store):
+    client.add('job-0', 0)
+    sync(client, store)
+
+    def fail(*args, **kwargs):
+        raise OSError('connection refused')
+
+    client._send_request = fail
+    row = sync(client, store)
+    assert row['ERROR'] == 'connection refused'
+    assert local_ids(store) == ['job-0']
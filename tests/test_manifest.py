@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from aihcx.manifest import ManifestError, _render, client_token, default_results_path, load_manifest, load_results
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+def test_grid_expands_cartesian_product(tmp_path):
+    path = write_json(tmp_path / 'jobs.json', {
+        'config': {'name': 'train', 'lr': '{{lr}}', 'bs': '{{bs}}'},
+        'grid': {'lr': [0.1, 0.2], 'bs': [16, 32]},
+        'pool': 'pool-a',
+    })
+    jobs = load_manifest(path)
+    assert [job.params for job in jobs] == [
+        {'lr': 0.1, 'bs': 16}, {'lr': 0.1, 'bs': 32}, {'lr': 0.2, 'bs': 16}, {'lr': 0.2, 'bs': 32}]
+    assert [job.name for job in jobs] == ['train-0.1-16', 'train-0.1-32', 'train-0.2-16', 'train-0.2-32']
+    assert all(job.pool == 'pool-a' for job in jobs)
+    assert len({job.token for job in jobs}) == 4
+
+@pytest.mark.parametrize('entry, names', [
+    # 配置中的名称带占位符：只渲染，不再追加参数值
+    ({'config': {'name': 'train-{{lr}}'}, 'grid': {'lr': [0.1, 0.2]}}, ['train-0.1', 'train-0.2']),
+    # 条目的 name 带占位符
+    ({'name': 'run-{{ lr }}-x', 'config': {'name': 'ignored'}, 'grid': {'lr': [1, 2]}}, ['run-1-x', 'run-2-x']),
+    # 整个名称就是一个占位符
+    ({'name': '{{lr}}', 'config': {}, 'grid': {'lr': [1, 2]}}, ['1', '2']),
+    # 名称中没有占位符时追加参数值
+    ({'config': {'name': 'train'}, 'grid': {'lr': [0.1, 0.2]}}, ['train-0.1', 'train-0.2']),
+    # 没有名称时用参数值作为名称
+    ({'config': {'image': 'x'}, 'grid': {'lr': [0.1], 'bs': [8]}}, ['0.1-8']),
+    # 没有网格时名称保持不变
+    ({'config': {'name': 'single'}}, ['single']),
+])
+def test_placeholder_naming(tmp_path, entry, names):
+    jobs = load_manifest(write_json(tmp_path / 'jobs.json', entry))
+    assert [job.name for job in jobs] == names
+    assert [job.config['name'] for job in jobs] == names
+
+def test_token_uses_rendered_name(tmp_path):
+    jobs = load_manifest(write_json(tmp_path / 'jobs.json', {'config': {'name': 'train-{{lr}}'}, 'grid': {'lr': [0.1]}}))
+    assert jobs[0].token == client_token(None, {'name': 'train-0.1'})
+
+def test_whole_string_placeholder_keeps_type():
+    params = {'n': 4, 'flag': True, 'args': ['--a', '--b']}
+    rendered = _render({'replicas': '{{n}}', 'enabled': ' {{ flag }} ', 'argv': '{{args}}',
+                        'cmd': 'run --n={{n}}', 'nested': [{'count': '{{n}}'}], 'plain': 7}, params)
+    assert rendered == {'replicas': 4, 'enabled': True, 'argv': ['--a', '--b'], 'cmd': 'run --n=4',
+                        'nested': [{'count': 4}], 'plain': 7}
+
+def test_client_token_is_stable_and_key_order_independent():
+    token = client_token('pool-a', {'name': 'x', 'resources': {'gpu': 8, 'cpu': 4}})
+    assert token == client_token('pool-a', {'resources': {'cpu': 4, 'gpu': 8}, 'name': 'x'})
+    assert token.startswith('aihcx-') and len(token) == len('aihcx-') + 32
+    assert token != client_token('pool-b', {'name': 'x', 'resources': {'gpu': 8, 'cpu': 4}})
+
+def test_duplicate_entries_are_submitted_once(tmp_path):
+    path = tmp_path / 'jobs.jsonl'
+    lines = [{'config': {'name': 'a'}}, {'config': {'name': 'a'}}, {'config': {'name': 'a'}, 'pool': 'other'}]
+    path.write_text('\n'.join(json.dumps(line) for line in lines) + '\n\n', encoding='utf-8')
+    jobs = load_manifest(str(path), default_pool='pool-a')
+    assert [(job.name, job.pool) for job in jobs] == [('a', 'pool-a'), ('a', 'other')]
+
+def test_defaults_and_base_file(tmp_path):
+    write_json(tmp_path / 'base.json', {'name': 'base', 'resources': {'gpu': 1, 'cpu': 2}})
+    (tmp_path / 'jobs.yaml').write_text(
+        'defaults:\n'
+        '  pool: pool-a\n'
+        '  base: base.json\n'
+        'jobs:\n'
+        '  - config: {resources: {gpu: 8}}\n'
+        '  - name: other\n'
+        '    pool: pool-b\n', encoding='utf-8')
+    jobs = load_manifest(str(tmp_path / 'jobs.yaml'))
+    assert [(job.name, job.pool) for job in jobs] == [('base', 'pool-a'), ('other', 'pool-b')]
+    assert jobs[0].config['resources'] == {'gpu': 8, 'cpu': 2}
+
+def test_directory_manifest(tmp_path):
+    write_json(tmp_path / 'b.json', {'name': 'b'})
+    write_json(tmp_path / 'a.json', {'name': 'a'})
+    (tmp_path / 'notes.txt').write_text('ignored', encoding='utf-8')
+    assert [job.name for job in load_manifest(str(tmp_path))] == ['a', 'b']
+    assert default_results_path(str(tmp_path)) == str(tmp_path / 'results.jsonl')
+
+@pytest.mark.parametrize('document, message', [
+    (['not an object'], '清单条目必须是对象'),
+    ({'config': {}, 'grid': {'lr': []}}, 'grid'),
+    ({'config': {}, 'grid': {'lr': 0.1}}, 'grid'),
+    ({'config': {}, 'grid': [0.1]}, 'grid'),
+    ({'config': {'cmd': 'run {{missing}}'}, 'grid': {'lr': [1]}}, '未定义的参数: missing'),
+])
+def test_manifest_errors(tmp_path, document, message):
+    with pytest.raises(ManifestError, match=message) as info:
+        load_manifest(write_json(tmp_path / 'jobs.json', document))
+    assert str(info.value).startswith('第 1 个条目')
+
+def test_load_results_resumes_submitted_jobs(tmp_path):
+    path = tmp_path / 'jobs.json.results.jsonl'
+    assert load_results(str(path)) == {}
+    path.write_text('\n'.join([
+        json.dumps({'token': 't1', 'jobId': 'job-1'}),
+        json.dumps({'token': 't2', 'jobId': '', 'error': 'boom'}),
+        json.dumps({'token': 't3', 'jobId': 'job-3'}),
+        '{"token": "t4", "jobI',
+    ]), encoding='utf-8')
+    assert sorted(load_results(str(path))) == ['t1', 't3']
+    assert default_results_path(str(tmp_path / 'jobs.json')) == str(path)
@@ -0,0 +1,152 @@
+import json
+import os
+
+import pytest
+
+from aihcx import template_store
+from aihcx.client import AIJobConfig, client_registry
+from aihcx.template_store import (DirectoryTemplateStore, SqliteTemplateStore, TemplateQuery, consolidate_templates,
+                                  get_template_store, handle_template_detail, handle_templates, parse_query)
+
+TEMPLATES = [
+    {'id': 't1', 'name': 'bert', 'createdAt': '2024-01-01', 'description': 'NLP pretrain', 'tags': ['nlp']},
+    {'id': 't2', 'name': 'llama', 'createdAt': '2024-01-03', 'updatedAt': '2024-02-01', 'tags': 'llm, nlp'},
+    {'id': 't3', 'name': 'resnet', 'createdAt': '2024-01-02', 'description': 'vision', 'tags': ['cv']},
+    {'id': 't4', 'name': 'alpha', 'createdAt': '2024-01-02', 'tags': []},
+]
+
+@pytest.fixture(params=['directory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'directory':
+        store = DirectoryTemplateStore(str(tmp_path / 'templates'))
+    else:
+        store = SqliteTemplateStore(str(tmp_path / 'templates.db'))
+    for template in TEMPLATES:
+        store.save(template['id'], template)
+    yield store
+    if request.param == 'sqlite':
+        store.conn.close()
+
+@pytest.fixture
+def config_dir(home):
+    path = home / 'aihcx-data'
+    AIJobConfig().update(path=str(path))
+    client_registry.clear()
+    template_store._stores.clear()
+    yield path
+    client_registry.clear()
+    template_store._stores.clear()
+
+def ids(store, **kwargs):
+    templates, total = store.query(TemplateQuery(**kwargs))
+    return [t['id'] for t in templates], total
+
+def test_default_order_is_newest_first(store):
+    # createdAt 相同时按ID排序
+    assert ids(store) == (['t2', 't4', 't3', 't1'], 4)
+    assert ids(store, desc=False) == (['t1', 't3', 't4', 't2'], 4)
+    assert ids(store, sort='name', desc=False) == (['t4', 't1', 't2', 't3'], 4)
+    assert ids(store, sort='updatedAt')[0][0] == 't2'
+
+def test_paging_keeps_total(store):
+    assert ids(store, page=1, page_size=3) == (['t2', 't4', 't3'], 4)
+    assert ids(store, page=2, page_size=3) == (['t1'], 4)
+    assert ids(store, page=3, page_size=3) == ([], 4)
+
+def test_search_and_tag_filter(store):
+    assert ids(store, keyword='NLP') == (['t2', 't1'], 2)
+    assert ids(store, keyword='vision') == (['t3'], 1)
+    assert ids(store, tag='nlp') == (['t2', 't1'], 2)
+    # 标签按整个标签匹配
+    assert ids(store, tag='nl') == ([], 0)
+    assert ids(store, keyword='bert', tag='cv') == ([], 0)
+
+def test_index_follows_save_and_delete(store):
+    store.save('t1', dict(TEMPLATES[0], name='bert-large', createdAt='2025-01-01'))
+    assert ids(store)[0][0] == 't1'
+    assert store.get('t1')['name'] == 'bert-large'
+    assert ids(store, keyword='large') == (['t1'], 1)
+
+    assert store.delete('t3') is True
+    assert store.delete('t3') is False
+    assert store.get('t3') is None
+    assert ids(store) == (['t1', 't2', 't4'], 3)
+
+def test_directory_store_sees_files_changed_by_others(tmp_path, caplog):
+    store = DirectoryTemplateStore(str(tmp_path))
+    assert ids(store) == ([], 0)
+    (tmp_path / 'ext.json').write_text(json.dumps({'name': 'external', 'createdAt': '2024-01-01'}))
+    (tmp_path / 'broken.json').write_text('{')
+    # 目录 mtime 变化后立即重新扫描，无法解析的文件被跳过，文件名作为ID，模板内容原样返回
+    assert store.query(TemplateQuery()) == ([{'name': 'external', 'createdAt': '2024-01-01'}], 1)
+    assert store.query(TemplateQuery(keyword='ext'))[1] == 1
+    assert store.get('ext')['name'] == 'external'
+    [record] = [r for r in caplog.records if r.name == 'aihcx.web']
+    assert record.levelname == 'WARNING' and record.fields['error'] == 'JSONDecodeError'
+
+def test_directory_store_rejects_path_like_ids(tmp_path):
+    store = DirectoryTemplateStore(str(tmp_path / 'templates'))
+    for template_id in ['../evil', 'a/b', '..', 'a\\b', '']:
+        with pytest.raises(ValueError):
+            store.save(template_id, {'name': 'x'})
+        with pytest.raises(ValueError):
+            store.delete(template_id)
+    assert not (tmp_path / 'evil.json').exists()
+    assert list(tmp_path.rglob('*.json')) == []
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    store = DirectoryTemplateStore(str(tmp_path))
+    store.save('t1', {'name': 'first'})
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(template_store.os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        store.save('t1', {'name': 'second'})
+    # 原文件不变，临时文件被清理
+    assert json.loads((tmp_path / 't1.json').read_text()) == {'name': 'first'}
+    assert os.listdir(tmp_path) == ['t1.json']
+
+def test_parse_query():
+    assert parse_query(None) == TemplateQuery()
+    query = parse_query({'keyword': ' bert ', 'orderBy': 'name', 'order': 'asc', 'pageNumber': '2', 'pageSize': '10'})
+    assert query == TemplateQuery('bert', '', 'name', False, 2, 10)
+    for params in [{'orderBy': 'size'}, {'order': 'up'}, {'pageSize': '0'}, {'pageSize': '501'},
+                   {'pageNumber': '-1'}, {'pageSize': 'ten'}]:
+        with pytest.raises(ValueError):
+            parse_query(params)
+
+def test_store_selection_follows_consolidation(config_dir):
+    assert isinstance(get_template_store(), DirectoryTemplateStore)
+    assert get_template_store() is get_template_store()
+    for template in TEMPLATES:
+        assert handle_templates('POST', dict(template))[1] == 200
+
+    db_path, count = consolidate_templates(str(config_dir / 'templates'))
+    assert (db_path, count) == (str(config_dir / 'templates.db'), 4)
+    # 合并后改用 SQLite 模板库，原文件保留
+    store = get_template_store()
+    assert isinstance(store, SqliteTemplateStore)
+    assert len(os.listdir(config_dir / 'templates')) == 4
+    assert ids(store) == (['t2', 't4', 't3', 't1'], 4)
+
+def test_handlers(config_dir):
+    assert handle_templates('POST', {'id': 'a', 'name': 'a'}) == ({'template': {'id': 'a', 'name': 'a'}}, 200)
+    assert handle_templates('POST', {'id': '../a', 'name': 'a'})[1] == 400
+    assert handle_templates('POST', {'id': 'b'})[1] == 400
+    data, status = handle_templates('GET', params={'pageSize': '1'})
+    assert (status, data['total'], data['pageNumber'], data['pageSize']) == (200, 1, 1, 1)
+    assert handle_templates('GET', params={'order': 'up'})[1] == 400
+
+    assert handle_template_detail('PUT', 'a', {'name': 'renamed'}) == ({'template': {'name': 'renamed', 'id': 'a'}}, 200)
+    assert handle_template_detail('GET', 'a')[0]['template']['name'] == 'renamed'
+    assert handle_template_detail('GET', '..')[1] == 400
+    assert handle_template_detail('DELETE', 'a') == ({'success': True}, 200)
+    assert handle_template_detail('DELETE', 'a')[1] == 404
+
+def test_handlers_without_config_path(home):
+    client_registry.clear()
+    template_store._stores.clear()
+    assert handle_templates('GET') == ({'error': '配置路径未设置'}, 400)
+    assert handle_template_detail('GET', 'a') == ({'error': '配置路径未设置'}, 400)
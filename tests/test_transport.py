@@ -0,0 +1,177 @@
+import pytest
+
+from aihcx import transport
+from aihcx.transport import (CONNECTION_FAILED, CircuitBreaker, CircuitOpenError, RateLimiter, Transport,
+                             endpoint_key, error_status, transport_settings)
+
+class StatusError(Exception):
+    def __init__(self, status_code=None, code=''):
+        super().__init__(f'{status_code} {code}')
+        self.status_code = status_code
+        self.code = code
+
+@pytest.fixture(autouse=True)
+def fixed_jitter(monkeypatch):
+    # 退避抖动取上限，等待时间可以精确断言
+    monkeypatch.setattr(transport.random, 'uniform', lambda low, high: high)
+
+def test_rate_limiter_disabled():
+    limiter = RateLimiter(0, burst=1)
+    assert [limiter.reserve() for _ in range(10)] == [0.0] * 10
+
+def test_rate_limiter_burst_then_waits_in_order(clock):
+    limiter = RateLimiter(10, burst=2)
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+    # 令牌按速率补充，不超过桶容量
+    clock.advance(0.3)
+    assert limiter.reserve() == pytest.approx(0.0)
+    clock.advance(10)
+    assert [limiter.reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+
+def test_rate_limiter_acquire_sleeps(clock):
+    limiter = RateLimiter(4, burst=1)
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.sleeps == pytest.approx([0.25])
+
+def test_circuit_breaker_opens_and_probes(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+    breaker.record(True)
+    breaker.check('h')
+    breaker.record(True)
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check('h')
+
+    clock.advance(30)
+    assert breaker.state == 'half-open'
+    breaker.check('h')
+    # 探测请求进行中，其余请求仍被拒绝
+    with pytest.raises(CircuitOpenError):
+        breaker.check('h')
+    breaker.record(False)
+    assert breaker.state == 'closed'
+    breaker.check('h')
+
+def test_circuit_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record(True)
+    clock.advance(10)
+    breaker.check('h')
+    breaker.record(True)
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check('h')
+
+def test_circuit_breaker_threshold_zero_never_opens():
+    breaker = CircuitBreaker(threshold=0, cooldown=10)
+    for _ in range(100):
+        breaker.record(True)
+    assert breaker.state == 'closed'
+
+@pytest.mark.parametrize('status, idempotent, retry', [
+    (503, True, True),
+    (500, True, True),
+    (CONNECTION_FAILED, True, True),
+    (429, True, True),
+    # 写请求只在明确被限流时重试
+    (503, False, False),
+    (CONNECTION_FAILED, False, False),
+    (429, False, True),
+    (404, True, False),
+    (200, True, False),
+    (None, True, False),
+])
+def test_after_retries_only_idempotent_or_throttled(status, idempotent, retry):
+    t = Transport({'max_retries': 3, 'retry_backoff': 0.5})
+    delay = t._after('h', status, 1, idempotent)
+    assert (delay is not None) == retry
+    if retry:
+        assert delay == pytest.approx(0.5)
+
+def test_after_backoff_doubles_and_stops_after_max_retries():
+    t = Transport({'max_retries': 3, 'retry_backoff': 0.5, 'breaker_threshold': 0})
+    assert [t._after('h', 503, attempt, True) for attempt in range(1, 5)] == pytest.approx([0.5, 1.0, 2.0, None])
+    with t.max_retries(1):
+        assert t._after('h', 503, 2, True) is None
+    assert t._after('h', 503, 2, True) == pytest.approx(1.0)
+
+def test_after_backoff_is_capped():
+    t = Transport({'max_retries': 20, 'retry_backoff': 1.0, 'breaker_threshold': 0})
+    assert t._after('h', 503, 10, True) == transport.RETRY_BACKOFF_MAX
+
+def test_call_retries_then_succeeds(clock):
+    t = Transport({'max_retries': 3, 'retry_backoff': 0.5})
+    results = [StatusError(503), StatusError(429), 'ok']
+
+    def fn():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert t.call('h', 'GET /x', fn) == 'ok'
+    assert t.last_attempts == 3
+    assert clock.sleeps == pytest.approx([0.5, 1.0])
+    assert t.stats()['retries'] == 2 and t.stats()['throttled'] == 1
+
+def test_call_does_not_retry_failed_write(clock):
+    t = Transport()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise StatusError(503)
+
+    with pytest.raises(StatusError):
+        t.call('h', 'POST /x', fn, idempotent=False)
+    assert calls == [1]
+
+def test_call_retries_on_status_of_result(clock):
+    t = Transport({'max_retries': 1})
+    responses = [502, 200]
+    assert t.call('h', 'k', lambda: responses.pop(0), status_of=lambda status: status) == 200
+
+def test_call_rejected_when_breaker_open(clock):
+    t = Transport({'max_retries': 0, 'breaker_threshold': 2, 'breaker_cooldown': 30})
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            t.call('h', 'k', lambda: (_ for _ in ()).throw(StatusError(500)))
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        t.call('h', 'k', lambda: calls.append(1))
+    assert calls == [] and t.stats()['rejected'] == 1
+    assert t.stats()['breakers'] == {'h': 'open'}
+    # 熔断只按 host 生效
+    assert t.call('other', 'k', lambda: 'ok') == 'ok'
+    clock.advance(30)
+    assert t.call('h', 'k', lambda: 'ok') == 'ok'
+    assert t.stats()['breakers']['h'] == 'closed'
+
+def test_call_is_rate_limited(clock):
+    t = Transport({'rate_limit': 2, 'rate_burst': 1})
+    for _ in range(3):
+        t.call('h', 'k', lambda: None)
+    assert clock.sleeps == pytest.approx([0.5, 0.5])
+
+def test_error_status():
+    assert error_status(StatusError(429)) == 429
+    assert error_status(StatusError(400, code='RequestLimitExceeded')) == 429
+    assert error_status(StatusError(503)) == 503
+    assert error_status(ConnectionResetError()) == CONNECTION_FAILED
+    assert error_status(ValueError('bad json')) is None
+
+    wrapped = Exception('retried')
+    wrapped.last_error = StatusError(502)
+    assert error_status(wrapped) == 502
+
+def test_endpoint_key():
+    assert endpoint_key('POST', '/', {'action': 'DescribeResourcePools'}) == 'DescribeResourcePools'
+    assert endpoint_key(b'GET', b'/api/v1/aijobs/job-123/events') == 'GET /api/v1/aijobs/*/events'
+    assert endpoint_key('get', '/api/v2/resourcepools') == 'GET /api/v2/resourcepools'
+
+def test_transport_settings_defaults_and_types():
+    settings = transport_settings({'rate_limit': '5', 'max_retries': '1'})
+    assert settings['rate_limit'] == 5.0 and settings['max_retries'] == 1
+    assert settings['breaker_cooldown'] == transport.TRANSPORT_DEFAULTS['breaker_cooldown']
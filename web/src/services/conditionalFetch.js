@@ -0,0 +1,40 @@
+// 带 ETag 条件请求的 fetch
+// 记住每个请求（方法 + URL + 请求体）最近一次响应的 ETag 和内容，再次请求时带上 If-None-Match，
+// 服务端返回 304 时直接复用本地内容，不再重复下载整个列表
+
+const MAX_ENTRIES = 100
+const entries = new Map()
+
+export async function conditionalFetch(url, options = {}) {
+  const method = (options.method || 'GET').toUpperCase()
+  const key = `${method} ${url} ${typeof options.body === 'string' ? options.body : ''}`
+  const cached = entries.get(key)
+  const headers = new Headers(options.headers || {})
+  if (cached) {
+    headers.set('If-None-Match', cached.etag)
+  }
+
+  const response = await fetch(url, { ...options, headers })
+  if (response.status === 304 && cached) {
+    return new Response(cached.body, {
+      status: 200,
+      headers: { 'Content-Type': cached.contentType }
+    })
+  }
+
+  const etag = response.headers.get('ETag')
+  if (response.ok && etag) {
+    const body = await response.clone().text()
+    entries.delete(key)
+    entries.set(key, {
+      etag,
+      body,
+      contentType: response.headers.get('Content-Type') || 'application/json'
+    })
+    // 超出上限时淘汰最早的条目
+    if (entries.size > MAX_ENTRIES) {
+      entries.delete(entries.keys().next().value)
+    }
+  }
+  return response
+}
@@ -20,14 +20,10 @@ class TemplateService {
   }
 
   // 获取模板列表
-  async getTemplates() {
+  async getTemplates(query = {}) {
     try {
-      const response = await fetch(`${this.baseUrl}/templates`)
-      if (response.ok) {
-        const data = await response.json()
-        return data.templates || []
-      }
-      throw new Error('获取模板列表失败')
+      const data = await this.queryTemplates(query)
+      return data.templates || []
     } catch (error) {
       console.error('获取模板列表失败:', error)
       // 降级到localStorage
@@ -35,6 +31,24 @@ class TemplateService {
     }
   }
 
+  // 服务端分页/搜索/排序查询模板
+  // query: { keyword, tag, orderBy: 'createdAt'|'updatedAt'|'name', order: 'asc'|'desc', pageNumber, pageSize }
+  // 返回 { templates, total }
+  async queryTemplates(query = {}) {
+    const params = new URLSearchParams()
+    Object.entries(query).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        params.append(key, value)
+      }
+    })
+    const qs = params.toString()
+    const response = await fetch(`${this.baseUrl}/templates${qs ? '?' + qs : ''}`)
+    if (!response.ok) {
+      throw new Error('获取模板列表失败')
+    }
+    return await response.json()
+  }
+
   // 获取单个模板详情
   async getTemplate(templateId) {
     try {
@@ -1,4 +1,5 @@
 import { defineStore } from 'pinia'
+import { conditionalFetch } from '../services/conditionalFetch'
 
 export const useDatasetStore = defineStore('dataset', {
   state: () => ({
@@ -101,7 +102,7 @@ export const useDatasetStore = defineStore('dataset', {
         const url = `/api?${queryParams.toString()}`
         console.log('数据集列表API URL:', url)
 
-        const response = await fetch(url, {
+        const response = await conditionalFetch(url, {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json'
@@ -149,7 +150,7 @@ export const useDatasetStore = defineStore('dataset', {
         const url = `/api?${queryParams.toString()}`
         console.log('数据集详情API URL:', url)
 
-        const response = await fetch(url, {
+        const response = await conditionalFetch(url, {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json'
@@ -206,7 +207,7 @@ export const useDatasetStore = defineStore('dataset', {
               keyword: searchPrefix
             }
 
-            const response = await fetch(`/api?action=DescribeJobs&resourcePoolId=${actualPoolId}`, {
+            const response = await conditionalFetch(`/api?action=DescribeJobs&resourcePoolId=${actualPoolId}`, {
               method: 'POST',
               headers: {
                 'Content-Type': 'application/json'
@@ -1,4 +1,5 @@
 import { defineStore } from 'pinia'
+import { conditionalFetch } from '../services/conditionalFetch'
 
 export const useJobStore = defineStore('job', {
   state: () => ({
@@ -112,7 +113,7 @@ export const useJobStore = defineStore('job', {
         const url = `/api?${queryParams.toString()}`
         console.log('任务列表API URL:', url)
 
-        const response = await fetch(url, {
+        const response = await conditionalFetch(url, {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json'
@@ -166,7 +167,7 @@ export const useJobStore = defineStore('job', {
         const url = `/api?${queryParams.toString()}`
         console.log('任务详情API URL:', url)
 
-        const response = await fetch(url, {
+        const response = await conditionalFetch(url, {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json'
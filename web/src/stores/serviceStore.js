@@ -1,4 +1,5 @@
 import { defineStore } from 'pinia'
+import { conditionalFetch } from '../services/conditionalFetch'
 
 export const useServiceStore = defineStore('service', {
   state: () => ({
@@ -72,7 +73,7 @@ export const useServiceStore = defineStore('service', {
         const url = `/api?${queryParams.toString()}`
         console.log('服务列表API URL:', url)
 
-        const response = await fetch(url, {
+        const response = await conditionalFetch(url, {
           method: 'GET',
           headers: {
             'Content-Type': 'application/json'
@@ -119,7 +120,7 @@ export const useServiceStore = defineStore('service', {
         const url = `/api?${queryParams.toString()}`
         console.log('服务详情API URL:', url)
 
-        const response = await fetch(url, {
+        const response = await conditionalFetch(url, {
           method: 'GET',
           headers: {
             'Content-Type': 'application/json'